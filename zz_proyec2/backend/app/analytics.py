@@ -0,0 +1,152 @@
+"""Mantenimiento de los rollups de ventas (app/models/analytics.py).
+
+* `rollup_params` + `ADD_PRODUCT_DAY` / `ADD_CURRENCY_DAY`: lo que suma un
+  pedido nuevo. create_order los ejecuta en su misma transacción.
+* `rebuild_rollups`: recalcula todo desde Order/OrderItem (backfill o
+  reparación) agregando con NumPy por lotes. Lo usa rebuild_analytics.py.
+"""
+
+from __future__ import annotations
+
+from datetime import date
+from typing import Iterable
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.sqlite import insert
+
+from app.db import engine, query_cache
+from app.models.analytics import CurrencyDailySales, ProductDailySales
+from app.models.orders import Order, OrderItem
+
+
+def _add_on_conflict(model, keys: tuple[str, ...]):
+    # INSERT ... ON CONFLICT DO UPDATE sumando: crea la fila del día o la acumula
+    stmt = insert(model)
+    table = model.__table__
+    return stmt.on_conflict_do_update(
+        index_elements=list(keys),
+        set_={
+            name: table.c[name] + stmt.excluded[name]
+            for name in ("orders", "units", "revenue_cents")
+        },
+    )
+
+
+ADD_PRODUCT_DAY = _add_on_conflict(ProductDailySales, ("day", "currency", "product_id"))
+ADD_CURRENCY_DAY = _add_on_conflict(CurrencyDailySales, ("day", "currency"))
+
+
+def rollup_params(order: Order, items: Iterable[OrderItem]) -> tuple[list[dict], dict]:
+    """Filas a sumar por un pedido: (una por producto, la de su moneda y día)."""
+    day = order.created_at.date()
+    per_product: dict[int, dict] = {}
+    for item in items:
+        row = per_product.setdefault(
+            item.product_id,
+            {"day": day, "currency": order.currency, "product_id": item.product_id,
+             "orders": 1, "units": 0, "revenue_cents": 0},
+        )
+        row["units"] += item.quantity
+        row["revenue_cents"] += item.unit_price_cents * item.quantity
+    currency_row = {
+        "day": day,
+        "currency": order.currency,
+        "orders": 1,
+        "units": sum(r["units"] for r in per_product.values()),
+        "revenue_cents": sum(r["revenue_cents"] for r in per_product.values()),
+    }
+    return list(per_product.values()), currency_row
+
+
+# ---------------------------------------------------------------------------
+# Reconstrucción
+# ---------------------------------------------------------------------------
+
+_ITEM_ROWS = (
+    select(
+        func.date(Order.created_at),
+        Order.currency,
+        OrderItem.product_id,
+        OrderItem.order_id,
+        OrderItem.quantity,
+        OrderItem.unit_price_cents,
+    )
+    .join(Order, Order.id == OrderItem.order_id)
+)
+
+
+def _aggregate(rows: list) -> tuple[list[dict], list[dict]]:
+    """Agrega líneas de pedido con NumPy: (filas producto×día, filas moneda×día).
+
+    Las líneas de un mismo pedido tienen que venir en el mismo lote.
+    """
+    import numpy as np  # solo para el rebuild: la API no lo importa
+
+    days, currencies, product_ids, order_ids, quantities, prices = zip(*rows)
+    day_values, day_idx = np.unique(np.array(days), return_inverse=True)
+    currency_values, currency_idx = np.unique(np.array(currencies), return_inverse=True)
+    order_ids = np.array(order_ids, dtype=np.int64)
+    units = np.array(quantities, dtype=np.int64)
+    revenue = units * np.array(prices, dtype=np.int64)
+
+    def group(keys) -> list[dict]:
+        groups, inverse = np.unique(np.column_stack(keys), axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+        # pedidos distintos por grupo (un pedido puede repetir producto en varias líneas)
+        order_groups = np.unique(np.column_stack([inverse, order_ids]), axis=0)[:, 0]
+        # bincount suma en float64: exacto mientras no pase de 2^53 céntimos
+        sums = {
+            "orders": np.bincount(order_groups, minlength=len(groups)),
+            "units": np.bincount(inverse, weights=units, minlength=len(groups)),
+            "revenue_cents": np.bincount(inverse, weights=revenue, minlength=len(groups)),
+        }
+        rows = []
+        for i, key in enumerate(groups.tolist()):
+            row = {"day": date.fromisoformat(str(day_values[key[0]])), "currency": str(currency_values[key[1]])}
+            if len(key) > 2:
+                row["product_id"] = key[2]
+            row.update({name: int(values[i]) for name, values in sums.items()})
+            rows.append(row)
+        return rows
+
+    return (
+        group([day_idx.ravel(), currency_idx.ravel(), np.array(product_ids, dtype=np.int64)]),
+        group([day_idx.ravel(), currency_idx.ravel()]),
+    )
+
+
+def rebuild_rollups(orders_per_batch: int = 50_000) -> dict:
+    """Vacía y recalcula los rollups desde Order/OrderItem en una transacción.
+
+    Se agrega por rangos de ids de pedido (memoria acotada, y las líneas de un
+    pedido nunca quedan partidas entre lotes); cada lote se suma con los mismos
+    upserts que create_order. Mientras dura, los pedidos nuevos esperan al lock
+    de escritura (SQLITE_BUSY_TIMEOUT_MS): mejor con poco tráfico.
+    """
+    stats = {"items": 0, "batches": 0}
+    with engine.begin() as conn:
+        # El DELETE toma el lock de escritura: ningún pedido entra a medias
+        conn.execute(delete(ProductDailySales))
+        conn.execute(delete(CurrencyDailySales))
+
+        max_order_id = conn.execute(select(func.max(Order.id))).scalar() or 0
+        for start in range(0, max_order_id, orders_per_batch):
+            rows = conn.execute(
+                _ITEM_ROWS.where(
+                    OrderItem.order_id > start, OrderItem.order_id <= start + orders_per_batch
+                )
+            ).all()
+            if not rows:
+                continue
+            product_rows, currency_rows = _aggregate(rows)
+            conn.execute(ADD_PRODUCT_DAY, product_rows)
+            conn.execute(ADD_CURRENCY_DAY, currency_rows)
+            stats["items"] += len(rows)
+            stats["batches"] += 1
+
+        for name, model in (("product_days", ProductDailySales), ("currency_days", CurrencyDailySales)):
+            stats[name] = conn.execute(select(func.count()).select_from(model)).scalar_one()
+
+    # escrituras Core: no pasan por los eventos de Session
+    query_cache.invalidate(ProductDailySales.__tablename__, CurrencyDailySales.__tablename__)
+    return stats
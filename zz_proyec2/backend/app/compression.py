@@ -0,0 +1,216 @@
+"""Compresión de respuestas (gzip, y brotli/zstd si están instalados).
+
+Middleware ASGI con negociación por `Accept-Encoding` (q-values; a igualdad,
+zstd > br > gzip). Solo se comprimen respuestas completas (un único mensaje de
+body: los streams de /export pasan tal cual), de tipos de texto/JSON y de al
+menos COMPRESSION_MIN_SIZE bytes.
+
+* Caché de bodies ya comprimidos: las páginas populares del catálogo son
+  idénticas byte a byte hasta que cambia algo, así que se comprimen una vez.
+  La clave es (ruta, query, ETag) si la respuesta trae ETag (app/http_cache.py)
+  y si no un hash del body; más la codificación y el nivel. LRU acotada a
+  COMPRESSION_CACHE_MAX_BYTES.
+* Niveles: COMPRESSION_LEVELS por codificación; una ruta los cambia con
+  `dependencies=[compression_levels(gzip=9, ...)]` (p. ej. más compresión en
+  lo que casi siempre sale de la caché).
+* Un ETag fuerte pasa a débil (W/"...") en la respuesta comprimida: los bytes
+  ya no son los del ETag. La comparación de If-None-Match es débil, así que los
+  304 siguen funcionando.
+* Coste: segundos de CPU, bytes antes/después y aciertos de la caché por
+  codificación en GET /metrics (app/metrics.py).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import time
+import zlib
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from fastapi import Depends, Request
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.config import settings
+
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def _gzip(body: bytes, level: int) -> bytes:
+    # wbits=31: formato gzip (cabecera + CRC), no zlib "crudo"
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return compressor.compress(body) + compressor.flush()
+
+
+# codificación -> función(body, nivel), en orden de preferencia del servidor
+ENCODERS: dict[str, Callable[[bytes, int], bytes]] = {}
+if zstandard is not None:
+    ENCODERS["zstd"] = lambda body, level: zstandard.ZstdCompressor(level=level).compress(body)
+if brotli is not None:
+    ENCODERS["br"] = lambda body, level: brotli.compress(body, quality=level)
+ENCODERS["gzip"] = _gzip
+
+_COMPRESSIBLE_TYPES = ("text/", "application/json", "application/x-ndjson", "application/javascript", "application/xml")
+
+# codificación -> [segundos de CPU, bytes de entrada, bytes de salida, aciertos de caché, fallos]
+stats: dict[str, list] = {encoding: [0.0, 0, 0, 0, 0] for encoding in ENCODERS}
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """La codificación disponible con mayor q (a igualdad, la preferida); None = identity."""
+    weights: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip().lower()] = q
+    best, best_q = None, 0.0
+    for encoding in ENCODERS:  # orden de preferencia: el primero gana los empates
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class _CompressedCache:
+    """LRU de bodies comprimidos acotada por bytes."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: "OrderedDict[tuple, bytes]" = OrderedDict()
+
+    def get(self, key: tuple) -> Optional[bytes]:
+        body = self._entries.get(key)
+        if body is not None:
+            self._entries.move_to_end(key)
+        return body
+
+    def put(self, key: tuple, body: bytes) -> None:
+        if len(body) > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.size -= len(old)
+        self._entries[key] = body
+        self.size += len(body)
+        while self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.size = 0
+
+
+compressed_cache = _CompressedCache(settings.COMPRESSION_CACHE_MAX_BYTES)
+
+
+def compress(body: bytes, encoding: str, level: int, cache_key: Optional[tuple]) -> bytes:
+    encoding_stats = stats[encoding]
+    key = (*cache_key, encoding, level) if cache_key is not None else None
+    if key is not None:
+        cached = compressed_cache.get(key)
+        if cached is not None:
+            encoding_stats[3] += 1
+            return cached
+    start = time.thread_time()
+    compressed = ENCODERS[encoding](body, level)
+    encoding_stats[0] += time.thread_time() - start
+    encoding_stats[1] += len(body)
+    encoding_stats[2] += len(compressed)
+    encoding_stats[4] += 1
+    if key is not None:
+        compressed_cache.put(key, compressed)
+    return compressed
+
+
+def compression_levels(**levels: int):
+    """Dependencia de ruta: niveles propios por codificación (gzip=, br=, zstd=)."""
+
+    async def set_levels(request: Request) -> None:
+        request.scope["compression_levels"] = levels
+
+    return Depends(set_levels)
+
+
+class CompressionMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.COMPRESSION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+
+        start_message = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                start_message = message  # se retiene hasta ver el body
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            passthrough = True
+            body = message.get("body", b"")
+            headers = MutableHeaders(scope=start_message)
+            content_type = headers.get("content-type", "")
+            if not content_type.startswith(_COMPRESSIBLE_TYPES) or "content-encoding" in headers:
+                await send(start_message)
+                await send(message)
+                return
+            # también sin comprimir: la CDN guarda una copia por Accept-Encoding
+            headers.add_vary_header("Accept-Encoding")
+            # identity, stream (varios mensajes) o demasiado pequeño: tal cual
+            if encoding is None or message.get("more_body", False) or len(body) < settings.COMPRESSION_MIN_SIZE:
+                await send(start_message)
+                await send(message)
+                return
+
+            levels = scope.get("compression_levels") or {}
+            level = levels.get(encoding, settings.COMPRESSION_LEVELS[encoding])
+            etag = headers.get("etag")
+            if etag is not None:
+                cache_key = ("etag", scope["path"], scope["query_string"], etag)
+            else:
+                cache_key = ("hash", hashlib.blake2b(body, digest_size=16).digest())
+            compressed = compress(body, encoding, level, cache_key)
+            if len(compressed) >= len(body):
+                await send(start_message)
+                await send(message)
+                return
+
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            if etag is not None and not etag.startswith("W/"):
+                headers["ETag"] = "W/" + etag
+            await send(start_message)
+            await send({"type": "http.response.body", "body": compressed, "more_body": False})
+
+        await self.app(scope, receive, send_wrapper)
+        if start_message is not None and not passthrough:  # respuesta sin body
+            await send(start_message)
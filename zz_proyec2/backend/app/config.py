@@ -5,6 +5,114 @@ class Settings(BaseSettings):
     SECRET_KEY: str = "super-secret-key-change-me"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
 
+    # SQLite (vacío = app/database.db)
+    SQLITE_PATH: str = ""
+    # Perfil de rendimiento aplicado con PRAGMAs en cada conexión nueva
+    SQLITE_JOURNAL_MODE: str = "WAL"  # WAL: lectores y escritor no se bloquean
+    SQLITE_SYNCHRONOUS: str = "NORMAL"  # seguro con WAL, fsync solo en checkpoint
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024  # bytes
+    SQLITE_CACHE_SIZE: int = -64_000  # negativo = KiB (64 MB por conexión)
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    # Conexiones de solo lectura (el escritor siempre es una única conexión)
+    SQLITE_READ_POOL_SIZE: int = 8
+    # Arranque: no repetir create_all/índices si el fingerprint del esquema
+    # guardado en PRAGMA user_version coincide (False = comprobarlo siempre)
+    SKIP_UNCHANGED_SCHEMA: bool = True
+
+    # Caché de resultados de queries (0 entradas = desactivada)
+    QUERY_CACHE_MAX_ENTRIES: int = 2048
+    # 0 = sin TTL
+    QUERY_CACHE_TTL_SECONDS: float = 0
+    # Cada lectura de la caché mira PRAGMA data_version (unos µs): un commit de
+    # otro proceso (workers, seed_products...) la caduca entera. Solo se puede
+    # quitar con un único proceso escribiendo en la BD
+    QUERY_CACHE_SHARED_CHECK: bool = True
+    # Productos que se precargan al arrancar (main.lifespan)
+    QUERY_CACHE_WARM_PRODUCTS: int = 500
+
+    # Respuestas validadas una vez (TypedDicts) y serializadas con orjson, bodies
+    # parseados con orjson (ver app/fastjson.py)
+    FAST_JSON: bool = False
+
+    # Idempotency-Key (POST /orders, POST /checkout/validate): cuánto se guarda
+    # la respuesta, cuántas en memoria y cuánto espera un duplicado concurrente
+    IDEMPOTENCY_TTL_SECONDS: int = 24 * 3600
+    IDEMPOTENCY_CACHE_ENTRIES: int = 10_000
+    IDEMPOTENCY_WAIT_SECONDS: float = 30
+
+    # Rate limiting de las rutas con bcrypt (app/ratelimit.py): "N/segundos"
+    # por IP y por usuario (email). En .env/entorno, como JSON
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMITS: dict[str, dict[str, str]] = {
+        "login": {"ip": "20/60", "username": "5/60"},
+        "create_user": {"ip": "5/60", "username": "3/3600"},
+    }
+    RATE_LIMIT_MAX_KEYS: int = 100_000  # claves (IPs/usuarios) en memoria por límite
+
+    # Stock en memoria para productos de venta flash (app/inventory.py): los
+    # pedidos reservan contra un contador y el descuento en Product.stock se
+    # aplica por lotes cada HOT_INVENTORY_FLUSH_SECONDS. Vacío = desactivado.
+    # Los contadores son por proceso: solo con un worker
+    HOT_INVENTORY_PRODUCT_IDS: list[int] = []
+    HOT_INVENTORY_FLUSH_SECONDS: float = 0.5
+
+    # Escrituras (pedidos, altas, productos) por una cola con group commit
+    # (app/writer.py): hasta MAX_BATCH jobs por transacción, esperando como
+    # mucho MAX_WAIT_MS a que se junten (0 = solo lo que ya esté en cola; subirlo
+    # compensa si el fsync del disco es caro). False = una transacción por petición
+    WRITE_QUEUE_ENABLED: bool = False
+    WRITE_QUEUE_MAX_BATCH: int = 64
+    WRITE_QUEUE_MAX_WAIT_MS: float = 0
+
+    # Profiler de SQL (app/profiler.py): slow-query log con su EXPLAIN (0 = no),
+    # fracción de peticiones en las que se buscan N+1 y se miran presupuestos,
+    # repeticiones de una misma query que cuentan como N+1, y si superar el
+    # presupuesto de una ruta es un error (tests/guards) o solo un aviso
+    SLOW_QUERY_MS: float = 200
+    QUERY_PROFILE_SAMPLE_RATE: float = 0.01
+    N_PLUS_ONE_THRESHOLD: int = 5
+    QUERY_BUDGET_ENFORCE: bool = False
+
+    # Filas por lote (y por transacción) en POST /products/bulk y seed_products
+    PRODUCT_IMPORT_BATCH_SIZE: int = 1000
+    # Máximo de ids + slugs en GET /products/batch
+    PRODUCT_BATCH_MAX_ITEMS: int = 500
+
+    # Cache-Control de las rutas del catálogo (con ETag/Last-Modified, ver
+    # app/http_cache.py): max-age para navegadores, s-maxage para la CDN (0 = no
+    # se pone). Con 0 siempre se revalida, pero la respuesta suele ser un 304
+    HTTP_CACHE_MAX_AGE_SECONDS: int = 0
+    HTTP_CACHE_SHARED_MAX_AGE_SECONDS: int = 0
+
+    # Compresión de respuestas (app/compression.py): tamaño mínimo, nivel por
+    # codificación (las rutas pueden fijar el suyo) y memoria para los bodies
+    # ya comprimidos
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MIN_SIZE: int = 1024
+    COMPRESSION_LEVELS: dict[str, int] = {"gzip": 6, "br": 4, "zstd": 3}
+    COMPRESSION_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
+
+    # Servidor de producción (python -m app.launcher). Workers: 0 = uno por
+    # núcleo disponible. Hilos del threadpool para lo sync (bcrypt, rutas def),
+    # keep-alive HTTP, reinicio de cada worker tras MAX_REQUESTS peticiones
+    # (+ hasta JITTER al azar para que no se reinicien todos a la vez; 0 = nunca)
+    # y cuánto se espera a que un worker termine lo que tiene en curso
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    SERVER_WORKERS: int = 0
+    SERVER_THREADPOOL_SIZE: int = 40
+    SERVER_KEEPALIVE_SECONDS: int = 5
+    SERVER_MAX_REQUESTS: int = 0
+    SERVER_MAX_REQUESTS_JITTER: int = 0
+    SERVER_GRACEFUL_TIMEOUT_SECONDS: int = 30
+    # Proxies de confianza (IPs separadas por comas, "*" = cualquiera): solo si
+    # la conexión viene de uno de ellos se cree X-Forwarded-For, y esa es la IP
+    # con la que cuentan los rate limits por IP. Con el proxy en otra máquina,
+    # su IP (si no, todos los clientes comparten la del proxy y un atacante
+    # bloquea el login de todos); sin proxy, "" (si no, cada petición elige su
+    # IP). "*" solo si el puerto no es accesible más que desde el proxy
+    SERVER_FORWARDED_ALLOW_IPS: str = "127.0.0.1"
+
     class Config:
         env_file = ".env"
 
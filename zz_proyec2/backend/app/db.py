@@ -1,19 +1,347 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Iterable, Optional
+
+from sqlalchemy import event
+from sqlalchemy import inspect as sqlalchemy_inspect
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.schema import CreateIndex, CreateTable
+from sqlalchemy.sql.util import find_tables
 from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 from pathlib import Path
 
+from app.config import settings
+
 BASE_DIR = Path(__file__).resolve().parent
-sqlite_file_path = BASE_DIR / "database.db"
+sqlite_file_path = Path(settings.SQLITE_PATH) if settings.SQLITE_PATH else BASE_DIR / "database.db"
 sqlite_url = f"sqlite:///{sqlite_file_path}"
+async_sqlite_url = f"sqlite+aiosqlite:///{sqlite_file_path}"
+# URI de SQLite en modo solo lectura: el lector nunca puede tomar el lock de escritura
+async_sqlite_ro_url = f"sqlite+aiosqlite:///file:{sqlite_file_path}?mode=ro&uri=true"
 
 connect_args = {"check_same_thread": False}
+
+# Engine sync: DDL (create_all) y scripts como seed_products
 engine = create_engine(sqlite_url, connect_args=connect_args)
 
+# Escritor: una sola conexión. Los escritores esperan turno en el pool (async)
+# en vez de pelearse por el lock de SQLite y acabar en "database is locked".
+write_engine = create_async_engine(async_sqlite_url, pool_size=1, max_overflow=0)
+
+# Lectores: pool de conexiones read-only; con WAL no esperan al escritor
+read_engine = create_async_engine(
+    async_sqlite_ro_url, pool_size=settings.SQLITE_READ_POOL_SIZE, max_overflow=0
+)
+
+
+def _apply_sqlite_profile(dbapi_connection, writable: bool):
+    cursor = dbapi_connection.cursor()
+    if writable:
+        # journal_mode es persistente en el fichero; solo lo fija quien puede escribir
+        cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+    cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+    cursor.execute(f"PRAGMA cache_size={int(settings.SQLITE_CACHE_SIZE)}")
+    cursor.close()
+
+
+@event.listens_for(engine, "connect")
+@event.listens_for(write_engine.sync_engine, "connect")
+def _on_connect_writable(dbapi_connection, connection_record):
+    _apply_sqlite_profile(dbapi_connection, writable=True)
+
+
+# El escritor abre sus transacciones con BEGIN IMMEDIATE explícito (el driver en
+# autocommit): toma el lock al empezar en vez de al primer INSERT y los
+# SAVEPOINT de la cola de escritura (app/writer.py) quedan dentro de la transacción
+@event.listens_for(write_engine.sync_engine, "connect")
+def _on_connect_manual_transactions(dbapi_connection, connection_record):
+    dbapi_connection.isolation_level = None
+
+
+@event.listens_for(write_engine.sync_engine, "begin")
+def _begin_immediate(conn):
+    conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+@event.listens_for(read_engine.sync_engine, "connect")
+def _on_connect_read_only(dbapi_connection, connection_record):
+    _apply_sqlite_profile(dbapi_connection, writable=False)
+
+
+# expire_on_commit=False: tras commit no hay lazy-load implícito (no permitido en async)
+ReadSession = async_sessionmaker(read_engine, class_=AsyncSession, expire_on_commit=False)
+WriteSession = async_sessionmaker(write_engine, class_=AsyncSession, expire_on_commit=False)
+
+
+def schema_fingerprint() -> int:
+    """Hash del DDL de todas las tablas, índices y FTS (31 bits, nunca 0)."""
+    from app.models import analytics, idempotency, inventory, orders, products, users
+    ddl = []
+    for table in SQLModel.metadata.sorted_tables:
+        ddl.append(str(CreateTable(table).compile(engine)))
+        for index in sorted(table.indexes, key=lambda i: i.name):
+            ddl.append(str(CreateIndex(index).compile(engine)))
+    ddl.extend(products.PRODUCT_FTS_DDL)
+    ddl.extend(products.CATALOG_VERSION_DDL)
+    digest = hashlib.sha256("\n".join(ddl).encode()).digest()
+    return int.from_bytes(digest[:4], "big") & 0x7FFFFFFF or 1
+
 
 def create_db_and_tables():
-    from app.models import users
+    from app.models import products
+    # El fingerprint del esquema se guarda en PRAGMA user_version: si coincide,
+    # el fichero ya tiene este esquema y se ahorran las comprobaciones de
+    # create_all (una por tabla e índice) en cada arranque
+    fingerprint = schema_fingerprint()
+    if settings.SKIP_UNCHANGED_SCHEMA:
+        with engine.connect() as conn:
+            if conn.exec_driver_sql("PRAGMA user_version").scalar() == fingerprint:
+                return
+
     SQLModel.metadata.create_all(engine)
+    # create_all solo crea índices junto con tablas nuevas: los índices añadidos
+    # después a tablas ya existentes se crean aquí
+    with engine.begin() as conn:
+        for table in SQLModel.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+        # Búsqueda full-text de productos (FTS5 + triggers)
+        fts_exists = sqlalchemy_inspect(conn).has_table("product_fts")
+        for ddl in products.PRODUCT_FTS_DDL:
+            conn.exec_driver_sql(ddl)
+        if not fts_exists:
+            conn.exec_driver_sql(products.PRODUCT_FTS_REBUILD)
+        # Versión del catálogo (fila única + triggers)
+        for ddl in products.CATALOG_VERSION_DDL:
+            conn.exec_driver_sql(ddl)
+        conn.exec_driver_sql(f"PRAGMA user_version = {fingerprint}")
 
 
 def get_session():
     with Session(engine) as session:
         yield session
+
+
+async def get_read_session():
+    async with ReadSession() as session:
+        yield session
+
+
+async def get_write_session():
+    async with WriteSession() as session:
+        yield session
+
+
+# ---------------------------------------------------------------------------
+# Caché de resultados de queries
+#
+# Cada entrada guarda las versiones de las tablas que leyó la query. Un commit
+# que escribe en una tabla sube su versión, así que solo caducan las entradas
+# que dependen de esa tabla. Cada proceso tiene su propia caché: los commits
+# de otros procesos (otros workers, seed_products, rebuild_analytics) se ven
+# con PRAGMA data_version (QUERY_CACHE_SHARED_CHECK) y caducan toda la caché.
+# ---------------------------------------------------------------------------
+
+
+class DataVersion:
+    """`PRAGMA data_version` de una conexión propia (solo lectura) al fichero.
+
+    Cambia con cada commit hecho por CUALQUIER otra conexión, también las de
+    este proceso (el escritor es otra conexión). Una por proceso: tras un fork
+    se abre otra."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def __call__(self) -> int:
+        with self._lock:
+            if self._pid != os.getpid():
+                self._conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+                self._pid = os.getpid()
+            return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+
+class QueryCache:
+    def __init__(
+        self, max_entries: int, ttl_seconds: float = 0, shared_version: Optional[Callable[[], int]] = None
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # versión global de la BD (commits de otros procesos); va delante de
+        # las de las tablas en cada entrada
+        self.shared_version = shared_version
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._versions: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def versions(self, tables: Iterable[str]) -> tuple:
+        local = tuple(self._versions.get(t, 0) for t in tables)
+        if self.shared_version is None or self.max_entries <= 0:
+            return local
+        return (self.shared_version(), *local)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Valor cacheado o None si no está, caducó o alguna tabla cambió."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, tables, versions, stored_at = entry
+                expired = self.ttl_seconds and time.monotonic() - stored_at > self.ttl_seconds
+                if not expired and versions == self.versions(tables):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, value: Any, tables: tuple, versions: tuple) -> None:
+        """`versions` debe tomarse ANTES de ejecutar la query: si alguien hace
+        commit mientras tanto, la entrada nace ya caducada en vez de obsoleta."""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, tables, versions, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *tables: str) -> None:
+        with self._lock:
+            for t in tables:
+                self._versions[t] = self._versions.get(t, 0) + 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+query_cache = QueryCache(
+    settings.QUERY_CACHE_MAX_ENTRIES,
+    settings.QUERY_CACHE_TTL_SECONDS,
+    DataVersion(sqlite_file_path) if settings.QUERY_CACHE_SHARED_CHECK else None,
+)
+
+
+def _statement_key(stmt) -> tuple[Hashable, tuple]:
+    compiled = stmt.compile(dialect=read_engine.dialect)
+    params = tuple(
+        (k, tuple(v) if isinstance(v, list) else v) for k, v in sorted(compiled.params.items())
+    )
+    tables = tuple(
+        sorted({t.name for t in find_tables(stmt, check_columns=True) if t is not None})
+    )
+    return (str(compiled), params), tables
+
+
+async def cached_all(session: AsyncSession, stmt) -> list:
+    """`session.exec(stmt).all()` pasando por la caché.
+
+    Los objetos devueltos se comparten entre peticiones: solo lectura.
+    """
+    key, tables = _statement_key(stmt)
+    rows = query_cache.get(key)
+    if rows is None:
+        versions = query_cache.versions(tables)
+        rows = (await session.exec(stmt)).all()
+        query_cache.put(key, rows, tables, versions)
+    return rows
+
+
+def cache_put_query(stmt, rows: list) -> None:
+    """Precarga la entrada de `cached_all(stmt)` (p. ej. al calentar la caché)."""
+    key, tables = _statement_key(stmt)
+    query_cache.put(key, rows, tables, query_cache.versions(tables))
+
+
+async def cached_first(session: AsyncSession, stmt):
+    """Primer resultado de `cached_all` (la query debería llevar ya su limit(1))."""
+    rows = await cached_all(session, stmt)
+    return rows[0] if rows else None
+
+
+def _get_key(model, ident) -> Hashable:
+    return ("get", model.__tablename__, ident)
+
+
+async def cached_get(session: AsyncSession, model, ident):
+    """`session.get(model, ident)` pasando por la caché (no cachea los misses)."""
+    key = _get_key(model, ident)
+    obj = query_cache.get(key)
+    if obj is None:
+        tables = (model.__tablename__,)
+        versions = query_cache.versions(tables)
+        obj = await session.get(model, ident)
+        if obj is not None:
+            query_cache.put(key, obj, tables, versions)
+    return obj
+
+
+def cache_put_get(model, obj, versions: Optional[tuple] = None) -> None:
+    """Precarga la entrada de `cached_get` para `obj` (p. ej. al calentar la caché).
+
+    Si `obj` viene de una query, `versions` son las de `model_versions(model)`
+    tomadas antes de ejecutarla (como en `QueryCache.put`)."""
+    tables = (model.__tablename__,)
+    query_cache.put(_get_key(model, obj.id), obj, tables, versions or query_cache.versions(tables))
+
+
+def model_versions(model) -> tuple:
+    return query_cache.versions((model.__tablename__,))
+
+
+def cache_get_many(model, idents: Iterable) -> tuple[dict, list]:
+    """Lo que `cached_get` ya tiene en caché: ({ident: obj}, idents que faltan)."""
+    found, missing = {}, []
+    for ident in idents:
+        obj = query_cache.get(_get_key(model, ident))
+        if obj is None:
+            missing.append(ident)
+        else:
+            found[ident] = obj
+    return found, missing
+
+
+# Invalidación: cada Session apunta las tablas que escribe y, tras el commit,
+# sube su versión. Se escucha en la clase Session para cubrir también las
+# sesiones sync (seed_products) y las async (su sync_session es Session).
+
+def _written_tables(session) -> set:
+    return session.info.setdefault("query_cache_tables", set())
+
+
+@event.listens_for(Session, "after_flush")
+def _track_flushed_tables(session, flush_context):
+    tables = _written_tables(session)
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        table = getattr(obj, "__table__", None)
+        if table is not None:
+            tables.add(table.name)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_dml_tables(orm_execute_state):
+    # UPDATE/INSERT/DELETE explícitos (p. ej. el descuento de stock de create_order)
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        _written_tables(orm_execute_state.session).add(orm_execute_state.statement.table.name)
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_table_versions(session):
+    # Las tablas de un rollback no se limpian: invalidar de más es inocuo
+    tables = session.info.pop("query_cache_tables", None)
+    if tables:
+        query_cache.invalidate(*tables)
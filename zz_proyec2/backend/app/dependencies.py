@@ -1,6 +1,9 @@
 from typing import Annotated
 from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from fastapi import Depends
-from app.db import get_session
+from app.db import get_read_session, get_session, get_write_session
 
 SessionDep = Annotated[Session, Depends(get_session)]
+ReadSessionDep = Annotated[AsyncSession, Depends(get_read_session)]
+WriteSessionDep = Annotated[AsyncSession, Depends(get_write_session)]
@@ -0,0 +1,71 @@
+"""Exportaciones en streaming (GET /orders/export, GET /products/export).
+
+Las filas salen de un cursor del servidor (`yield_per`) y se escriben por
+lotes en la respuesta según llegan: la memoria no depende del número de filas
+y la primera línea se envía sin esperar al resto.
+
+Cada export abre su propia ReadSession: la de las dependencias se cierra
+antes de que termine una StreamingResponse.
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import json
+from datetime import datetime
+from typing import AsyncIterator, Iterable, Literal, Sequence
+
+from fastapi.responses import StreamingResponse
+
+from app.db import ReadSession
+
+ExportFormat = Literal["ndjson", "csv"]
+
+_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+# Filas por lote leído de SQLite (y por trozo escrito en la respuesta)
+YIELD_PER = 1000
+
+
+def _plain(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def json_line(record: dict) -> str:
+    return json.dumps(record, separators=(",", ":"), default=_plain) + "\n"
+
+
+def csv_lines(rows: Iterable[Sequence]) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerows([_plain(v) for v in row] for row in rows)
+    return buffer.getvalue()
+
+
+async def iter_partitions(stmt) -> AsyncIterator[list]:
+    """Filas de `stmt` en lotes de YIELD_PER, sin cargar el resultado entero."""
+    async with ReadSession() as session:
+        result = await session.stream(stmt.execution_options(yield_per=YIELD_PER))
+        async for rows in result.partitions():
+            yield rows
+
+
+async def stream_rows(stmt, fmt: ExportFormat) -> AsyncIterator[str]:
+    """Un `select` de columnas como NDJSON (un objeto por fila) o CSV con cabecera."""
+    columns = list(stmt.selected_columns.keys())
+    if fmt == "csv":
+        yield csv_lines([columns])
+    async for rows in iter_partitions(stmt):
+        if fmt == "csv":
+            yield csv_lines(rows)
+        else:
+            yield "".join(json_line(dict(zip(columns, row))) for row in rows)
+
+
+def export_response(body: AsyncIterator[str], fmt: ExportFormat, name: str) -> StreamingResponse:
+    return StreamingResponse(
+        body,
+        media_type=_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{fmt}"'},
+    )
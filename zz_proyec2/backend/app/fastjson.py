@@ -0,0 +1,113 @@
+"""Modo JSON rápido (opcional, settings.FAST_JSON).
+
+Por defecto FastAPI valida lo que devuelve cada handler contra su
+response_model creando instancias de los modelos (SQLModel, lento), lo vuelve
+a convertir a dicts y lo serializa con json.dumps. Con FAST_JSON:
+
+* la respuesta se valida una sola vez con un TypeAdapter precompilado sobre
+  TypedDicts equivalentes al response_model (sin instanciar modelos) y se
+  serializa con orjson (`FastJSONResponse`, response class por defecto);
+* el body de las peticiones se parsea con orjson antes de validarlo.
+
+Los handlers pueden devolver dicts, filas de `select(columnas)` u objetos ORM
+ya cargados (se leen de su `__dict__`, sin lazy-load). El OpenAPI no cambia.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Mapping
+from functools import lru_cache
+from typing import Annotated, Any, Callable, Coroutine, List, Optional, Union, get_args, get_origin
+
+import orjson
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from pydantic import BaseModel, BeforeValidator, TypeAdapter, ValidationError
+from typing_extensions import TypedDict
+
+from app.config import settings
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content)
+
+
+class _ORJSONRequest(Request):
+    async def json(self) -> Any:
+        # orjson.JSONDecodeError hereda de json.JSONDecodeError: FastAPI lo
+        # sigue convirtiendo en un 422
+        if not hasattr(self, "_json"):
+            self._json = orjson.loads(await self.body())
+        return self._json
+
+
+def _as_dict(value: Any) -> Any:
+    if isinstance(value, Mapping):
+        return value
+    mapping = getattr(value, "_mapping", None)  # Row de select(columnas)
+    if mapping is not None:
+        return mapping
+    # objeto ORM / SQLModel: sus atributos cargados ya son un dict
+    return getattr(value, "__dict__", value)
+
+
+def _plain_type(annotation: Any) -> Any:
+    """Mismo tipo con los modelos cambiados por TypedDicts (recursivo)."""
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return _typed_dict(annotation)
+    origin = get_origin(annotation)
+    if origin in (list, List):
+        return List[_plain_type(get_args(annotation)[0])]
+    if origin is Union:
+        return Union[tuple(_plain_type(arg) for arg in get_args(annotation))]
+    if origin is dict:
+        key, value = get_args(annotation)
+        return dict[key, _plain_type(value)]
+    return annotation
+
+
+@lru_cache(maxsize=None)
+def _typed_dict(model: type[BaseModel]) -> Any:
+    fields = {name: _plain_type(field.annotation) for name, field in model.model_fields.items()}
+    return Annotated[TypedDict(f"{model.__name__}Dict", fields), BeforeValidator(_as_dict)]
+
+
+@lru_cache(maxsize=None)
+def plain_adapter(response_model: Any) -> TypeAdapter:
+    return TypeAdapter(_plain_type(response_model))
+
+
+class _PlainResponseField:
+    """Sustituye al ModelField de la respuesta en el handler (no en el OpenAPI)."""
+
+    def __init__(self, response_model: Any):
+        self.adapter = plain_adapter(response_model)
+
+    def validate(self, value: Any, values: Any = None, *, loc: tuple = ()) -> tuple[Any, Optional[list]]:
+        try:
+            return self.adapter.validate_python(value), None
+        except ValidationError as e:
+            return None, [{**error, "loc": (*loc, *error["loc"])} for error in e.errors(include_url=False)]
+
+    def serialize(self, value: Any, **kwargs: Any) -> Any:
+        # ya son dicts/listas planos: los serializa FastJSONResponse
+        return value
+
+
+class FastJSONRoute(APIRoute):
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        if self.response_field is not None:
+            self.secure_cloned_response_field = _PlainResponseField(self.response_model)
+        handler = super().get_route_handler()
+
+        async def fast_json_handler(request: Request) -> Response:
+            return await handler(_ORJSONRequest(request.scope, request.receive))
+
+        return fast_json_handler
+
+
+# Para APIRouter(route_class=...) y FastAPI(default_response_class=...)
+JSONRoute = FastJSONRoute if settings.FAST_JSON else APIRoute
+DefaultJSONResponse = FastJSONResponse if settings.FAST_JSON else JSONResponse
@@ -0,0 +1,85 @@
+"""GET condicionales (ETag / Last-Modified) y Cache-Control para el catálogo.
+
+Las rutas calculan un ETag fuerte a partir de `Product.updated_at` (o de la
+versión del catálogo, tabla catalog_version, en los listados) ANTES de
+serializar nada. Si el cliente o la CDN ya tienen esa versión
+(`If-None-Match`, o `If-Modified-Since` si no manda ETag) se contesta 304
+sin body.
+
+Todo lo que cambia un producto tiene que subir su updated_at: altas, PATCH,
+carga masiva, descuentos de stock de los pedidos y el flush del stock hot.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request, Response
+
+from app.config import settings
+
+
+def make_etag(*parts) -> str:
+    return '"' + "-".join(str(p) for p in parts) + '"'
+
+
+def _timestamp_us(value: datetime) -> int:
+    return int(value.replace(tzinfo=timezone.utc).timestamp() * 1_000_000)
+
+
+def version_etag(prefix: str, updated_at: Optional[datetime], *parts) -> str:
+    """ETag fuerte a partir de un updated_at (en µs) y lo que distinga la versión."""
+    return make_etag(prefix, *parts, _timestamp_us(updated_at) if updated_at else 0)
+
+
+def http_date(value: datetime) -> str:
+    # updated_at se guarda en UTC naive (datetime.utcnow)
+    return format_datetime(value.replace(tzinfo=timezone.utc, microsecond=0), usegmt=True)
+
+
+def cache_control() -> str:
+    value = f"public, max-age={settings.HTTP_CACHE_MAX_AGE_SECONDS}"
+    if settings.HTTP_CACHE_SHARED_MAX_AGE_SECONDS:
+        value += f", s-maxage={settings.HTTP_CACHE_SHARED_MAX_AGE_SECONDS}"
+    # pasado ese tiempo, ni navegador ni CDN sirven la copia sin revalidarla
+    return value + ", must-revalidate"
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    # comparación débil (RFC 9110): W/"x" vale como "x"
+    if header.strip() == "*":
+        return True
+    return any(candidate.strip().removeprefix("W/") == etag for candidate in header.split(","))
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # con If-None-Match se ignora If-Modified-Since
+        return _etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            return False
+        return last_modified.replace(tzinfo=timezone.utc, microsecond=0) <= since
+    return False
+
+
+def conditional_response(
+    request: Request, response: Response, etag: str, last_modified: Optional[datetime] = None
+) -> Optional[Response]:
+    """304 si el cliente ya tiene esta versión; si no, pone las cabeceras en
+    `response` y devuelve None (la ruta sigue y serializa el body)."""
+    headers = {"ETag": etag, "Cache-Control": cache_control()}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
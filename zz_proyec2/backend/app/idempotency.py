@@ -0,0 +1,270 @@
+"""Idempotency-Key para POST /orders y POST /checkout/validate.
+
+Middleware ASGI: si la petición trae `Idempotency-Key`, la primera respuesta
+se guarda (tabla IdempotencyKey + LRU en memoria) durante
+IDEMPOTENCY_TTL_SECONDS y los reintentos la reciben tal cual, con la cabecera
+`Idempotent-Replayed: true`, sin volver a ejecutar el handler:
+
+* duplicados concurrentes en el mismo proceso esperan al futuro de la
+  petición en curso; en otro worker, sondean la fila "en curso" de la tabla;
+* misma clave con otra petición (body distinto) -> 422;
+* no se guardan 5xx ni respuestas que cambian al reintentar (401, 403, 409,
+  429): el reintento se ejecuta de nuevo.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.sqlite import insert
+
+from app.config import settings
+from app.db import read_engine, write_engine
+from app.models.idempotency import IdempotencyKey
+
+_table = IdempotencyKey.__table__
+
+# Respuestas que no se guardan aunque no sean 5xx
+_RETRYABLE_STATUS = {401, 403, 409, 429}
+
+# Cabeceras que no se guardan (las pone el servidor en cada respuesta)
+_SKIPPED_HEADERS = {b"date", b"server", b"content-length"}
+
+_POLL_SECONDS = 0.05
+_PURGE_EVERY_SECONDS = 600
+
+
+class _Stored:
+    __slots__ = ("fingerprint", "status_code", "headers", "body", "expires_at")
+
+    def __init__(self, fingerprint: str, status_code: int, headers: list, body: bytes, expires_at: datetime):
+        self.fingerprint = fingerprint
+        self.status_code = status_code
+        self.headers = headers
+        self.body = body
+        self.expires_at = expires_at
+
+
+class _ResponseLRU:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, _Stored]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[_Stored]:
+        with self._lock:
+            stored = self._entries.get(key)
+            if stored is None:
+                return None
+            if stored.expires_at <= datetime.utcnow():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return stored
+
+    def put(self, key: str, stored: _Stored) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = stored
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class IdempotencyMiddleware:
+    def __init__(self, app, paths: set[tuple[str, str]]):
+        self.app = app
+        # (método, ruta sin "/" final)
+        self.paths = {(method, path.rstrip("/")) for method, path in paths}
+        self.responses = _ResponseLRU(settings.IDEMPOTENCY_CACHE_ENTRIES)
+        self._in_flight: dict[str, asyncio.Future] = {}
+        self._last_purge = 0.0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or (scope["method"], scope["path"].rstrip("/")) not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        idempotency_key = headers.get(b"idempotency-key")
+        if not idempotency_key:
+            await self.app(scope, receive, send)
+            return
+
+        body = await _read_body(receive)
+        key = hashlib.sha256(
+            b"\0".join((scope["path"].rstrip("/").encode(), headers.get(b"authorization", b""), idempotency_key))
+        ).hexdigest()
+        fingerprint = hashlib.sha256(
+            b"\0".join((scope["method"].encode(), scope["path"].encode(), scope["query_string"], body))
+        ).hexdigest()
+
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+        while True:
+            stored = self.responses.get(key)
+            if stored is not None:
+                await _replay(stored, fingerprint, send)
+                return
+
+            # duplicado concurrente en este proceso: esperar a la primera
+            future = self._in_flight.get(key)
+            if future is not None:
+                try:
+                    await asyncio.wait_for(asyncio.shield(future), deadline - time.monotonic())
+                except asyncio.TimeoutError:
+                    await _send_error(send, 409, "A request with this Idempotency-Key is still in progress")
+                    return
+                continue
+
+            future = asyncio.get_running_loop().create_future()
+            self._in_flight[key] = future
+            try:
+                stored = await self._claim(key, fingerprint, deadline)
+                if stored is None:
+                    await self._execute(scope, body, receive, send, key, fingerprint)
+                    return
+            finally:
+                del self._in_flight[key]
+                future.set_result(None)
+
+            if stored == "busy":
+                await _send_error(send, 409, "A request with this Idempotency-Key is still in progress")
+                return
+            self.responses.put(key, stored)
+            await _replay(stored, fingerprint, send)
+            return
+
+    async def _claim(self, key: str, fingerprint: str, deadline: float):
+        """Reserva la clave en la tabla. None = nos toca ejecutar; si no, la
+        respuesta guardada (o "busy" si otro worker no termina a tiempo)."""
+        now = datetime.utcnow()
+        await self._purge_expired(now)
+        while True:
+            async with write_engine.begin() as conn:
+                claimed = (
+                    await conn.execute(
+                        insert(_table)
+                        .values(
+                            key=key,
+                            fingerprint=fingerprint,
+                            created_at=now,
+                            expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_TTL_SECONDS),
+                        )
+                        .on_conflict_do_nothing()
+                        .returning(_table.c.key)
+                    )
+                ).first()
+            if claimed is not None:
+                return None
+
+            async with read_engine.connect() as conn:
+                row = (await conn.execute(select(_table).where(_table.c.key == key))).first()
+            if row is None:  # se borró entre medias (falló o caducó): reintentar
+                continue
+            if row.expires_at <= datetime.utcnow():
+                async with write_engine.begin() as conn:
+                    await conn.execute(delete(_table).where(_table.c.key == key, _table.c.expires_at == row.expires_at))
+                continue
+            if row.status_code is not None:
+                return _Stored(row.fingerprint, row.status_code, json.loads(row.headers), row.body, row.expires_at)
+            # en curso en otro worker
+            if time.monotonic() >= deadline:
+                return "busy"
+            await asyncio.sleep(_POLL_SECONDS)
+            now = datetime.utcnow()
+
+    async def _execute(self, scope, body: bytes, receive, send, key: str, fingerprint: str) -> None:
+        status_code = 500
+        response_headers: list = []
+        chunks: list[bytes] = []
+        body_sent = False
+
+        async def replay_receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            # después del body, lo que mande el servidor (http.disconnect)
+            return await receive()
+
+        async def capture_send(message):
+            nonlocal status_code, response_headers
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                response_headers = [
+                    [name.decode("latin-1"), value.decode("latin-1")]
+                    for name, value in message.get("headers", [])
+                    if name.lower() not in _SKIPPED_HEADERS
+                ]
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, replay_receive, capture_send)
+        finally:
+            async with write_engine.begin() as conn:
+                if status_code < 500 and status_code not in _RETRYABLE_STATUS:
+                    response_body = b"".join(chunks)
+                    result = await conn.execute(
+                        update(_table)
+                        .where(_table.c.key == key)
+                        .values(status_code=status_code, headers=json.dumps(response_headers), body=response_body)
+                        .returning(_table.c.expires_at)
+                    )
+                    expires_at = result.scalar_one_or_none()
+                    if expires_at is not None:
+                        self.responses.put(
+                            key, _Stored(fingerprint, status_code, response_headers, response_body, expires_at)
+                        )
+                else:
+                    # error o reintentable: liberar la clave para el siguiente intento
+                    await conn.execute(delete(_table).where(_table.c.key == key))
+
+    async def _purge_expired(self, now: datetime) -> None:
+        if time.monotonic() - self._last_purge < _PURGE_EVERY_SECONDS:
+            return
+        self._last_purge = time.monotonic()
+        async with write_engine.begin() as conn:
+            await conn.execute(delete(_table).where(_table.c.expires_at <= now))
+
+
+async def _read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    return b"".join(chunks)
+
+
+async def _replay(stored: _Stored, fingerprint: str, send) -> None:
+    if stored.fingerprint != fingerprint:
+        await _send_error(send, 422, "Idempotency-Key was already used with a different request")
+        return
+    headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in stored.headers]
+    headers.append((b"content-length", str(len(stored.body)).encode()))
+    headers.append((b"idempotent-replayed", b"true"))
+    await send({"type": "http.response.start", "status": stored.status_code, "headers": headers})
+    await send({"type": "http.response.body", "body": stored.body})
+
+
+async def _send_error(send, status_code: int, detail: str) -> None:
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,163 @@
+"""Stock en memoria para productos "hot" (ventas flash), con write-behind.
+
+Para los ids de settings.HOT_INVENTORY_PRODUCT_IDS, create_order reserva el
+stock contra un contador en memoria (reserva/liberación atómicas: sin await
+de por medio) y, en vez de hacer UPDATE de la fila del producto, apunta lo
+vendido en PendingStockDecrement dentro de su transacción. Cada
+HOT_INVENTORY_FLUSH_SECONDS (y al parar) `flush` aplica lo apuntado a
+Product.stock en un solo UPDATE agrupado y lo borra.
+
+Invariante: contador = Product.stock - pendiente en la tabla - reservas de
+pedidos aún sin commit. Al arrancar se aplica lo pendiente y se cargan los
+contadores desde la BD.
+
+Los contadores viven en el proceso: con varios workers cada uno vendería el
+mismo stock. Solo con un worker.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+from datetime import datetime
+from typing import Iterable, Optional
+
+from sqlalchemy import bindparam, delete, func, select, update
+from sqlalchemy.dialects.sqlite import insert
+
+from app.config import settings
+from app.db import query_cache, write_engine
+from app.models.inventory import PendingStockDecrement
+from app.models.products import Product
+
+logger = logging.getLogger(__name__)
+
+_pending = PendingStockDecrement.__table__
+_product = Product.__table__
+
+# create_order: apuntar lo vendido (executemany)
+ADD_PENDING_STOCK = insert(_pending)
+
+
+class InventoryService:
+    def __init__(self, product_ids: Iterable[int], flush_seconds: float):
+        self.hot_ids = frozenset(product_ids)
+        self.flush_seconds = flush_seconds
+        self._available: dict[int, int] = {}
+        self._in_flight: dict[int, int] = {}  # reservado por pedidos sin commit
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.hot_ids)
+
+    def split(self, quantities: dict[int, int]) -> dict[int, int]:
+        """Las líneas de `quantities` que son de productos hot."""
+        return {pid: q for pid, q in quantities.items() if pid in self.hot_ids}
+
+    def available(self, product_id: int) -> Optional[int]:
+        """Stock disponible en memoria, o None si el producto no es hot."""
+        return self._available.get(product_id)
+
+    def reserve(self, quantities: dict[int, int]) -> Optional[int]:
+        """Reserva todo o nada. None si se pudo; si no, el id sin stock suficiente."""
+        with self._lock:
+            for pid, q in quantities.items():
+                if self._available.get(pid, 0) < q:
+                    return pid
+            for pid, q in quantities.items():
+                self._available[pid] -= q
+                self._in_flight[pid] = self._in_flight.get(pid, 0) + q
+        return None
+
+    def confirm(self, quantities: dict[int, int]) -> None:
+        """El pedido hizo commit: lo reservado ya está apuntado en la tabla."""
+        with self._lock:
+            for pid, q in quantities.items():
+                self._in_flight[pid] -= q
+
+    def release(self, quantities: dict[int, int]) -> None:
+        """El pedido falló: devolver lo reservado."""
+        with self._lock:
+            for pid, q in quantities.items():
+                self._available[pid] += q
+                self._in_flight[pid] -= q
+
+    async def reload(self, product_ids: Optional[Iterable[int]] = None) -> None:
+        """Recalcula contadores desde la BD (arranque, o tras cambiar el stock a mano)."""
+        ids = self.hot_ids if product_ids is None else self.hot_ids.intersection(product_ids)
+        if not ids:
+            return
+        pending = (
+            select(func.coalesce(func.sum(_pending.c.quantity), 0))
+            .where(_pending.c.product_id == _product.c.id)
+            .scalar_subquery()
+        )
+        # Por la conexión de escritura (una sola, BEGIN IMMEDIATE): ningún pedido
+        # hace COMMIT entre leer y aplicar, y los que ya lo hicieron confirmaron
+        # su reserva en ese mismo paso (on_commit en create_order). Así lo leído
+        # y _in_flight cuentan cada pedido una sola vez
+        async with write_engine.connect() as conn:
+            rows = (
+                await conn.execute(select(_product.c.id, _product.c.stock - pending).where(_product.c.id.in_(ids)))
+            ).all()
+            with self._lock:
+                for pid, stock in rows:
+                    self._available[pid] = max(0, stock - self._in_flight.get(pid, 0))
+
+    async def flush(self) -> int:
+        """Aplica lo apuntado en PendingStockDecrement a Product.stock. Devuelve filas aplicadas."""
+        async with write_engine.begin() as conn:
+            # con el lock de escritura tomado: nadie apunta entre leer y borrar
+            last_id = (await conn.execute(select(func.max(_pending.c.id)))).scalar()
+            if last_id is None:
+                return 0
+            totals = (
+                await conn.execute(
+                    select(_pending.c.product_id, func.sum(_pending.c.quantity))
+                    .where(_pending.c.id <= last_id)
+                    .group_by(_pending.c.product_id)
+                )
+            ).all()
+            await conn.execute(
+                update(_product)
+                .where(_product.c.id == bindparam("product_id"))
+                .values(stock=_product.c.stock - bindparam("quantity"), updated_at=datetime.utcnow()),
+                [{"product_id": pid, "quantity": q} for pid, q in totals],
+            )
+            result = await conn.execute(delete(_pending).where(_pending.c.id <= last_id))
+        # UPDATE por Core: no pasa por los eventos de Session
+        query_cache.invalidate(Product.__tablename__)
+        return result.rowcount
+
+    async def start(self) -> None:
+        if not self.enabled:
+            return
+        await self.flush()  # lo que quedara de una parada brusca
+        await self.reload()
+        self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await self.flush()
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_seconds)
+            try:
+                await self.flush()
+            except Exception:
+                # lo apuntado sigue en la tabla: se reintenta en la próxima vuelta
+                logger.exception("hot inventory flush failed")
+
+
+inventory = InventoryService(settings.HOT_INVENTORY_PRODUCT_IDS, settings.HOT_INVENTORY_FLUSH_SECONDS)
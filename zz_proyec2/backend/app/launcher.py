@@ -0,0 +1,224 @@
+"""Servidor de producción: uvicorn pre-fork con workers que se reinician.
+
+    python -m app.launcher [--host 0.0.0.0] [--port 8000] [--workers N]
+
+* El proceso padre importa la app, crea/comprueba el esquema y abre el socket
+  ANTES de hacer fork: los workers comparten (copy-on-write) los módulos ya
+  cargados en vez de importarlo todo N veces, y el DDL no se hace en paralelo.
+* uvloop y httptools si están instalados (uvicorn[standard]); si no, asyncio y h11.
+* Workers: settings.SERVER_WORKERS, 0 = uno por núcleo disponible. Threadpool
+  y keep-alive también de Settings (SERVER_*).
+* Con SERVER_MAX_REQUESTS, cada worker termina lo que tiene en curso tras ese
+  número de peticiones (+ un jitter al azar) y el padre lanza otro: acota lo
+  que pueda crecer la memoria sin cortar conexiones.
+* SIGTERM/SIGINT: los workers acaban sus peticiones (hasta
+  SERVER_GRACEFUL_TIMEOUT_SECONDS) y luego se matan.
+* La IP del cliente sale de X-Forwarded-For solo si la conexión viene de
+  SERVER_FORWARDED_ALLOW_IPS (los rate limits por IP cuentan con esa IP); se
+  avisa si es "*".
+* SQLite: todos los workers escriben el mismo fichero. Sin WAL se avisa (los
+  lectores bloquean al escritor), y se avisa/falla con lo que es por proceso
+  (stock hot en memoria, caché de queries sin comprobación entre procesos ni
+  TTL, rate limits, cola de escritura).
+
+Para desarrollo sigue valiendo `uvicorn app.main:app --reload`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import logging
+import os
+import random
+import signal
+import sys
+import time
+
+import uvicorn
+
+from app.config import settings
+
+logger = logging.getLogger("uvicorn.error")
+
+# un worker que muere antes de esto se relanza con una pausa (fallo al arrancar)
+_MIN_WORKER_UPTIME_SECONDS = 1.0
+
+
+def available_cores() -> int:
+    # sched_getaffinity respeta los límites de CPU del contenedor/taskset
+    if hasattr(os, "sched_getaffinity"):
+        return max(1, len(os.sched_getaffinity(0)))
+    return os.cpu_count() or 1
+
+
+def check_deployment(workers: int) -> None:
+    """Avisos (o error) de configuraciones que no funcionan bien con varios procesos."""
+    if settings.RATE_LIMIT_ENABLED and "*" in settings.SERVER_FORWARDED_ALLOW_IPS.split(","):
+        logger.warning(
+            "SERVER_FORWARDED_ALLOW_IPS=* trusts X-Forwarded-For from anyone: a client that reaches the port "
+            "directly can pick the IP its rate limits are counted against. List the proxy IPs instead."
+        )
+    if workers == 1:
+        return
+    if settings.SQLITE_JOURNAL_MODE.upper() != "WAL":
+        logger.warning(
+            "%d workers share one SQLite file with journal_mode=%s: readers and the writer block each other "
+            "and requests fail with 'database is locked'. Use SQLITE_JOURNAL_MODE=WAL.",
+            workers, settings.SQLITE_JOURNAL_MODE,
+        )
+    if settings.HOT_INVENTORY_PRODUCT_IDS:
+        # cada proceso tendría su contador con todo el stock: se vendería N veces
+        raise SystemExit(
+            "HOT_INVENTORY_PRODUCT_IDS keeps stock counters in memory per process; "
+            "with several workers it would oversell. Run with SERVER_WORKERS=1."
+        )
+    if settings.QUERY_CACHE_MAX_ENTRIES and not settings.QUERY_CACHE_SHARED_CHECK:
+        if not settings.QUERY_CACHE_TTL_SECONDS:
+            # una escritura en un worker no caducaría nunca la caché de los demás
+            raise SystemExit(
+                "QUERY_CACHE_SHARED_CHECK=0 without QUERY_CACHE_TTL_SECONDS: with several workers the query "
+                "cache would serve stale rows forever. Enable QUERY_CACHE_SHARED_CHECK or run with SERVER_WORKERS=1."
+            )
+        logger.warning(
+            "QUERY_CACHE_SHARED_CHECK=0 with %d workers: writes in one worker reach the others' cache only "
+            "after QUERY_CACHE_TTL_SECONDS (%gs).",
+            workers, settings.QUERY_CACHE_TTL_SECONDS,
+        )
+    if settings.RATE_LIMIT_ENABLED:
+        logger.warning("rate limits are per process: with %d workers the effective limits are up to %dx.", workers, workers)
+    if settings.WRITE_QUEUE_ENABLED:
+        logger.info("write queue is per process: each worker groups only its own writes.")
+
+
+def _server_config(host: str, port: int) -> uvicorn.Config:
+    from app.main import app  # en el padre: los workers lo heredan ya importado
+
+    return uvicorn.Config(
+        app,
+        host=host,
+        port=port,
+        loop="uvloop" if importlib.util.find_spec("uvloop") else "asyncio",
+        http="httptools" if importlib.util.find_spec("httptools") else "h11",
+        lifespan="on",
+        timeout_keep_alive=settings.SERVER_KEEPALIVE_SECONDS,
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_TIMEOUT_SECONDS,
+        # la IP del cliente (y la de los rate limits) sale de X-Forwarded-For
+        # solo si la conexión viene de un proxy de confianza
+        proxy_headers=bool(settings.SERVER_FORWARDED_ALLOW_IPS),
+        forwarded_allow_ips=settings.SERVER_FORWARDED_ALLOW_IPS or None,
+        access_log=False,
+    )
+
+
+class Supervisor:
+    """Padre pre-fork: lanza los workers, los repone y los para."""
+
+    def __init__(self, config: uvicorn.Config, workers: int):
+        self.config = config
+        self.workers = workers
+        self.children: dict[int, float] = {}  # pid -> arranque (monotonic)
+        self.stopping = False
+
+    def run(self) -> None:
+        # esquema listo antes del fork (cada worker solo verá el fingerprint)
+        # y sin conexiones abiertas que heredar
+        from app.db import create_db_and_tables, engine
+
+        create_db_and_tables()
+        engine.dispose()
+        self.socket = self.config.bind_socket()
+
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        signal.signal(signal.SIGALRM, self._kill)
+        logger.info(
+            "starting %d workers on %s:%d (loop=%s, http=%s)",
+            self.workers, self.config.host, self.config.port, self.config.loop, self.config.http,
+        )
+        for _ in range(self.workers):
+            self._spawn()
+
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            started = self.children.pop(pid, None)
+            if started is None or self.stopping:
+                continue
+            code = os.waitstatus_to_exitcode(status)
+            if code == 0:
+                logger.info("worker %d exited (max requests), starting a new one", pid)
+            else:
+                logger.error("worker %d exited with code %d, starting a new one", pid, code)
+                if time.monotonic() - started < _MIN_WORKER_UPTIME_SECONDS:
+                    time.sleep(_MIN_WORKER_UPTIME_SECONDS)
+            self._spawn()
+        self.socket.close()
+        logger.info("all workers stopped")
+
+    def _spawn(self) -> None:
+        pid = os.fork()
+        if pid:
+            self.children[pid] = time.monotonic()
+            return
+        # hijo: las señales las gestiona uvicorn (terminar lo que hay en curso)
+        code = 1
+        try:
+            for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGALRM):
+                signal.signal(signum, signal.SIG_DFL)
+            if settings.SERVER_MAX_REQUESTS:
+                self.config.limit_max_requests = settings.SERVER_MAX_REQUESTS + random.randint(
+                    0, settings.SERVER_MAX_REQUESTS_JITTER
+                )
+            uvicorn.Server(self.config).run(sockets=[self.socket])
+            code = 0
+        except BaseException:
+            logger.exception("worker %d crashed", os.getpid())
+        finally:
+            logging.shutdown()
+            os._exit(code)
+
+    def _stop(self, signum, frame) -> None:
+        if self.stopping:  # segundo Ctrl+C: sin esperar
+            self._kill(signum, frame)
+            return
+        self.stopping = True
+        logger.info("stopping workers (up to %ds)", settings.SERVER_GRACEFUL_TIMEOUT_SECONDS)
+        for pid in self.children:
+            _signal(pid, signal.SIGTERM)
+        signal.alarm(settings.SERVER_GRACEFUL_TIMEOUT_SECONDS + 5)
+
+    def _kill(self, signum, frame) -> None:
+        for pid in self.children:
+            _signal(pid, signal.SIGKILL)
+
+
+def _signal(pid: int, signum: int) -> None:
+    try:
+        os.kill(pid, signum)
+    except ProcessLookupError:
+        pass
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default=settings.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=settings.SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=settings.SERVER_WORKERS, help="0 = uno por núcleo")
+    args = parser.parse_args()
+
+    config = _server_config(args.host, args.port)  # configura también el logging
+    workers = args.workers or available_cores()
+    check_deployment(workers)
+
+    if not hasattr(os, "fork"):  # Windows: un solo proceso, sin reinicios
+        logger.warning("os.fork is not available: running a single process")
+        uvicorn.Server(config).run()
+        return
+    Supervisor(config, workers).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
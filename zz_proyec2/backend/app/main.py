@@ -1,24 +1,55 @@
 from contextlib import asynccontextmanager
 
+from anyio import to_thread
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from .db import create_db_and_tables
-from .routes import users, health
+from .compression import CompressionMiddleware
+from .config import settings
+from .fastjson import DefaultJSONResponse
+from .idempotency import IdempotencyMiddleware
+from .metrics import MetricsMiddleware
+from .profiler import QueryProfilerMiddleware
+from .inventory import inventory
+from .writer import write_queue
+from .db import ReadSession, create_db_and_tables, read_engine, write_engine
+from .routes import users, health, metrics
 
 from app.routes import products
 from app.routes import checkout
 from app.routes import orders
 from app.routes import auth 
+from app.routes import analytics
 
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    # hilos para run_in_threadpool y las rutas def (anyio trae 40 por defecto)
+    to_thread.current_default_thread_limiter().total_tokens = settings.SERVER_THREADPOOL_SIZE
     create_db_and_tables()
+    async with ReadSession() as session:
+        await products.warm_catalog_cache(session)
+        await products.build_typeahead_index(session)
+    await inventory.start()
     yield
+    await write_queue.stop()
+    await inventory.stop()
+    await read_engine.dispose()
+    await write_engine.dispose()
 
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=DefaultJSONResponse)
+
+# Profiler de SQL (N+1, presupuestos): la más interna, solo cuenta las queries
+# de la ruta (no las de la idempotencia)
+app.add_middleware(QueryProfilerMiddleware)
+
+# Reintentos con Idempotency-Key: va por dentro de CORS para que las
+# respuestas repetidas también lleven sus cabeceras
+app.add_middleware(
+    IdempotencyMiddleware,
+    paths={("POST", "/orders/"), ("POST", "/checkout/validate")},
+)
 
 # Configure CORS policy.
 app.add_middleware(
@@ -29,8 +60,17 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Before-Id", "X-Next-Cursor", "Idempotent-Replayed"],
 )
 
+# Compresión (gzip/br/zstd): por fuera de la idempotencia y de CORS, así
+# también se comprimen las respuestas repetidas
+app.add_middleware(CompressionMiddleware)
+
+# Métricas (GET /metrics): la más externa, mide todo lo de dentro (los bytes
+# que salen ya comprimidos)
+app.add_middleware(MetricsMiddleware)
+
 # Register API routers.
 app.include_router(users.router)
 app.include_router(auth.router)
@@ -38,5 +78,7 @@ app.include_router(auth.router)
 app.include_router(orders.router)
 app.include_router(checkout.router)
 app.include_router(products.router)
+app.include_router(analytics.router)
 
 app.include_router(health.router)
+app.include_router(metrics.router)
@@ -0,0 +1,219 @@
+"""Métricas de la API en formato de texto de Prometheus (GET /metrics).
+
+* Peticiones HTTP por (método, ruta): total por status, histograma de latencia
+  (hasta el último byte del body), histograma de tamaño de respuesta, y en
+  vuelo. La ruta es la plantilla ("/products/{product_id}"), nunca el path
+  real: las series no crecen con los ids. Lo que no casa con ninguna ruta
+  cuenta como "unmatched".
+* SQL: sentencias y tiempo por engine (eventos de SQLAlchemy en engine,
+  write_engine y read_engine) y, por petición, histogramas de sentencias y de
+  tiempo en BD. La petición en curso se sigue con un ContextVar (SQLAlchemy lo
+  propaga a sus greenlets y anyio a sus hilos).
+* Compresión: CPU, bytes y caché por codificación (contadores de app/compression.py).
+
+Sin dependencias ni locks: contadores en listas y dicts que se tocan desde el
+event loop (los eventos de SQL del engine sync pueden llegar desde hilos; en
+el peor caso se pierde algún incremento). El coste por petición está en
+benchmarks/metrics_overhead.py.
+"""
+
+from __future__ import annotations
+
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Iterable, Optional
+
+from sqlalchemy import event
+
+from app import compression
+from app.db import engine, read_engine, write_engine
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+DB_STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+DB_TIME_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1.0)
+
+
+class Histogram:
+    """Cuentas por bucket (no acumuladas: se acumulan al exportar) + suma."""
+
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: tuple):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # el último es +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+class _RouteStats:
+    __slots__ = ("statuses", "duration", "size", "db_statements", "db_seconds")
+
+    def __init__(self):
+        self.statuses: dict[int, int] = {}
+        self.duration = Histogram(DURATION_BUCKETS)
+        self.size = Histogram(SIZE_BUCKETS)
+        self.db_statements = Histogram(DB_STATEMENT_BUCKETS)
+        self.db_seconds = Histogram(DB_TIME_BUCKETS)
+
+
+# (método, plantilla de ruta) -> estadísticas
+_routes: dict[tuple[str, str], _RouteStats] = {}
+_in_flight = [0]
+
+# engine -> [sentencias, segundos]
+_db_totals: dict[str, list] = {}
+
+# [sentencias, segundos] de la petición en curso
+_current_request: ContextVar[Optional[list]] = ContextVar("metrics_request", default=None)
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        db = [0, 0.0]
+        token = _current_request.set(db)
+        status_code = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status_code, size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        _in_flight[0] += 1
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _in_flight[0] -= 1
+            _current_request.reset(token)
+            route = scope.get("route")
+            key = (scope["method"], getattr(route, "path", "unmatched"))
+            stats = _routes.get(key)
+            if stats is None:
+                stats = _routes[key] = _RouteStats()
+            stats.statuses[status_code] = stats.statuses.get(status_code, 0) + 1
+            stats.duration.observe(time.perf_counter() - start)
+            stats.size.observe(size)
+            stats.db_statements.observe(db[0])
+            stats.db_seconds.observe(db[1])
+
+
+# ---------------------------------------------------------------------------
+# SQL
+# ---------------------------------------------------------------------------
+
+
+def _instrument(sync_engine, name: str) -> None:
+    totals = _db_totals.setdefault(name, [0, 0.0])
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info["metrics_start"] = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info.pop("metrics_start", time.perf_counter())
+        totals[0] += 1
+        totals[1] += elapsed
+        request = _current_request.get()
+        if request is not None:
+            request[0] += 1
+            request[1] += elapsed
+
+
+_instrument(engine, "sync")
+_instrument(write_engine.sync_engine, "write")
+_instrument(read_engine.sync_engine, "read")
+
+
+# ---------------------------------------------------------------------------
+# Exportación (text format 0.0.4)
+# ---------------------------------------------------------------------------
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _labels(**labels) -> str:
+    parts = []
+    for name, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{name}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _format_bound(bound) -> str:
+    return repr(float(bound)) if isinstance(bound, float) else str(bound)
+
+
+def _histogram_lines(name: str, labels: dict, histogram: Histogram) -> Iterable[str]:
+    cumulative = 0
+    for bound, count in zip(histogram.bounds, histogram.counts):
+        cumulative += count
+        yield f"{name}_bucket{_labels(**labels, le=_format_bound(bound))} {cumulative}"
+    cumulative += histogram.counts[-1]
+    yield f"{name}_bucket{_labels(**labels, le='+Inf')} {cumulative}"
+    yield f"{name}_sum{_labels(**labels)} {histogram.sum}"
+    yield f"{name}_count{_labels(**labels)} {cumulative}"
+
+
+def _header(name: str, kind: str, help_text: str) -> list[str]:
+    return [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+
+
+def render() -> str:
+    routes = sorted(_routes.items())
+    lines = _header("http_requests_total", "counter", "HTTP requests by method, route and status.")
+    for (method, route), stats in routes:
+        for status_code, count in sorted(stats.statuses.items()):
+            lines.append(f"http_requests_total{_labels(method=method, route=route, status=status_code)} {count}")
+
+    lines += _header("http_requests_in_flight", "gauge", "HTTP requests being served.")
+    lines.append(f"http_requests_in_flight {_in_flight[0]}")
+
+    histograms = (
+        ("http_request_duration_seconds", "duration", "Time until the last byte of the response."),
+        ("http_response_size_bytes", "size", "Response body size."),
+        ("http_request_db_statements", "db_statements", "SQL statements run per request."),
+        ("http_request_db_seconds", "db_seconds", "Time spent running SQL per request."),
+    )
+    for name, attribute, help_text in histograms:
+        lines += _header(name, "histogram", help_text)
+        for (method, route), stats in routes:
+            lines.extend(_histogram_lines(name, {"method": method, "route": route}, getattr(stats, attribute)))
+
+    lines += _header("db_statements_total", "counter", "SQL statements by engine.")
+    for name, (count, _) in sorted(_db_totals.items()):
+        lines.append(f"db_statements_total{_labels(engine=name)} {count}")
+    lines += _header("db_statement_seconds_total", "counter", "Time spent running SQL by engine.")
+    for name, (_, seconds) in sorted(_db_totals.items()):
+        lines.append(f"db_statement_seconds_total{_labels(engine=name)} {seconds}")
+
+    counters = (
+        ("http_compression_cpu_seconds_total", 0, "CPU time spent compressing responses."),
+        ("http_compression_input_bytes_total", 1, "Response bytes before compression (cache misses)."),
+        ("http_compression_output_bytes_total", 2, "Response bytes after compression (cache misses)."),
+        ("http_compression_cache_hits_total", 3, "Responses served from the compressed-body cache."),
+        ("http_compression_cache_misses_total", 4, "Responses compressed on the spot."),
+    )
+    for name, index, help_text in counters:
+        lines += _header(name, "counter", help_text)
+        for encoding, values in sorted(compression.stats.items()):
+            lines.append(f"{name}{_labels(encoding=encoding)} {values[index]}")
+    lines += _header("http_compression_cache_bytes", "gauge", "Size of the compressed-body cache.")
+    lines.append(f"http_compression_cache_bytes {compression.compressed_cache.size}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+from datetime import date
+
+from sqlalchemy import Index
+from sqlmodel import SQLModel, Field
+
+
+# Rollups de ventas (tablas)
+#
+# Se actualizan en la misma transacción que create_order (app/analytics.py) y
+# se pueden reconstruir desde Order/OrderItem con rebuild_analytics.py. Los
+# endpoints de /analytics solo leen de aquí: su coste depende de los días y
+# productos consultados, no del número de pedidos.
+
+class ProductDailySalesBase(SQLModel):
+    day: date
+    currency: str
+    product_id: int
+    orders: int = 0  # pedidos que incluyen el producto
+    units: int = 0
+    revenue_cents: int = 0
+
+
+class ProductDailySales(ProductDailySalesBase, table=True):
+    # PK (day, currency, product_id): top ventas por rango de días.
+    # (product_id, day): serie diaria de un producto
+    __table_args__ = (Index("ix_productdailysales_product_id_day", "product_id", "day"),)
+
+    day: date = Field(primary_key=True)
+    currency: str = Field(primary_key=True)
+    product_id: int = Field(primary_key=True, foreign_key="product.id")
+
+
+class CurrencyDailySales(SQLModel, table=True):
+    day: date = Field(primary_key=True)
+    currency: str = Field(primary_key=True)
+    orders: int = 0
+    units: int = 0
+    revenue_cents: int = 0
+
+
+# Schemas (no tabla)
+
+class ProductDailySalesPublic(ProductDailySalesBase):
+    pass
+
+
+class CurrencyDailySalesPublic(SQLModel):
+    day: date
+    currency: str
+    orders: int
+    units: int
+    revenue_cents: int
+
+
+class TopProduct(SQLModel):
+    product_id: int
+    title: str
+    currency: str
+    orders: int
+    units: int
+    revenue_cents: int
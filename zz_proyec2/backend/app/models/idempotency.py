@@ -0,0 +1,21 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import LargeBinary
+from sqlmodel import SQLModel, Field
+
+
+# Respuestas guardadas por Idempotency-Key (ver app/idempotency.py)
+
+class IdempotencyKey(SQLModel, table=True):
+    # sha256(ruta + Authorization + Idempotency-Key): la clave es por cliente
+    key: str = Field(primary_key=True)
+    # sha256 de método, ruta, query y body: misma clave con otra petición = 422
+    fingerprint: str
+    status_code: Optional[int] = None  # None = petición en curso
+    headers: str = "[]"  # JSON [[nombre, valor], ...]
+    body: bytes = Field(default=b"", sa_type=LargeBinary)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    expires_at: datetime = Field(index=True)
@@ -0,0 +1,17 @@
+from __future__ import annotations
+
+from typing import Optional
+
+from sqlmodel import SQLModel, Field
+
+
+# Descuentos de stock pendientes de productos "hot" (ver app/inventory.py)
+#
+# create_order apunta aquí lo vendido, en su misma transacción, en vez de
+# actualizar la fila del producto; el flush lo aplica a Product.stock por lotes
+# y borra lo aplicado. Lo que quede tras una caída se aplica al arrancar.
+
+class PendingStockDecrement(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    product_id: int = Field(foreign_key="product.id", index=True)
+    quantity: int = Field(ge=1)
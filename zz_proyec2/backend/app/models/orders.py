@@ -1,6 +1,7 @@
 from datetime import datetime
 from typing import Optional, List
 
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field, Relationship
 
 
@@ -13,8 +14,15 @@ class OrderBase(SQLModel):
 
 
 class Order(OrderBase, table=True):
+    # (user_id, id): historial por usuario ordenado por id sin sort extra (keyset)
+    # (created_at, id): export por rango de fechas en orden, sin sort extra
+    __table_args__ = (
+        Index("ix_order_user_id_id", "user_id", "id"),
+        Index("ix_order_created_at_id", "created_at", "id"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
-    user_id: int = Field(foreign_key="user.id", index=True)
+    user_id: int = Field(foreign_key="user.id")
 
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
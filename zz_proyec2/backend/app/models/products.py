@@ -1,8 +1,10 @@
 from __future__ import annotations
 
+import re
 from datetime import datetime
 from typing import Optional
 
+from sqlalchemy import DateTime, Index, column, table
 from sqlmodel import SQLModel, Field
 
 
@@ -18,12 +20,99 @@ class ProductBase(SQLModel):
 
 
 class Product(ProductBase, table=True):
+    # Un índice por orden de GET /products (keyset: clave de orden + id)
+    __table_args__ = (
+        Index("ix_product_price_cents_id", "price_cents", "id"),
+        Index("ix_product_created_at_id", "created_at", "id"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
 
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
 
+# Índice full-text (FTS5) sobre title/description
+#
+# Tabla "external content": no duplica el texto, lee de product. Los triggers
+# la mantienen sincronizada con cualquier escritura (ORM, UPDATE directos,
+# seed). El de UPDATE solo salta si cambian title/description, así que los
+# descuentos de stock no tocan el índice.
+
+product_fts = table("product_fts", column("rowid"), column("title"), column("description"))
+
+PRODUCT_FTS_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS product_fts USING fts5(
+        title, description,
+        content='product', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS product_fts_ai AFTER INSERT ON product BEGIN
+        INSERT INTO product_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS product_fts_ad AFTER DELETE ON product BEGIN
+        INSERT INTO product_fts(product_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS product_fts_au AFTER UPDATE OF title, description ON product BEGIN
+        INSERT INTO product_fts(product_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO product_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END""",
+]
+
+# Reconstruye el índice desde product (tablas ya existentes antes del FTS)
+PRODUCT_FTS_REBUILD = "INSERT INTO product_fts(product_fts) VALUES ('rebuild')"
+
+
+# Versión del catálogo (ETag/Last-Modified de GET /products)
+#
+# Una sola fila que los triggers tocan en cada INSERT/UPDATE/DELETE de product:
+# el listado la lee por clave primaria en vez de recorrer la tabla (count + max).
+# updated_at con el mismo formato que guarda SQLAlchemy (µs, UTC).
+
+catalog_version = table("catalog_version", column("version"), column("updated_at", DateTime))
+
+_NOW_US = "strftime('%Y-%m-%d %H:%M:%f000', 'now')"
+_BUMP_CATALOG_VERSION = (
+    f"UPDATE catalog_version SET version = version + 1, updated_at = {_NOW_US} WHERE id = 1;"
+)
+
+CATALOG_VERSION_DDL = [
+    """CREATE TABLE IF NOT EXISTS catalog_version (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        version INTEGER NOT NULL,
+        updated_at DATETIME NOT NULL
+    )""",
+    f"""INSERT OR IGNORE INTO catalog_version (id, version, updated_at)
+        VALUES (1, 0, COALESCE((SELECT max(updated_at) FROM product), {_NOW_US}))""",
+    f"""CREATE TRIGGER IF NOT EXISTS product_version_ai AFTER INSERT ON product BEGIN
+        {_BUMP_CATALOG_VERSION}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS product_version_au AFTER UPDATE ON product BEGIN
+        {_BUMP_CATALOG_VERSION}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS product_version_ad AFTER DELETE ON product BEGIN
+        {_BUMP_CATALOG_VERSION}
+    END""",
+]
+
+_FTS_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def fts_match_expression(q: str) -> Optional[str]:
+    """Convierte texto libre en una query MATCH segura: cada palabra entre
+    comillas (sin sintaxis FTS del usuario), como prefijo y todas obligatorias.
+    "mech key" -> '"mech"* "key"*'. None si no hay ninguna palabra."""
+    tokens = _FTS_TOKEN_RE.findall(q)
+    if not tokens:
+        return None
+    return " ".join(f'"{t}"*' for t in tokens)
+
+
 # Schemas (no tabla)
 
 class ProductCreate(ProductBase):
@@ -43,3 +132,33 @@ class ProductPublic(ProductBase):
     id: int
     created_at: datetime
     updated_at: datetime
+
+
+class ProductBatch(SQLModel):
+    # clave = id del producto (como texto, igual que en el JSON), en el orden
+    # pedido: primero los ids, luego los slugs
+    items: dict[str, ProductPublic]
+    missing_ids: list[int]
+    missing_slugs: list[str]
+
+
+class ProductSuggestion(SQLModel):
+    id: int
+    title: str
+    slug: str
+
+
+class ProductImportError(SQLModel):
+    batch: int
+    line: Optional[int] = None
+    error: str
+
+
+class ProductImportReport(SQLModel):
+    format: str
+    rows: int
+    upserted: int
+    failed: int
+    batches: int
+    errors: list[ProductImportError]
+    errors_truncated: bool
@@ -0,0 +1,148 @@
+"""Carga masiva de productos (POST /products/bulk y seed_products.py).
+
+Lee NDJSON (un objeto por línea) o CSV (con cabecera) en streaming y hace
+upsert por lotes con `INSERT ... ON CONFLICT(slug) DO UPDATE`: una sentencia
+y una transacción por lote, nada de SELECT previo por slug. Solo hay en
+memoria un lote cada vez, sea cual sea el tamaño del fichero.
+
+Usa el engine sync (`app.db.engine`), el mismo que seed_products.
+"""
+
+from __future__ import annotations
+
+import csv
+import json
+from datetime import datetime
+from typing import Callable, Iterable, Iterator, Optional, TextIO
+
+from pydantic import ValidationError
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.db import engine, query_cache
+from app.models.products import ProductCreate, Product
+
+FORMATS = ("ndjson", "csv")
+
+# Errores que se devuelven como mucho en el informe (el resto solo se cuentan)
+MAX_REPORTED_ERRORS = 1000
+
+_UPDATED_COLUMNS = ("title", "description", "price_cents", "currency", "stock", "updated_at")
+
+
+def _upsert_stmt():
+    stmt = insert(Product)
+    return stmt.on_conflict_do_update(
+        index_elements=[Product.slug],
+        set_={name: stmt.excluded[name] for name in _UPDATED_COLUMNS},
+    ).returning(Product.id, Product.title, Product.slug)
+
+
+_UPSERT = _upsert_stmt()
+
+
+def _parse_rows(text: TextIO, fmt: str) -> Iterator[tuple[int, object]]:
+    """(línea, dict) por cada registro, o (línea, str con el error) si no se puede leer."""
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        for row in reader:
+            # Celdas vacías = valor por defecto del modelo
+            yield reader.line_num, {k: v for k, v in row.items() if k and v not in ("", None)}
+        return
+
+    for line_no, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError as e:
+            yield line_no, f"Invalid JSON: {e}"
+            continue
+        yield line_no, data if isinstance(data, dict) else "Expected a JSON object"
+
+
+def upsert_products(products: Iterable[ProductCreate]) -> list:
+    """Upsert de un lote por slug en una transacción. Devuelve (id, title, slug)."""
+    now = datetime.utcnow()
+    # Un slug repetido dentro del lote: gana el último, como en un fichero
+    rows = {
+        p.slug: {**p.model_dump(), "created_at": now, "updated_at": now}
+        for p in products
+    }
+    if not rows:
+        return []
+    with engine.begin() as conn:
+        written = conn.execute(_UPSERT, list(rows.values())).all()
+    # Core no pasa por los eventos de Session: invalidar a mano
+    query_cache.invalidate(Product.__tablename__)
+    return written
+
+
+def import_products(
+    text: TextIO,
+    fmt: str = "ndjson",
+    batch_size: int = 1000,
+    on_batch: Optional[Callable[[list], None]] = None,
+) -> dict:
+    """Importa todo `text` por lotes de `batch_size` y devuelve el informe.
+
+    Las filas inválidas se saltan y se informan con su lote y línea; si un lote
+    falla en la BD se deshace entero y se sigue con el siguiente.
+    `on_batch` recibe las filas (id, title, slug) de cada lote escrito.
+    """
+    report = {
+        "format": fmt,
+        "rows": 0,
+        "upserted": 0,
+        "failed": 0,
+        "batches": 0,
+        "errors": [],
+        "errors_truncated": False,
+    }
+
+    def add_error(batch: int, line: Optional[int], error: str) -> None:
+        if len(report["errors"]) < MAX_REPORTED_ERRORS:
+            report["errors"].append({"batch": batch, "line": line, "error": error})
+        else:
+            report["errors_truncated"] = True
+
+    def flush(products: list[ProductCreate], first_line: int) -> None:
+        report["batches"] += 1
+        if not products:
+            return
+        try:
+            written = upsert_products(products)
+        except SQLAlchemyError as e:
+            report["failed"] += len(products)
+            add_error(report["batches"], first_line, f"Batch failed: {getattr(e, 'orig', None) or e}")
+            return
+        report["upserted"] += len(written)
+        if on_batch is not None:
+            on_batch(written)
+
+    batch: list[ProductCreate] = []
+    pending = 0  # filas leídas en el lote actual (válidas o no)
+    first_line = 1
+    for line_no, data in _parse_rows(text, fmt):
+        if pending == 0:
+            first_line = line_no
+        report["rows"] += 1
+        pending += 1
+        if isinstance(data, str):
+            report["failed"] += 1
+            add_error(report["batches"] + 1, line_no, data)
+        else:
+            try:
+                batch.append(ProductCreate.model_validate(data))
+            except ValidationError as e:
+                report["failed"] += 1
+                errors = "; ".join(
+                    f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()
+                )
+                add_error(report["batches"] + 1, line_no, errors)
+        if pending >= batch_size:
+            flush(batch, first_line)
+            batch, pending = [], 0
+    if pending:
+        flush(batch, first_line)
+    return report
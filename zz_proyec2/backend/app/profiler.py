@@ -0,0 +1,200 @@
+"""Profiler de SQL: slow-query log, detector de N+1 y presupuestos de queries.
+
+* Slow-query log (todas las sentencias, SLOW_QUERY_MS > 0): las que tardan
+  más se registran en el logger "app.profiler" con su EXPLAIN QUERY PLAN. El
+  plan se saca una vez por forma de query, en una conexión read-only aparte.
+* Por petición, en una fracción QUERY_PROFILE_SAMPLE_RATE de ellas (todas si
+  QUERY_BUDGET_ENFORCE):
+  - N+1: la misma forma de sentencia (parámetros fuera, listas IN y filas de
+    VALUES plegadas) repetida N_PLUS_ONE_THRESHOLD veces o más se avisa al
+    terminar;
+  - presupuesto: una ruta lo declara con `dependencies=[query_budget(n)]`. Si
+    se pasa, se avisa; con QUERY_BUDGET_ENFORCE (tests, guards) la sentencia
+    que lo supera lanza QueryBudgetExceeded y la petición acaba en 500.
+
+Las sentencias de control de transacción (BEGIN, SAVEPOINT, RELEASE...) no
+cuentan. Sin muestrear, el coste es comparar un tiempo por sentencia.
+"""
+
+from __future__ import annotations
+
+import logging
+import random
+import re
+import sqlite3
+import threading
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from fastapi import Depends
+from sqlalchemy import event
+
+from app.config import settings
+from app.db import engine, read_engine, sqlite_file_path, write_engine
+
+logger = logging.getLogger(__name__)
+
+_TRANSACTION_CONTROL = ("BEGIN", "SAVEPOINT", "RELEASE", "ROLLBACK", "COMMIT", "PRAGMA")
+_EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+
+# "IN (?, ?, ?)" -> "IN (?...)"; "VALUES (?...), (?...)" -> "VALUES (?...)"
+_PARAM_GROUP = re.compile(r"\((?:\?, )+\?\)")
+_REPEATED_GROUPS = re.compile(r"\(\?\.\.\.\)(?:, \(\?\.\.\.\))+")
+
+_MAX_CACHED_SHAPES = 2000
+
+
+class QueryBudgetExceeded(RuntimeError):
+    pass
+
+
+class QueryProfile:
+    """Sentencias de una petición muestreada."""
+
+    __slots__ = ("scope", "statements", "shapes", "budget")
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.statements = 0
+        self.shapes: dict[str, int] = {}
+        self.budget: Optional[int] = None
+
+    @property
+    def route(self) -> str:
+        route = self.scope.get("route")
+        return f"{self.scope['method']} {getattr(route, 'path', self.scope['path'])}"
+
+
+_current_profile: ContextVar[Optional[QueryProfile]] = ContextVar("query_profile", default=None)
+
+_shapes: dict[str, Optional[str]] = {}  # sentencia -> forma (None = control de transacción)
+_plans: dict[str, str] = {}  # forma -> EXPLAIN QUERY PLAN
+_explain_lock = threading.Lock()
+_explain_conn: Optional[sqlite3.Connection] = None
+
+
+def statement_shape(statement: str) -> Optional[str]:
+    shape = _shapes.get(statement, "")
+    if shape == "":
+        head = statement.lstrip()[:9].upper()
+        if head.startswith(_TRANSACTION_CONTROL):
+            shape = None
+        else:
+            shape = _REPEATED_GROUPS.sub("(?...)", _PARAM_GROUP.sub("(?...)", " ".join(statement.split())))
+        if len(_shapes) >= _MAX_CACHED_SHAPES:
+            _shapes.clear()
+        _shapes[statement] = shape
+    return shape
+
+
+def explain(statement: str, parameters) -> str:
+    """EXPLAIN QUERY PLAN en una conexión read-only propia (no toca la de la query)."""
+    global _explain_conn
+    with _explain_lock:
+        try:
+            if _explain_conn is None:
+                _explain_conn = sqlite3.connect(f"file:{sqlite_file_path}?mode=ro", uri=True, check_same_thread=False)
+            rows = _explain_conn.execute(f"EXPLAIN QUERY PLAN {statement}", parameters or ()).fetchall()
+        except sqlite3.Error as e:
+            return f"(plan unavailable: {e})"
+    # (id, parent, notused, detail): sangría según la profundidad
+    depth = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node_id] + detail)
+    return "\n".join(lines)
+
+
+def _log_slow(statement: str, parameters, executemany: bool, elapsed: float) -> None:
+    shape = statement_shape(statement)
+    if shape is None:
+        return
+    plan = _plans.get(shape)
+    if plan is None and shape.lstrip().upper().startswith(_EXPLAINABLE):
+        plan = explain(statement, parameters[0] if executemany and parameters else parameters)
+        if len(_plans) >= _MAX_CACHED_SHAPES:
+            _plans.clear()
+        _plans[shape] = plan
+    profile = _current_profile.get()
+    logger.warning(
+        "slow query %.1f ms%s: %s\nquery plan:\n%s",
+        elapsed * 1000,
+        f" in {profile.route}" if profile is not None else "",
+        shape,
+        plan or "(none)",
+    )
+
+
+def _instrument(sync_engine) -> None:
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info["profiler_start"] = time.perf_counter()
+        profile = _current_profile.get()
+        if profile is None:
+            return
+        shape = statement_shape(statement)
+        if shape is None:
+            return
+        profile.statements += 1
+        profile.shapes[shape] = profile.shapes.get(shape, 0) + 1
+        if settings.QUERY_BUDGET_ENFORCE and profile.budget is not None and profile.statements > profile.budget:
+            raise QueryBudgetExceeded(
+                f"{profile.route}: statement {profile.statements} exceeds the budget of {profile.budget}: {shape}"
+            )
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info.pop("profiler_start", time.perf_counter())
+        if settings.SLOW_QUERY_MS and elapsed * 1000 >= settings.SLOW_QUERY_MS:
+            _log_slow(statement, parameters, executemany, elapsed)
+
+
+_instrument(engine)
+_instrument(write_engine.sync_engine)
+_instrument(read_engine.sync_engine)
+
+
+class QueryProfilerMiddleware:
+    """Abre un QueryProfile para las peticiones muestreadas y avisa al acabar."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not (
+            settings.QUERY_BUDGET_ENFORCE or random.random() < settings.QUERY_PROFILE_SAMPLE_RATE
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        profile = QueryProfile(scope)
+        token = _current_profile.set(profile)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current_profile.reset(token)
+            _report(profile)
+
+
+def _report(profile: QueryProfile) -> None:
+    for shape, count in profile.shapes.items():
+        if count >= settings.N_PLUS_ONE_THRESHOLD:
+            logger.warning("possible N+1 in %s: %d x %s", profile.route, count, shape)
+    if profile.budget is not None and profile.statements > profile.budget:
+        logger.warning(
+            "query budget exceeded in %s: %d statements (budget %d)",
+            profile.route, profile.statements, profile.budget,
+        )
+
+
+def query_budget(max_statements: int):
+    """Dependencia de ruta: como mucho `max_statements` sentencias SQL por petición."""
+
+    async def set_budget() -> None:
+        profile = _current_profile.get()
+        if profile is not None:
+            profile.budget = max_statements
+
+    return Depends(set_budget)
@@ -0,0 +1,105 @@
+"""Rate limiting con token buckets en memoria (login y registro: bcrypt).
+
+Cada ruta tiene sus límites en settings.RATE_LIMITS, por IP y por usuario
+(email), con el formato "N/segundos": ráfaga de N y N fichas repuestas cada
+`segundos`. Un 429 se decide antes de abrir sesión de BD o tocar bcrypt.
+
+* O(1) por petición: dict ordenado clave -> [fichas, instante]; el relleno se
+  calcula al consultar (nada de timers).
+* Memoria acotada: como mucho RATE_LIMIT_MAX_KEYS claves por límite; se
+  descarta la menos usada (vuelve con el bucket lleno, que es lo que tendría
+  tras estar inactiva).
+* Por proceso: con N workers el límite efectivo es hasta N veces mayor.
+* La IP es la del cliente real solo si uvicorn confía en el proxy que tiene
+  delante (SERVER_FORWARDED_ALLOW_IPS, ver app/launcher.py): si no, es la del
+  proxy (un límite para todos) o, confiando en cualquiera, la que diga
+  X-Forwarded-For (uno nuevo por petición).
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from fastapi import Depends, HTTPException, Request, status
+
+from app.config import settings
+
+
+def parse_limit(spec: str) -> tuple[int, float]:
+    """"10/60" -> (10, 60.0)."""
+    capacity, per_seconds = spec.split("/")
+    return int(capacity), float(per_seconds)
+
+
+class TokenBucketLimiter:
+    def __init__(self, capacity: int, per_seconds: float, max_keys: int):
+        self.capacity = capacity
+        self.rate = capacity / per_seconds  # fichas por segundo
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, list[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key: str) -> float:
+        """Gasta una ficha de `key`. 0 si pasa; si no, segundos hasta la siguiente."""
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = [float(self.capacity), now]
+                self._buckets[key] = bucket
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(self.capacity, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return 0.0
+            return (1 - bucket[0]) / self.rate
+
+
+_limiters: dict[tuple[str, str], Optional[TokenBucketLimiter]] = {}
+
+
+def _limiter(route: str, scope: str) -> Optional[TokenBucketLimiter]:
+    key = (route, scope)
+    if key not in _limiters:
+        spec = settings.RATE_LIMITS.get(route, {}).get(scope) if settings.RATE_LIMIT_ENABLED else None
+        _limiters[key] = (
+            TokenBucketLimiter(*parse_limit(spec), settings.RATE_LIMIT_MAX_KEYS) if spec else None
+        )
+    return _limiters[key]
+
+
+def check_rate_limit(route: str, scope: str, key: str) -> None:
+    """429 (con Retry-After) si `key` agotó su límite `scope` ("ip"/"username") en `route`."""
+    limiter = _limiter(route, scope)
+    if limiter is None:
+        return
+    retry_after = limiter.hit(key)
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests, please try again later",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+
+
+def client_ip(request: Request) -> str:
+    """IP del cliente; uvicorn ya la ha sacado de X-Forwarded-For si venía de un proxy de confianza."""
+    return request.client.host if request.client else "unknown"
+
+
+def rate_limit(route: str):
+    """Dependencia de ruta (en `dependencies=[...]`, se resuelve la primera): límite por IP."""
+
+    async def limit_by_ip(request: Request) -> None:
+        check_rate_limit(route, "ip", client_ip(request))
+
+    return Depends(limit_by_ip)
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+from datetime import date
+from typing import List, Literal, Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import func
+from sqlmodel import select
+
+from app.db import cached_all
+from app.dependencies import ReadSessionDep
+from app.fastjson import JSONRoute
+from app.models.analytics import (
+    CurrencyDailySales,
+    CurrencyDailySalesPublic,
+    ProductDailySales,
+    ProductDailySalesPublic,
+    TopProduct,
+)
+from app.models.products import Product
+from app.routes.auth import get_current_admin
+
+# Solo leen los rollups (nunca Order/OrderItem): coste según días consultados
+router = APIRouter(
+    prefix="/analytics",
+    tags=["analytics"],
+    dependencies=[Depends(get_current_admin)],
+    route_class=JSONRoute,
+)
+
+
+def _in_range(column, date_from: Optional[date], date_to: Optional[date]) -> list:
+    conditions = []
+    if date_from is not None:
+        conditions.append(column >= date_from)
+    if date_to is not None:
+        conditions.append(column <= date_to)
+    return conditions
+
+
+@router.get("/revenue/daily", response_model=List[CurrencyDailySalesPublic])
+async def revenue_per_day(
+    session: ReadSessionDep,
+    date_from: Optional[date] = Query(default=None),
+    date_to: Optional[date] = Query(default=None, description="Inclusive"),
+    currency: Optional[str] = Query(default=None),
+):
+    stmt = (
+        select(CurrencyDailySales)
+        .where(*_in_range(CurrencyDailySales.day, date_from, date_to))
+        .order_by(CurrencyDailySales.day, CurrencyDailySales.currency)
+    )
+    if currency:
+        stmt = stmt.where(CurrencyDailySales.currency == currency)
+    return await cached_all(session, stmt)
+
+
+@router.get("/products/{product_id}/daily", response_model=List[ProductDailySalesPublic])
+async def product_revenue_per_day(
+    product_id: int,
+    session: ReadSessionDep,
+    date_from: Optional[date] = Query(default=None),
+    date_to: Optional[date] = Query(default=None, description="Inclusive"),
+):
+    stmt = (
+        select(ProductDailySales)
+        .where(
+            ProductDailySales.product_id == product_id,
+            *_in_range(ProductDailySales.day, date_from, date_to),
+        )
+        .order_by(ProductDailySales.day, ProductDailySales.currency)
+    )
+    return await cached_all(session, stmt)
+
+
+@router.get("/top-products", response_model=List[TopProduct])
+async def top_products(
+    session: ReadSessionDep,
+    date_from: Optional[date] = Query(default=None),
+    date_to: Optional[date] = Query(default=None, description="Inclusive"),
+    currency: str = Query(default="USD"),
+    by: Literal["revenue", "units"] = Query(default="revenue"),
+    limit: int = Query(default=10, ge=1, le=100),
+):
+    orders = func.sum(ProductDailySales.orders).label("orders")
+    units = func.sum(ProductDailySales.units).label("units")
+    revenue = func.sum(ProductDailySales.revenue_cents).label("revenue_cents")
+    stmt = (
+        select(
+            ProductDailySales.product_id,
+            Product.title,
+            ProductDailySales.currency,
+            orders,
+            units,
+            revenue,
+        )
+        .join(Product, Product.id == ProductDailySales.product_id)
+        .where(
+            ProductDailySales.currency == currency,
+            *_in_range(ProductDailySales.day, date_from, date_to),
+        )
+        .group_by(ProductDailySales.product_id)
+        .order_by((revenue if by == "revenue" else units).desc(), ProductDailySales.product_id)
+        .limit(limit)
+    )
+    return await cached_all(session, stmt)
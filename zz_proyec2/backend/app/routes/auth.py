@@ -2,49 +2,56 @@ from datetime import timedelta, datetime
 from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from jose import jwt, JWTError
-from passlib.context import CryptContext
 from sqlmodel import select
 
-from app.dependencies import SessionDep
+from app.dependencies import ReadSessionDep
 from app.models.users import User
 from app.config import settings
+from app.ratelimit import check_rate_limit, rate_limit
+from app.security import get_password_hash, verify_password
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 ALGORITHM = "HS256"
 
-
-def verify_password(plain: str, hashed: str) -> bool:
-    return pwd_context.verify(plain, hashed)
-
-
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+# bcrypt vive en app.security (una sola CryptContext, creada en el primer uso)
+hash_password = get_password_hash
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
+    # python-jose (y su backend de cryptography) se importa en el primer token
+    from jose import jwt
+
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=60))
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
 
 
-@router.post("/login")
-def login(
-    session: SessionDep,
+async def _limit_login_username(form_data: OAuth2PasswordRequestForm = Depends()) -> None:
+    # mismo form que login (FastAPI lo parsea una vez y lo reutiliza)
+    check_rate_limit("login", "username", form_data.username.strip().lower())
+
+
+# límites antes que la sesión de BD y bcrypt: un 429 no cuesta casi nada
+@router.post("/login", dependencies=[rate_limit("login"), Depends(_limit_login_username)])
+async def login(
+    session: ReadSessionDep,
 
     form_data: OAuth2PasswordRequestForm = Depends(),
 ):
-    user = session.exec(
-        select(User).where(User.email == form_data.username)
+    user = (
+        await session.exec(select(User).where(User.email == form_data.username))
     ).first()
 
-    if not user or not verify_password(form_data.password, user.password_hash):
+    # bcrypt es CPU puro: fuera del event loop
+    if not user or not await run_in_threadpool(
+        verify_password, form_data.password, user.password_hash
+    ):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -54,10 +61,12 @@ def login(
     return {"access_token": token, "token_type": "bearer"}
 
 
-def get_current_user(
-    session: SessionDep,
+async def get_current_user(
+    session: ReadSessionDep,
     token: str = Depends(oauth2_scheme),
 ) -> User:
+    from jose import JWTError, jwt
+
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
         user_id: str = payload.get("sub")
@@ -66,8 +75,14 @@ def get_current_user(
     except JWTError:
         raise HTTPException(status_code=401)
 
-    user = session.get(User, int(user_id))
+    user = await session.get(User, int(user_id))
     if not user:
         raise HTTPException(status_code=401)
 
     return user
+
+
+async def get_current_admin(current_user: User = Depends(get_current_user)) -> User:
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin privileges required")
+    return current_user
@@ -1,15 +1,18 @@
 from __future__ import annotations
 
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, Field
 from sqlmodel import select
 
-from app.dependencies import SessionDep
+from app.dependencies import ReadSessionDep
+from app.fastjson import JSONRoute
+from app.inventory import inventory
 from app.models.products import Product
+from app.profiler import query_budget
 
-router = APIRouter(prefix="/checkout", tags=["checkout"])
+router = APIRouter(prefix="/checkout", tags=["checkout"], route_class=JSONRoute)
 
 
 # Input
@@ -47,53 +50,64 @@ class CheckoutValidateOut(BaseModel):
     total_cents: int
 
 
-@router.post("/validate", response_model=CheckoutValidateOut)
-def validate_checkout(payload: CheckoutValidateIn, session: SessionDep):
+@router.post("/validate", response_model=CheckoutValidateOut, dependencies=[query_budget(1)])
+async def validate_checkout(payload: CheckoutValidateIn, session: ReadSessionDep):
     if not payload.items:
         raise HTTPException(status_code=400, detail="Cart is empty")
 
-    validated: List[ValidatedItem] = []
-    invalid: List[InvalidItem] = []
+    # fusionar líneas repetidas (conserva el orden de primera aparición)
+    quantities: Dict[int, int] = {}
+    for item in payload.items:
+        quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+
+    # todos los productos en una query, solo las columnas necesarias
+    rows = await session.exec(
+        select(
+            Product.id, Product.title, Product.price_cents, Product.stock, Product.currency
+        ).where(Product.id.in_(quantities))
+    )
+    products = {row[0]: row for row in rows}
+
+    # una pasada: dicts planos, response_model los valida una sola vez
+    validated: List[dict] = []
+    invalid: List[dict] = []
     total_cents = 0
 
-    for item in payload.items:
-        product = session.get(Product, item.product_id)
-        if not product:
-            invalid.append(
-                InvalidItem(product_id=item.product_id, quantity=item.quantity, reason="not_found")
-            )
+    for product_id, quantity in quantities.items():
+        product = products.get(product_id)
+        if product is None:
+            invalid.append({"product_id": product_id, "quantity": quantity, "reason": "not_found"})
             continue
 
-        if item.quantity > product.stock:
+        _, title, unit, stock, product_currency = product
+        # productos hot: el stock real está en memoria (la fila va con retraso)
+        hot_stock = inventory.available(product_id)
+        if hot_stock is not None:
+            stock = hot_stock
+        if quantity > stock:
             invalid.append(
-                InvalidItem(
-                    product_id=product.id,
-                    quantity=item.quantity,
-                    reason="insufficient_stock",
-                )
+                {"product_id": product_id, "quantity": quantity, "reason": "insufficient_stock"}
             )
             continue
 
-        unit = product.price_cents
-        subtotal = unit * item.quantity
+        subtotal = unit * quantity
         total_cents += subtotal
-
         validated.append(
-            ValidatedItem(
-                product_id=product.id,
-                title=product.title,
-                unit_price_cents=unit,
-                quantity=item.quantity,
-                subtotal_cents=subtotal,
-                stock_available=product.stock,
-                currency=product.currency,
-            )
+            {
+                "product_id": product_id,
+                "title": title,
+                "unit_price_cents": unit,
+                "quantity": quantity,
+                "subtotal_cents": subtotal,
+                "stock_available": stock,
+                "currency": product_currency,
+            }
         )
 
     currency = payload.currency or "USD"
-    return CheckoutValidateOut(
-        currency=currency,
-        items=validated,
-        invalid_items=invalid,
-        total_cents=total_cents,
-    )
+    return {
+        "currency": currency,
+        "items": validated,
+        "invalid_items": invalid,
+        "total_cents": total_cents,
+    }
@@ -0,0 +1,11 @@
+from fastapi import APIRouter, Response
+
+from app.metrics import CONTENT_TYPE, render
+
+router = APIRouter()
+
+
+# Prometheus (scrape): formato de texto, ver app/metrics.py
+@router.get("/metrics", tags=["metrics"], include_in_schema=False)
+def metrics():
+    return Response(render(), media_type=CONTENT_TYPE)
@@ -1,120 +1,281 @@
-from fastapi import APIRouter, HTTPException, Depends
+import asyncio
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from sqlalchemy import bindparam, insert, update
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlmodel import select
 
-from app.dependencies import SessionDep
-from app.models.orders import Order, OrderCreate, OrderPublic, OrderItem, OrderItemPublic
+from app.analytics import ADD_CURRENCY_DAY, ADD_PRODUCT_DAY, rollup_params
+from app.dependencies import ReadSessionDep
+from app.export import ExportFormat, csv_lines, export_response, iter_partitions, json_line
+from app.fastjson import JSONRoute
+from app.inventory import ADD_PENDING_STOCK, inventory
+from app.models.orders import Order, OrderCreate, OrderPublic, OrderItem
 from app.models.products import Product
-from app.routes.auth import get_current_user
+from app.routes.auth import get_current_admin, get_current_user
 from app.models.users import User
+from app.profiler import query_budget
+from app.writer import on_commit, run_write
 
-router = APIRouter(prefix="/orders", tags=["orders"])
-
-
-@router.get("/", response_model=list[OrderPublic])
-def list_my_orders(session: SessionDep, current_user: User = Depends(get_current_user)):
-  orders = session.exec(
-      select(Order).where(Order.user_id == current_user.id).order_by(Order.id.desc())
-  ).all()
-
-  # cargar items para cada order (simple y funciona)
-  result: list[OrderPublic] = []
-  for o in orders:
-      items = session.exec(select(OrderItem).where(OrderItem.order_id == o.id)).all()
-      public_items = [
-          OrderItemPublic(
-              id=i.id,
-              product_id=i.product_id,
-              unit_price_cents=i.unit_price_cents,
-              quantity=i.quantity,
-          )
-          for i in items
-      ]
-      result.append(
-          OrderPublic(
-              id=o.id,
-              user_id=o.user_id,
-              status=o.status,
-              total_cents=o.total_cents,
-              currency=o.currency,
-              created_at=o.created_at,
-              items=public_items,
-          )
+router = APIRouter(prefix="/orders", tags=["orders"], route_class=JSONRoute)
+
+
+@router.get("/", response_model=list[OrderPublic], dependencies=[query_budget(3)])
+async def list_my_orders(
+    session: ReadSessionDep,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    before_id: Optional[int] = Query(default=None, ge=1, description="Cursor: orders with id < before_id"),
+    limit: int = Query(default=50, ge=1, le=200),
+):
+  # Keyset sobre el índice (user_id, id): coste constante sea cual sea la página.
+  # Columnas sueltas en vez de objetos ORM: se devuelven dicts planos que
+  # response_model valida una sola vez
+  stmt = (
+      select(Order.id, Order.user_id, Order.status, Order.total_cents, Order.currency, Order.created_at)
+      .where(Order.user_id == current_user.id)
+      .order_by(Order.id.desc())
+      .limit(limit)
+  )
+  if before_id is not None:
+      stmt = stmt.where(Order.id < before_id)
+
+  orders = [{**row._mapping, "items": []} for row in (await session.exec(stmt)).all()]
+
+  # items de toda la página en 1 query (IN)
+  by_id = {order["id"]: order for order in orders}
+  if by_id:
+      items = await session.exec(
+          select(OrderItem.id, OrderItem.order_id, OrderItem.product_id, OrderItem.unit_price_cents, OrderItem.quantity)
+          .where(OrderItem.order_id.in_(by_id))
+          .order_by(OrderItem.id)
       )
-  return result
+      for item in items:
+          by_id[item.order_id]["items"].append(dict(item._mapping))
+
+  # Página llena: puede haber más; el cliente sigue con ?before_id=<valor>
+  if len(orders) == limit:
+      response.headers["X-Next-Before-Id"] = str(orders[-1]["id"])
+  return orders
+
+
+# Export (admin): una fila por línea de pedido, en orden de created_at
+_EXPORT_ORDER_COLUMNS = (
+    Order.id.label("order_id"),
+    Order.user_id,
+    Order.status,
+    Order.total_cents,
+    Order.currency,
+    Order.created_at,
+)
+_EXPORT_ITEM_COLUMNS = (
+    OrderItem.id.label("item_id"),
+    OrderItem.product_id,
+    OrderItem.unit_price_cents,
+    OrderItem.quantity,
+)
+
+
+async def _orders_ndjson(stmt):
+  # Un objeto por pedido con sus items; las filas de un pedido llegan seguidas
+  current = None
+  async for rows in iter_partitions(stmt):
+      lines = []
+      for row in rows:
+          if current is None or current["id"] != row.order_id:
+              if current is not None:
+                  lines.append(json_line(current))
+              current = {
+                  "id": row.order_id,
+                  "user_id": row.user_id,
+                  "status": row.status,
+                  "total_cents": row.total_cents,
+                  "currency": row.currency,
+                  "created_at": row.created_at,
+                  "items": [],
+              }
+          if row.item_id is not None:
+              current["items"].append({
+                  "id": row.item_id,
+                  "product_id": row.product_id,
+                  "unit_price_cents": row.unit_price_cents,
+                  "quantity": row.quantity,
+              })
+      if lines:
+          yield "".join(lines)
+  if current is not None:
+      yield json_line(current)
+
+
+async def _orders_csv(stmt):
+  yield csv_lines([list(stmt.selected_columns.keys())])
+  async for rows in iter_partitions(stmt):
+      yield csv_lines(rows)
+
+
+@router.get("/export", dependencies=[Depends(get_current_admin)])
+async def export_orders(
+    format: ExportFormat = Query(default="ndjson"),
+    created_from: Optional[datetime] = Query(default=None, description="Orders with created_at >= created_from"),
+    created_to: Optional[datetime] = Query(default=None, description="Orders with created_at < created_to"),
+):
+  # NDJSON: un pedido por línea con sus items. CSV: una fila por item
+  stmt = (
+      select(*_EXPORT_ORDER_COLUMNS, *_EXPORT_ITEM_COLUMNS)
+      .outerjoin(OrderItem, OrderItem.order_id == Order.id)
+      .order_by(Order.created_at, Order.id, OrderItem.id)
+  )
+  if created_from is not None:
+      stmt = stmt.where(Order.created_at >= created_from)
+  if created_to is not None:
+      stmt = stmt.where(Order.created_at < created_to)
+
+  body = _orders_csv(stmt) if format == "csv" else _orders_ndjson(stmt)
+  return export_response(body, format, "orders")
 
 
-@router.post("/", response_model=OrderPublic, status_code=201)
-def create_order(payload: OrderCreate, session: SessionDep, current_user: User = Depends(get_current_user)):
+# UPDATE condicional: solo descuenta si queda stock (a prueba de compradores concurrentes)
+_product_table = Product.__table__
+_decrement_stock = (
+    update(_product_table)
+    .where(
+        _product_table.c.id == bindparam("product_id"),
+        _product_table.c.stock >= bindparam("quantity"),
+    )
+    .values(stock=_product_table.c.stock - bindparam("quantity"), updated_at=bindparam("updated_at"))
+)
+
+# Líneas del pedido en un solo INSERT ... RETURNING id. El ORM las insertaría de
+# una en una (en SQLite no se fía del orden de RETURNING); aquí sí vale: con el
+# BEGIN IMMEDIATE nadie más inserta, y cada fila del VALUES toma max(id) + 1 en
+# orden, así que los ids ordenados son los de las líneas en el orden enviado.
+_order_item_table = OrderItem.__table__
+_insert_items = insert(_order_item_table).returning(_order_item_table.c.id)
+
+
+@router.post("/", response_model=OrderPublic, status_code=201, dependencies=[query_budget(8)])
+async def create_order(payload: OrderCreate, current_user: User = Depends(get_current_user)):
   if not payload.items or len(payload.items) == 0:
       raise HTTPException(status_code=400, detail="Empty order")
 
-  # validar stock + calcular total
-  total_cents = 0
-  db_items: list[OrderItem] = []
-
+  # cantidad total por producto (una línea repetida cuenta para el stock)
+  quantities: dict[int, int] = {}
   for item in payload.items:
       if item.quantity <= 0:
           raise HTTPException(status_code=400, detail="Quantity must be > 0")
+      quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+
+  # productos hot (venta flash): se reservan en memoria, sin tocar su fila
+  hot = inventory.split(quantities)
+  cold = {pid: q for pid, q in quantities.items() if pid not in hot}
+  reserved: dict[int, int] = {}
 
-      product = session.get(Product, item.product_id)
-      if not product:
-          raise HTTPException(status_code=404, detail=f"Product {item.product_id} not found")
+  def confirm_reserved() -> None:
+      inventory.confirm(reserved)
+      reserved.clear()
 
-      if product.stock < item.quantity:
-          raise HTTPException(
-              status_code=400,
-              detail=f"Insufficient stock for product {product.id}",
+  async def write(session):
+      # todos los productos en una sola query (IN)
+      products = {
+          p.id: p
+          for p in (await session.exec(select(Product).where(Product.id.in_(quantities)))).all()
+      }
+
+      # validar stock + calcular total
+      total_cents = 0
+      db_items: list[OrderItem] = []
+
+      for item in payload.items:
+          product = products.get(item.product_id)
+          if not product:
+              raise HTTPException(status_code=404, detail=f"Product {item.product_id} not found")
+
+          # productos hot: el stock lo decide la reserva en memoria (más abajo)
+          if product.id not in hot and product.stock < quantities[product.id]:
+              raise HTTPException(
+                  status_code=400,
+                  detail=f"Insufficient stock for product {product.id}",
+              )
+
+          total_cents += product.price_cents * item.quantity
+          db_items.append(
+              OrderItem(
+                  product_id=product.id,
+                  unit_price_cents=product.price_cents,
+                  quantity=item.quantity,
+              )
           )
 
-      total_cents += product.price_cents * item.quantity
-      db_items.append(
-          OrderItem(
-              product_id=product.id,
-              unit_price_cents=product.price_cents,
-              quantity=item.quantity,
+      # reserva atómica de los hot (sin await entre comprobar y descontar)
+      if hot:
+          failed = inventory.reserve(hot)
+          if failed is not None:
+              raise HTTPException(status_code=400, detail=f"Insufficient stock for product {failed}")
+          reserved.update(hot)
+
+      # descontar stock: un executemany; si alguna fila no cumple stock >= q, otro
+      # pedido se la llevó entre la lectura y aquí -> se deshace todo el pedido
+      if cold:
+          now = datetime.utcnow()  # cambia el producto: su ETag también (app/http_cache.py)
+          result = await session.exec(
+              _decrement_stock,
+              params=[{"product_id": pid, "quantity": q, "updated_at": now} for pid, q in cold.items()],
           )
+          if result.rowcount != len(cold):
+              raise HTTPException(status_code=409, detail="Insufficient stock, please retry")
+
+      # order + items + rollups en la misma transacción
+      order = Order(
+          user_id=current_user.id,
+          status="created",
+          total_cents=total_cents,
+          currency=payload.currency,
       )
+      session.add(order)
+      await session.flush()
 
-  # crear order
-  order = Order(
-      user_id=current_user.id,
-      status="created",
-      total_cents=total_cents,
-      currency=payload.currency,
-  )
-  session.add(order)
-  session.commit()
-  session.refresh(order)
-
-  # crear order items + descontar stock
-  created_items: list[OrderItemPublic] = []
-  for db_item in db_items:
-      db_item.order_id = order.id
-      session.add(db_item)
-
-      product = session.get(Product, db_item.product_id)
-      product.stock -= db_item.quantity
-      session.add(product)
-
-  session.commit()
-
-  items = session.exec(select(OrderItem).where(OrderItem.order_id == order.id)).all()
-  for i in items:
-      created_items.append(
-          OrderItemPublic(
-              id=i.id,
-              product_id=i.product_id,
-              unit_price_cents=i.unit_price_cents,
-              quantity=i.quantity,
+      rows = [
+          {"order_id": order.id, "product_id": i.product_id, "unit_price_cents": i.unit_price_cents, "quantity": i.quantity}
+          for i in db_items
+      ]
+      ids = sorted((await session.exec(_insert_items, params=rows)).scalars())
+      for db_item, item_id in zip(db_items, ids):
+          db_item.id = item_id
+          db_item.order_id = order.id
+      # ya están en la BD: se cuelgan del pedido sin que el ORM las vuelva a insertar
+      set_committed_value(order, "items", db_items)
+
+      # hot: se apunta lo vendido; el flush lo descuenta de la fila por lotes
+      if hot:
+          await session.exec(
+              ADD_PENDING_STOCK,
+              params=[{"product_id": pid, "quantity": q} for pid, q in hot.items()],
           )
-      )
+          # la reserva se confirma en el mismo paso que el COMMIT (ver inventory.reload)
+          on_commit(session, confirm_reserved)
 
-  return OrderPublic(
-      id=order.id,
-      user_id=order.user_id,
-      status=order.status,
-      total_cents=order.total_cents,
-      currency=order.currency,
-      created_at=order.created_at,
-      items=created_items,
-  )
+      # rollups de ventas (producto×día, moneda×día)
+      product_rows, currency_row = rollup_params(order, db_items)
+      await session.exec(ADD_PRODUCT_DAY, params=product_rows)
+      await session.exec(ADD_CURRENCY_DAY, params=currency_row)
+      return order
+
+  # Lo que siga reservado cuando la escritura acaba de verdad no llegó a
+  # guardarse (lo guardado se confirma en el COMMIT): se devuelve entonces, no
+  # cuando se rinde el llamador. Si cancelan la petición (cliente que se va,
+  # timeout) con el job ya dentro de un lote de la cola, ese lote aún hace
+  # COMMIT y devolver la reserva vendería dos veces lo mismo
+  def settle(task: asyncio.Task) -> None:
+      if not task.cancelled():
+          task.exception()  # leída aunque el llamador ya no esté
+      if reserved:
+          inventory.release(reserved)
+
+  write_task = asyncio.ensure_future(run_write(write))
+  write_task.add_done_callback(settle)  # antes que el de shield: resuelta antes de volver
+  order = await asyncio.shield(write_task)
+
+  # ids y created_at ya están en memoria tras el flush: no se vuelve a leer nada
+  return order
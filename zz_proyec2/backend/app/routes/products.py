@@ -1,84 +1,426 @@
 from __future__ import annotations
 
+import base64
+import binascii
+import csv
+import io
+import json
+import tempfile
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Literal, Optional
 
-from fastapi import APIRouter, HTTPException, Query
+from anyio import from_thread
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import false, func, literal_column, or_, tuple_
 from sqlmodel import select
 
-from app.dependencies import SessionDep
-from app.models.products import Product, ProductCreate, ProductPublic, ProductUpdate
+from app.compression import compression_levels
+from app.config import settings
+from app.db import (
+    cache_get_many,
+    cache_put_get,
+    cache_put_query,
+    cached_all,
+    cached_first,
+    cached_get,
+    model_versions,
+)
+from app.dependencies import ReadSessionDep
+from app.export import ExportFormat, export_response, stream_rows
+from app.fastjson import JSONRoute
+from app.http_cache import conditional_response, version_etag
+from app.models.products import (
+    Product,
+    ProductBatch,
+    ProductCreate,
+    ProductImportReport,
+    ProductPublic,
+    ProductSuggestion,
+    ProductUpdate,
+    catalog_version,
+    fts_match_expression,
+    product_fts,
+)
+from app.product_import import import_products
+from app.profiler import query_budget
+from app.routes.auth import get_current_admin
+from app.inventory import inventory
+from app.typeahead import typeahead
+from app.writer import run_write
 
-router = APIRouter(prefix="/products", tags=["products"])
+router = APIRouter(prefix="/products", tags=["products"], route_class=JSONRoute)
 
 
-@router.get("/", response_model=List[ProductPublic])
-def list_products(
-    session: SessionDep,
-    q: Optional[str] = Query(default=None, description="Search by title/description"),
-    limit: int = Query(default=50, ge=1, le=200),
-    offset: int = Query(default=0, ge=0),
+# Órdenes de GET /products: columna de orden y si es descendente. El id
+# desempata y completa la clave del keyset (índices (price_cents, id) y
+# (created_at, id) en Product).
+_SORTS = {
+    "id": (Product.id, False),
+    "price_asc": (Product.price_cents, False),
+    "price_desc": (Product.price_cents, True),
+    "newest": (Product.created_at, True),
+}
+
+SortParam = Literal["price_asc", "price_desc", "newest"]
+
+
+# INTEGER de SQLite (64 bits con signo): un int de Python mayor no se puede bindear
+_SQLITE_MAX_INT = 2**63 - 1
+
+
+def _is_sqlite_int(value) -> bool:
+    # type() y no isinstance: bool es subclase de int
+    return type(value) is int and -_SQLITE_MAX_INT - 1 <= value <= _SQLITE_MAX_INT
+
+
+def _encode_cursor(sort: str, product: Product) -> str:
+    value = getattr(product, _SORTS[sort][0].key)
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([sort, value, product.id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str, sort: str) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, value, last_id = json.loads(raw)
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if cursor_sort != sort:
+        raise HTTPException(status_code=400, detail="Cursor does not match sort")
+    # el cursor viene del cliente: cada valor con el tipo de su columna
+    if not _is_sqlite_int(last_id):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if sort == "newest":
+        try:
+            value = datetime.fromisoformat(value)
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    elif not _is_sqlite_int(value):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return value, last_id
+
+
+def _list_stmt(
+    q: Optional[str],
+    sort: Optional[str],
+    after: Optional[tuple],
+    limit: int,
+    offset: int,
 ):
     stmt = select(Product)
 
     if q:
-        # Búsqueda simple en title/description
-        stmt = stmt.where(
-            (Product.title.contains(q)) | (Product.description.contains(q))
+        # Búsqueda full-text (FTS5) en title/description por prefijos:
+        # "mech key" encuentra "Mechanical Keyboard"
+        match = fts_match_expression(q)
+        if match is None:
+            return stmt.where(false())
+        matches = literal_column("product_fts").op("MATCH")(match)
+
+        if sort is None:
+            # Por relevancia (bm25, title pesa más). La página se corta dentro
+            # del índice FTS y solo después se cruza con product: no se cargan
+            # las filas de todos los resultados para ordenar
+            rank = func.bm25(literal_column("product_fts"), 10.0, 1.0).label("rank")
+            hits = (
+                select(product_fts.c.rowid, rank)
+                .where(matches)
+                .order_by(rank)
+                .offset(offset)
+                .limit(limit)
+                .subquery()
+            )
+            return stmt.join(hits, hits.c.rowid == Product.id).order_by(hits.c.rank)
+
+        # Con orden explícito el FTS solo filtra
+        stmt = stmt.where(Product.id.in_(select(product_fts.c.rowid).where(matches)))
+
+    column, descending = _SORTS[sort or "id"]
+    if after is not None:
+        # Keyset: seguir justo después de la última fila vista (usa el índice,
+        # coste constante en cualquier página)
+        value, last_id = after
+        key = Product.id if column is Product.id else tuple_(column, Product.id)
+        bound = last_id if column is Product.id else tuple_(value, last_id)
+        stmt = stmt.where(key < bound if descending else key > bound)
+
+    if descending:
+        stmt = stmt.order_by(column.desc(), Product.id.desc())
+    else:
+        stmt = stmt.order_by(column, Product.id)
+    return stmt.offset(offset).limit(limit)
+
+
+def _slug_stmt(slug: str):
+    return select(Product).where(Product.slug == slug).limit(1)
+
+
+# Versión del catálogo para los listados: la fila única que mantienen los
+# triggers de product (sin recorrer la tabla). Se lee siempre de la BD, nunca
+# de la caché de queries: es lo que ven todos los workers
+_CATALOG_VERSION_STMT = select(catalog_version.c.version, catalog_version.c.updated_at).limit(1)
+
+
+def _product_etag(product: Product) -> str:
+    return version_etag("p", product.updated_at, product.id)
+
+
+async def warm_catalog_cache(session) -> None:
+    """Carga la primera página del listado y las fichas (id y slug) en la caché."""
+    products = (
+        await session.exec(
+            select(Product).order_by(Product.id).limit(settings.QUERY_CACHE_WARM_PRODUCTS)
         )
+    ).all()
+    if not products:
+        return  # catálogo vacío: nada que precargar
+    cache_put_query(_list_stmt(None, None, None, 50, 0), products[:50])
+    for product in products:
+        cache_put_get(Product, product)
+        cache_put_query(_slug_stmt(product.slug), [product])
+
+
+async def build_typeahead_index(session) -> None:
+    """Carga id/title/slug de todo el catálogo en el índice de /products/suggest."""
+    rows = (await session.exec(select(Product.id, Product.title, Product.slug))).all()
+    typeahead.rebuild(rows)
+
+
+# páginas del catálogo: se comprimen una vez por versión y salen de la caché
+# de app/compression.py, así que compensa un nivel más alto
+@router.get("/", response_model=List[ProductPublic], dependencies=[compression_levels(gzip=9, br=6, zstd=9)])
+async def list_products(
+    session: ReadSessionDep,
+    request: Request,
+    response: Response,
+    q: Optional[str] = Query(default=None, description="Search by title/description"),
+    sort: Optional[SortParam] = Query(default=None, description="Default: id (or relevance with q)"),
+    cursor: Optional[str] = Query(default=None, description="X-Next-Cursor of the previous page"),
+    limit: int = Query(default=50, ge=1, le=200),
+    offset: int = Query(default=0, ge=0),
+):
+    # Búsqueda sin sort explícito = orden por relevancia, solo con offset
+    ranked = bool(q) and sort is None
+    sort_key = sort or "id"
 
-    stmt = stmt.offset(offset).limit(limit)
-    products = session.exec(stmt).all()
+    after = None
+    if cursor:
+        if ranked:
+            raise HTTPException(status_code=400, detail="Cursor requires sort when searching")
+        if offset:
+            raise HTTPException(status_code=400, detail="Use either cursor or offset")
+        after = _decode_cursor(cursor, sort_key)
+
+    # misma URL + mismo catálogo = misma página: 304 sin ejecutar el listado
+    version, last_updated = (await session.exec(_CATALOG_VERSION_STMT)).one()
+    not_modified = conditional_response(request, response, version_etag("c", last_updated, version), last_updated)
+    if not_modified is not None:
+        return not_modified
+
+    products = await cached_all(session, _list_stmt(q, sort, after, limit, offset))
+
+    # Página llena: puede haber más; el cliente sigue con ?cursor=<valor>
+    if not ranked and len(products) == limit:
+        response.headers["X-Next-Cursor"] = _encode_cursor(sort_key, products[-1])
     return products
 
 
+# Export (admin) del catálogo completo en orden de id
+@router.get("/export", dependencies=[Depends(get_current_admin)])
+async def export_products(format: ExportFormat = Query(default="ndjson")):
+    columns = Product.__table__.columns
+    stmt = select(columns.id, *(c for c in columns if c.name != "id")).order_by(Product.id)
+    return export_response(stream_rows(stmt, format), format, "products")
+
+
+# Autocompletado de la caja de búsqueda: índice en memoria, sin tocar la BD
+# (va antes de /{product_id} para que "suggest" no se tome como id)
+@router.get("/suggest", response_model=List[ProductSuggestion])
+async def suggest_products(
+    prefix: str = Query(min_length=1, max_length=100),
+    limit: int = Query(default=10, ge=1, le=50),
+):
+    return typeahead.suggest(prefix, limit)
+
+
+def _split_param(value: Optional[str]) -> list[str]:
+    """"a, b,,c" -> ["a", "b", "c"] sin repetidos (conserva el orden)."""
+    if not value:
+        return []
+    return list(dict.fromkeys(part.strip() for part in value.split(",") if part.strip()))
+
+
+# Varios productos de una vez (carrito, historial de pedidos): los ids salen de
+# la caché de GET /products/{id} y lo que falte, junto con los slugs, de un solo
+# IN. También va antes de /{product_id}
+@router.get("/batch", response_model=ProductBatch, dependencies=[query_budget(1)])
+async def get_products_batch(
+    session: ReadSessionDep,
+    request: Request,
+    response: Response,
+    ids: Optional[str] = Query(default=None, description="Comma-separated product ids"),
+    slugs: Optional[str] = Query(default=None, description="Comma-separated product slugs"),
+):
+    try:
+        product_ids = [int(v) for v in _split_param(ids)]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be comma-separated integers")
+    # fuera del rango de INTEGER de SQLite el bind falla (OverflowError -> 500)
+    if any(not 1 <= product_id <= _SQLITE_MAX_INT for product_id in product_ids):
+        raise HTTPException(status_code=400, detail="ids must be comma-separated integers")
+    product_slugs = _split_param(slugs)
+    if not product_ids and not product_slugs:
+        raise HTTPException(status_code=400, detail="Pass ids and/or slugs")
+    if len(product_ids) + len(product_slugs) > settings.PRODUCT_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400, detail=f"At most {settings.PRODUCT_BATCH_MAX_ITEMS} ids and slugs per request"
+        )
+
+    by_id, missing = cache_get_many(Product, product_ids)
+    by_slug: dict[str, Product] = {}
+    if missing or product_slugs:
+        conditions = []
+        if missing:
+            conditions.append(Product.id.in_(missing))
+        if product_slugs:
+            conditions.append(Product.slug.in_(product_slugs))
+        versions = model_versions(Product)  # antes de la query (ver QueryCache.put)
+        for product in (await session.exec(select(Product).where(or_(*conditions)))).all():
+            cache_put_get(Product, product, versions)
+            by_id[product.id] = product
+            by_slug[product.slug] = product
+
+    items: dict[str, Product] = {}
+    for product_id in product_ids:
+        if product_id in by_id:
+            items[str(product_id)] = by_id[product_id]
+    for slug in product_slugs:
+        if slug in by_slug:
+            items.setdefault(str(by_slug[slug].id), by_slug[slug])
+
+    # ETag: cualquier cambio en un producto sube su updated_at por encima de
+    # todos los demás, y uno que aparece cambia la cuenta
+    last_updated = max((p.updated_at for p in items.values()), default=None)
+    not_modified = conditional_response(request, response, version_etag("b", last_updated, len(items)), last_updated)
+    if not_modified is not None:
+        return not_modified
+    return {
+        "items": items,
+        "missing_ids": [product_id for product_id in product_ids if product_id not in by_id],
+        "missing_slugs": [slug for slug in product_slugs if slug not in by_slug],
+    }
+
+
 @router.get("/{product_id}", response_model=ProductPublic)
-def get_product(product_id: int, session: SessionDep):
-    product = session.get(Product, product_id)
+async def get_product(product_id: int, session: ReadSessionDep, request: Request, response: Response):
+    product = await cached_get(session, Product, product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
-    return product
+    not_modified = conditional_response(request, response, _product_etag(product), product.updated_at)
+    return product if not_modified is None else not_modified
 
 
 @router.get("/slug/{slug}", response_model=ProductPublic)
-def get_product_by_slug(slug: str, session: SessionDep):
-    product = session.exec(select(Product).where(Product.slug == slug)).first()
+async def get_product_by_slug(slug: str, session: ReadSessionDep, request: Request, response: Response):
+    product = await cached_first(session, _slug_stmt(slug))
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
-    return product
+    not_modified = conditional_response(request, response, _product_etag(product), product.updated_at)
+    return product if not_modified is None else not_modified
 
 
 # crear productos
 @router.post("/", response_model=ProductPublic, status_code=201)
-def create_product(product_in: ProductCreate, session: SessionDep):
-    existing = session.exec(select(Product).where(Product.slug == product_in.slug)).first()
-    if existing:
-        raise HTTPException(status_code=400, detail="Slug already exists")
-
-    product = Product.model_validate(product_in)
-    product.created_at = datetime.utcnow()
-    product.updated_at = datetime.utcnow()
-
-    session.add(product)
-    session.commit()
-    session.refresh(product)
+async def create_product(product_in: ProductCreate):
+    async def write(session):
+        existing = (
+            await session.exec(select(Product).where(Product.slug == product_in.slug))
+        ).first()
+        if existing:
+            raise HTTPException(status_code=400, detail="Slug already exists")
+
+        product = Product.model_validate(product_in)
+        product.created_at = datetime.utcnow()
+        product.updated_at = datetime.utcnow()
+
+        session.add(product)
+        await session.flush()
+        return product
+
+    product = await run_write(write)
+    typeahead.upsert(product.id, product.title, product.slug)
     return product
 
 
+# carga masiva (feeds de proveedores): NDJSON o CSV en el body, upsert por slug
+@router.post("/bulk", response_model=ProductImportReport, dependencies=[Depends(get_current_admin)])
+async def bulk_upsert_products(
+    request: Request,
+    format: Optional[Literal["ndjson", "csv"]] = Query(
+        default=None, description="Default: from Content-Type (text/csv), else ndjson"
+    ),
+):
+    fmt = format or ("csv" if "csv" in request.headers.get("content-type", "") else "ndjson")
+
+    # El body se vuelca a un fichero temporal (en disco a partir de 8 MB) y se
+    # procesa por lotes en un hilo: la memoria no crece con el tamaño del feed
+    with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as body:
+        async for chunk in request.stream():
+            body.write(chunk)
+        body.seek(0)
+        text = io.TextIOWrapper(body, encoding="utf-8-sig", newline="")
+
+        def index_batch(rows) -> None:
+            # el índice de /suggest se toca solo desde el event loop
+            from_thread.run_sync(_typeahead_upsert, rows)
+
+        # el feed fija el stock: antes se aplican las ventas hot pendientes y
+        # después se recargan sus contadores (también si falla a medias)
+        if inventory.enabled:
+            await inventory.flush()
+        try:
+            return await run_in_threadpool(
+                import_products, text, fmt, settings.PRODUCT_IMPORT_BATCH_SIZE, index_batch
+            )
+        except (UnicodeDecodeError, csv.Error) as e:
+            raise HTTPException(status_code=400, detail=f"Unreadable {fmt} body: {e}")
+        finally:
+            await inventory.reload()
+
+
+def _typeahead_upsert(rows) -> None:
+    for product_id, title, slug in rows:
+        typeahead.upsert(product_id, title, slug)
+
+
 # actualizar producto
 @router.patch("/{product_id}", response_model=ProductPublic)
-def update_product(product_id: int, product_in: ProductUpdate, session: SessionDep):
-    product = session.get(Product, product_id)
-    if not product:
-        raise HTTPException(status_code=404, detail="Product not found")
+async def update_product(product_id: int, product_in: ProductUpdate):
+    # stock de un producto hot: aplicar antes sus ventas pendientes
+    hot_stock = product_in.stock is not None and product_id in inventory.hot_ids
+    if hot_stock:
+        await inventory.flush()
+
+    async def write(session):
+        product = await session.get(Product, product_id)
+        if not product:
+            raise HTTPException(status_code=404, detail="Product not found")
+
+        data = product_in.model_dump(exclude_unset=True)
+        for k, v in data.items():
+            setattr(product, k, v)
 
-    data = product_in.model_dump(exclude_unset=True)
-    for k, v in data.items():
-        setattr(product, k, v)
+        product.updated_at = datetime.utcnow()
 
-    product.updated_at = datetime.utcnow()
+        session.add(product)
+        await session.flush()
+        return product
 
-    session.add(product)
-    session.commit()
-    session.refresh(product)
+    product = await run_write(write)
+    typeahead.upsert(product.id, product.title, product.slug)
+    if hot_stock:
+        await inventory.reload([product.id])
     return product
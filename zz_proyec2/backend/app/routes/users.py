@@ -1,28 +1,40 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from sqlmodel import select
 
-from app.dependencies import SessionDep
+from app.dependencies import ReadSessionDep
 from app.models.users import User, UserCreate, UserPublic
+from app.ratelimit import check_rate_limit, rate_limit
 from app.security import get_password_hash
+from app.writer import run_write
 
 router = APIRouter(prefix="/users", tags=["users"])
 
-@router.post("/", response_model=UserPublic, status_code=201)
-def create_user(user: UserCreate, session: SessionDep):
-    # 1) comprobar email único
-    existing = session.exec(select(User).where(User.email == user.email)).first()
+@router.post("/", response_model=UserPublic, status_code=201, dependencies=[rate_limit("create_user")])
+async def create_user(user: UserCreate, session: ReadSessionDep):
+    # 0) límite por email antes de la query y de bcrypt
+    check_rate_limit("create_user", "username", user.email.strip().lower())
+
+    # 1) comprobar email único (lectura: un duplicado no llega a bcrypt ni al escritor)
+    existing = (await session.exec(select(User.id).where(User.email == user.email))).first()
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    # 2) crear User con password_hash
-    db_user = User(
-        first_name=user.first_name,
-        last_name=user.last_name,
-        email=user.email,
-        password_hash=get_password_hash(user.password),
-    )
+    # 2) password_hash con bcrypt en el threadpool (no bloquea el loop), fuera de la transacción
+    password_hash = await run_in_threadpool(get_password_hash, user.password)
+
+    async def write(write_session):
+        # se vuelve a comprobar dentro de la transacción (dos altas a la vez)
+        if (await write_session.exec(select(User.id).where(User.email == user.email))).first():
+            raise HTTPException(status_code=400, detail="Email already registered")
+        db_user = User(
+            first_name=user.first_name,
+            last_name=user.last_name,
+            email=user.email,
+            password_hash=password_hash,
+        )
+        write_session.add(db_user)
+        await write_session.flush()
+        return db_user
 
-    session.add(db_user)
-    session.commit()
-    session.refresh(db_user)
-    return db_user
+    return await run_write(write)
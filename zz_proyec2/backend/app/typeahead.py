@@ -0,0 +1,247 @@
+"""Índice en memoria para el autocompletado de productos (GET /products/suggest).
+
+Indexa las palabras de title y slug de cada producto:
+
+* prefijos: lista ordenada de palabras + bisect, O(log n) por palabra tecleada;
+* erratas: trigramas de cada palabra para encontrar candidatas parecidas, que
+  luego se confirman con distancia de edición sobre el prefijo;
+* ranking: cada palabra guarda sus productos ya ordenados por longitud del
+  título, así que basta con leer los primeros de cada lista.
+
+Se construye en `main.lifespan` y se actualiza desde create_product /
+update_product. Vive en el proceso: cada worker tiene el suyo.
+"""
+
+from __future__ import annotations
+
+import bisect
+import heapq
+import re
+import unicodedata
+from collections import Counter
+from typing import Iterable, Optional
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+# Cuántas palabras con el mismo prefijo se miran como mucho (prefijos de 1 letra)
+_MAX_PREFIX_WORDS = 2000
+
+
+def _normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def _words(text: str) -> list[str]:
+    return _WORD_RE.findall(_normalize(text))
+
+
+def _trigrams(word: str) -> set[str]:
+    # Relleno solo por delante: las erratas se buscan contra prefijos de palabras
+    padded = f"$${word}"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _allowed_typos(token: str) -> int:
+    if len(token) < 4:
+        return 0
+    return 1 if len(token) < 8 else 2
+
+
+def _osa_distance(a: str, b: str, limit: int) -> int:
+    """Distancia de edición con transposiciones (OSA), cortando en `limit`+1."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev2: Optional[list[int]] = None
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if prev2 is not None and i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        if min(cur) > limit:
+            return limit + 1
+        prev2, prev = prev, cur
+    return prev[-1]
+
+
+def _prefix_distance(token: str, word: str, limit: int) -> int:
+    """Erratas de `token` como prefijo de `word` (permite letra de más/menos)."""
+    best = limit + 1
+    for length in (len(token) - 1, len(token), len(token) + 1):
+        if 0 < length <= len(word):
+            best = min(best, _osa_distance(token, word[:length], limit))
+    return best
+
+
+class TypeaheadIndex:
+    def __init__(self) -> None:
+        # id -> (title, slug, palabras)
+        self._docs: dict[int, tuple[str, str, frozenset[str]]] = {}
+        self._sorted_words: list[str] = []
+        # palabra -> [(len(title), id)] ordenada: recorrer en orden de ranking
+        self._postings: dict[str, list[tuple[int, int]]] = {}
+        # igual, pero solo con la primera palabra del título
+        self._first_postings: dict[str, list[tuple[int, int]]] = {}
+        self._trigram_words: dict[str, set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def rebuild(self, rows: Iterable[tuple[int, str, str]]) -> None:
+        """Reconstruye el índice completo desde filas (id, title, slug)."""
+        self._docs.clear()
+        self._postings.clear()
+        self._first_postings.clear()
+        self._trigram_words.clear()
+        for product_id, title, slug in rows:
+            entry = (len(title), product_id)
+            words, first = self._add_doc(product_id, title, slug)
+            for word in words:
+                self._postings.setdefault(word, []).append(entry)
+            if first is not None:
+                self._first_postings.setdefault(first, []).append(entry)
+        for postings in (*self._postings.values(), *self._first_postings.values()):
+            postings.sort()
+        self._sorted_words = sorted(self._postings)
+
+    def upsert(self, product_id: int, title: str, slug: str) -> None:
+        self.remove(product_id)
+        entry = (len(title), product_id)
+        words, first = self._add_doc(product_id, title, slug)
+        for word in words:
+            if word not in self._postings:
+                self._postings[word] = []
+                bisect.insort(self._sorted_words, word)
+            bisect.insort(self._postings[word], entry)
+        if first is not None:
+            bisect.insort(self._first_postings.setdefault(first, []), entry)
+
+    def remove(self, product_id: int) -> None:
+        doc = self._docs.pop(product_id, None)
+        if doc is None:
+            return
+        title, _, words = doc
+        entry = (len(title), product_id)
+        first = _words(title)[:1]
+        for index, word in [(self._first_postings, w) for w in first] + [
+            (self._postings, w) for w in words
+        ]:
+            postings = index[word]
+            del postings[bisect.bisect_left(postings, entry)]
+            if postings:
+                continue
+            del index[word]
+            if index is self._postings:
+                del self._sorted_words[bisect.bisect_left(self._sorted_words, word)]
+                for trigram in _trigrams(word):
+                    trigram_words = self._trigram_words[trigram]
+                    trigram_words.discard(word)
+                    if not trigram_words:
+                        del self._trigram_words[trigram]
+
+    def _add_doc(self, product_id: int, title: str, slug: str) -> tuple[frozenset[str], Optional[str]]:
+        title_words = _words(title)
+        words = frozenset(title_words + _words(slug))
+        self._docs[product_id] = (title, slug, words)
+        for word in words:
+            if word not in self._postings:
+                for trigram in _trigrams(word):
+                    self._trigram_words.setdefault(trigram, set()).add(word)
+        return words, (title_words[0] if title_words else None)
+
+    def _prefix_words(self, token: str) -> dict[str, int]:
+        """Palabras indexadas que empiezan por `token` -> 0 erratas."""
+        words: dict[str, int] = {}
+        i = bisect.bisect_left(self._sorted_words, token)
+        end = min(len(self._sorted_words), i + _MAX_PREFIX_WORDS)
+        while i < end and self._sorted_words[i].startswith(token):
+            words[self._sorted_words[i]] = 0
+            i += 1
+        return words
+
+    def _fuzzy_words(self, token: str) -> dict[str, int]:
+        """Palabras cuyo prefijo está a pocas erratas de `token` -> erratas."""
+        limit = _allowed_typos(token)
+        if limit == 0:
+            return {}
+        trigrams = _trigrams(token)
+        shared = Counter()
+        for trigram in trigrams:
+            shared.update(self._trigram_words.get(trigram, ()))
+        # cada errata rompe como mucho 3 trigramas
+        needed = max(1, len(trigrams) - 3 * limit)
+        words: dict[str, int] = {}
+        for word, count in shared.items():
+            if count >= needed:
+                distance = _prefix_distance(token, word, limit)
+                if distance <= limit:
+                    words[word] = distance
+        return words
+
+    def _collect(
+        self, token_words: list[dict[str, int]], limit: int, found: dict[int, tuple]
+    ) -> None:
+        """Añade a `found` hasta `limit` productos que casan con todos los tokens.
+
+        Se recorren las postings (ya ordenadas por ranking) del token más
+        selectivo, primero las de títulos que empiezan por el primer token:
+        en cuanto hay `limit` resultados se para, sin mirar el resto.
+        """
+        driver = min(
+            token_words, key=lambda words: sum(len(self._postings[w]) for w in words)
+        )
+        tiers = (
+            [self._first_postings[w] for w in token_words[0] if w in self._first_postings],
+            [self._postings[w] for w in driver],
+        )
+        for tier, postings in enumerate(tiers):
+            taken = 0
+            for length, product_id in heapq.merge(*postings):
+                if product_id in found:
+                    continue
+                doc_words = self._docs[product_id][2]
+                typos = 0
+                for words in token_words:
+                    best = min((words[w] for w in doc_words if w in words), default=None)
+                    if best is None:
+                        break
+                    typos += best
+                else:
+                    found[product_id] = (typos, tier, length, product_id)
+                    taken += 1
+                    if taken == limit:
+                        break
+
+    def suggest(self, prefix: str, limit: int = 10) -> list[dict]:
+        """Productos cuyas palabras empiezan por las del texto tecleado.
+
+        Todas las palabras deben casar (la última suele estar a medias). Si no
+        hay suficientes coincidencias exactas se completan con erratas.
+        Orden: menos erratas, título que empieza por la búsqueda, título corto.
+        """
+        tokens = _words(prefix)
+        if not tokens:
+            return []
+
+        found: dict[int, tuple] = {}
+        token_words = [self._prefix_words(t) for t in tokens]
+        if all(token_words):
+            self._collect(token_words, limit, found)
+        if len(found) < limit:
+            for token, words in zip(tokens, token_words):
+                for word, typos in self._fuzzy_words(token).items():
+                    words.setdefault(word, typos)
+            if all(token_words):
+                self._collect(token_words, limit, found)
+
+        ranked = heapq.nsmallest(limit, found.values())
+        return [
+            {"id": pid, "title": self._docs[pid][0], "slug": self._docs[pid][1]}
+            for *_, pid in ranked
+        ]
+
+
+typeahead = TypeaheadIndex()
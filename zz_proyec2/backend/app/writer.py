@@ -0,0 +1,162 @@
+"""Escrituras de la tienda: transacción propia o cola con group commit.
+
+Los handlers que escriben (create_order, create_user, create_product,
+update_product) pasan su trabajo como un "job", `async def job(session)`,
+que hace sus cambios sin commit y devuelve el resultado, a `run_write`:
+
+* WRITE_QUEUE_ENABLED=False: sesión de escritura propia y un commit por job
+  (lo de siempre).
+* WRITE_QUEUE_ENABLED=True: el job entra en una cola y un único worker la
+  vacía por lotes: hasta WRITE_QUEUE_MAX_BATCH jobs en una misma transacción
+  (un solo fsync), esperando como mucho WRITE_QUEUE_MAX_WAIT_MS a que lleguen
+  más. Cada job va en su SAVEPOINT: si falla, se deshace solo lo suyo y su
+  llamador recibe la excepción; el resto espera al COMMIT del lote.
+
+El worker toma la conexión de escritura por lote y la suelta al terminar, así
+que el resto de usuarios de write_engine (idempotencia, flush del inventario)
+entran entre lotes. La cola es por proceso.
+
+Un job puede apuntar con `on_commit(session, callback)` lo que tiene que pasar
+cuando sus cambios estén guardados: se llama justo tras el COMMIT, sin await de
+por medio, antes de que nadie más pueda usar la conexión de escritura (y nunca
+si el job o su lote fallan).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import logging
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.config import settings
+from app.db import WriteSession
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+WriteJob = Callable[[AsyncSession], Awaitable[T]]
+
+
+class WriteQueue:
+    def __init__(self, max_batch: int, max_wait_seconds: float):
+        self.max_batch = max_batch
+        self.max_wait_seconds = max_wait_seconds
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def submit(self, job: WriteJob[T]) -> T:
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            # contexto vacío: el worker no hereda el de la petición que lo arranca
+            self._task = asyncio.create_task(self._worker(), context=contextvars.Context())
+        future = asyncio.get_running_loop().create_future()
+        # el job corre con el contexto del llamador (métricas por petición, etc.)
+        self._queue.put_nowait((job, future, contextvars.copy_context()))
+        return await future
+
+    async def stop(self) -> None:
+        """Termina los jobs encolados y para el worker (apagado)."""
+        if self._task is None:
+            return
+        await self._queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait_seconds
+            while len(batch) < self.max_batch:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await self._commit_batch(batch)
+            except Exception:
+                logger.exception("write batch failed")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _commit_batch(self, batch: list) -> None:
+        done = []
+        try:
+            async with WriteSession() as session:
+                callbacks = _on_commit_callbacks(session)
+                for job, future, context in batch:
+                    if future.done():  # el llamador se fue (cancelado): no se ejecuta
+                        continue
+                    registered = len(callbacks)
+                    try:
+                        result = await asyncio.create_task(_run_nested(session, job), context=context)
+                    except Exception as e:
+                        del callbacks[registered:]  # su SAVEPOINT se deshizo
+                        future.set_exception(e)
+                        continue
+                    # ya está todo en BD (flush al liberar el SAVEPOINT): el
+                    # resultado sale de la sesión y los jobs siguientes no lo tocan
+                    session.expunge_all()
+                    done.append((future, result))
+                await session.commit()
+                _run_on_commit(session)
+        except Exception as e:
+            # falló el lote (p. ej. el COMMIT): no se guardó nada, todos reciben el error
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            raise
+        for future, result in done:
+            if not future.done():
+                future.set_result(result)
+
+
+def _on_commit_callbacks(session: AsyncSession) -> list:
+    return session.info.setdefault("on_commit", [])
+
+
+def on_commit(session: AsyncSession, callback: Callable[[], None]) -> None:
+    """`callback()` tras el COMMIT que guarda los cambios del job actual."""
+    _on_commit_callbacks(session).append(callback)
+
+
+def _run_on_commit(session: AsyncSession) -> None:
+    for callback in session.info.pop("on_commit", ()):
+        callback()
+
+
+async def _run_nested(session: AsyncSession, job: WriteJob[T]) -> T:
+    async with session.begin_nested():
+        return await job(session)
+
+
+write_queue = WriteQueue(settings.WRITE_QUEUE_MAX_BATCH, settings.WRITE_QUEUE_MAX_WAIT_MS / 1000)
+
+
+async def run_write(job: WriteJob[T]) -> T:
+    """Ejecuta `job(session)` en una transacción y devuelve su resultado tras el commit.
+
+    El job no hace commit ni rollback: si lanza una excepción, sus cambios se
+    deshacen y la excepción llega tal cual al llamador.
+    """
+    if settings.WRITE_QUEUE_ENABLED:
+        return await write_queue.submit(job)
+    async with WriteSession() as session:
+        result = await job(session)
+        await session.commit()
+        _run_on_commit(session)
+        return result
@@ -0,0 +1,87 @@
+"""Guardia de permisos: las rutas de admin no aceptan anónimos ni usuarios normales.
+
+Crea una BD temporal con un admin y un usuario normal y llama a cada ruta de
+ADMIN_ROUTES sin token (espera 401), con el usuario normal (403) y con el admin
+(2xx). Para `POST /products/bulk` comprueba además que los intentos rechazados
+no llegaron a escribir nada. Sale con código 1 si algo no cuadra.
+
+Uso (desde backend/):
+
+    python -m benchmarks.admin_routes
+"""
+
+from __future__ import annotations
+
+import sys
+
+from benchmarks.common import use_temp_database
+
+use_temp_database()
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlmodel import Session, select  # noqa: E402
+
+from app.db import engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.products import Product  # noqa: E402
+from app.models.users import User  # noqa: E402
+from app.routes.auth import create_access_token  # noqa: E402
+
+_BULK_FEED = '{"title": "Guard", "slug": "admin-guard", "price_cents": 100}\n'
+
+# (método, ruta, kwargs de la petición)
+ADMIN_ROUTES = [
+    ("POST", "/products/bulk", {"content": _BULK_FEED, "headers": {"Content-Type": "application/x-ndjson"}}),
+    ("GET", "/products/export", {}),
+    ("GET", "/orders/export", {}),
+    ("GET", "/analytics/revenue/daily", {}),
+    ("GET", "/analytics/top-products", {}),
+]
+
+
+def seed() -> tuple[int, int]:
+    with Session(engine) as session:
+        admin = User(first_name="Admin", last_name="Guard", email="admin@example.com", password_hash="x", is_admin=True)
+        user = User(first_name="User", last_name="Guard", email="user@example.com", password_hash="x")
+        session.add(admin)
+        session.add(user)
+        session.commit()
+        return admin.id, user.id
+
+
+def _bulk_written() -> bool:
+    with Session(engine) as session:
+        return session.exec(select(Product).where(Product.slug == "admin-guard")).first() is not None
+
+
+def main() -> int:
+    errors = []
+    with TestClient(app) as client:
+        admin_id, user_id = seed()
+        callers = [
+            ("anonymous", {}, 401),
+            ("user", {"Authorization": f"Bearer {create_access_token({'sub': str(user_id)})}"}, 403),
+            ("admin", {"Authorization": f"Bearer {create_access_token({'sub': str(admin_id)})}"}, 200),
+        ]
+        for method, path, kwargs in ADMIN_ROUTES:
+            for caller, auth, expected in callers:
+                headers = {**kwargs.get("headers", {}), **auth}
+                response = client.request(method, path, **{**kwargs, "headers": headers})
+                if response.status_code != expected:
+                    errors.append(f"{method} {path} as {caller}: expected {expected}, got {response.status_code}")
+                if path == "/products/bulk" and caller != "admin" and _bulk_written():
+                    errors.append(f"{method} {path} as {caller}: the feed was imported")
+        if not _bulk_written():
+            errors.append("POST /products/bulk as admin: the feed was not imported")
+
+    if errors:
+        print("FAIL:")
+        for error in errors:
+            print("   ", error)
+        return 1
+    print(f"OK: {len(ADMIN_ROUTES)} admin routes reject anonymous (401) and non-admin (403) callers")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+"""Throughput y p99: stack sync (threadpool) frente al stack async (aiosqlite).
+
+`sync_app` replica las rutas de lectura de productos y la creación de pedidos
+tal y como eran antes (`def` + `SessionDep` sobre el engine bloqueante); el
+stack async es `app.main:app`. Ambas sirven la misma base de datos temporal
+(`--products` productos con stock de sobra y un usuario), nunca app/database.db.
+
+Escenarios (`--scenarios`):
+
+* read   GET /products (1 de cada 4) y fichas GET /products/{id}
+* order  POST /orders de una línea, con el token del usuario
+
+Uso (desde backend/):
+
+    python -m benchmarks.async_vs_sync [--duration 10] [--concurrency 50 200 1000] [--scenarios read order]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+from typing import List
+
+from benchmarks.common import run_load, use_temp_database, uvicorn_server
+
+if __name__ == "__main__":
+    # los uvicorn de los dos stacks la heredan del entorno (al importar
+    # sync_app no se crea otra)
+    use_temp_database()
+
+from fastapi import Depends, FastAPI, HTTPException  # noqa: E402
+from sqlmodel import Session, select  # noqa: E402
+
+from app.config import settings  # noqa: E402
+from app.db import create_db_and_tables, engine  # noqa: E402
+from app.dependencies import SessionDep  # noqa: E402
+from app.models.orders import Order, OrderCreate, OrderItem, OrderItemPublic, OrderPublic  # noqa: E402
+from app.models.products import Product, ProductPublic  # noqa: E402
+from app.models.users import User  # noqa: E402
+from app.routes.auth import ALGORITHM, create_access_token, oauth2_scheme  # noqa: E402
+
+sync_app = FastAPI()
+
+
+@sync_app.get("/health")
+def health_check():
+    return {"status": "ok"}
+
+
+@sync_app.get("/products/", response_model=List[ProductPublic])
+def list_products(session: SessionDep, limit: int = 50, offset: int = 0):
+    return session.exec(select(Product).offset(offset).limit(limit)).all()
+
+
+@sync_app.get("/products/{product_id}", response_model=ProductPublic)
+def get_product(product_id: int, session: SessionDep):
+    product = session.get(Product, product_id)
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return product
+
+
+def _current_user(session: SessionDep, token: str = Depends(oauth2_scheme)) -> User:
+    from jose import JWTError, jwt
+
+    try:
+        user_id = jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+    except JWTError:
+        raise HTTPException(status_code=401)
+    user = session.get(User, int(user_id)) if user_id else None
+    if not user:
+        raise HTTPException(status_code=401)
+    return user
+
+
+@sync_app.post("/orders/", response_model=OrderPublic, status_code=201)
+def create_order(payload: OrderCreate, session: SessionDep, current_user: User = Depends(_current_user)):
+    # como antes: un get por línea, dos commits y los items releídos al final
+    total_cents = 0
+    db_items: list[OrderItem] = []
+    for item in payload.items:
+        product = session.get(Product, item.product_id)
+        if not product:
+            raise HTTPException(status_code=404, detail=f"Product {item.product_id} not found")
+        if product.stock < item.quantity:
+            raise HTTPException(status_code=400, detail=f"Insufficient stock for product {product.id}")
+        total_cents += product.price_cents * item.quantity
+        db_items.append(OrderItem(product_id=product.id, unit_price_cents=product.price_cents, quantity=item.quantity))
+
+    order = Order(user_id=current_user.id, status="created", total_cents=total_cents, currency=payload.currency)
+    session.add(order)
+    session.commit()
+    session.refresh(order)
+
+    for db_item in db_items:
+        db_item.order_id = order.id
+        session.add(db_item)
+        product = session.get(Product, db_item.product_id)
+        product.stock -= db_item.quantity
+        session.add(product)
+    session.commit()
+
+    items = session.exec(select(OrderItem).where(OrderItem.order_id == order.id)).all()
+    return OrderPublic(
+        id=order.id,
+        user_id=order.user_id,
+        status=order.status,
+        total_cents=order.total_cents,
+        currency=order.currency,
+        created_at=order.created_at,
+        items=[OrderItemPublic(id=i.id, product_id=i.product_id, unit_price_cents=i.unit_price_cents, quantity=i.quantity) for i in items],
+    )
+
+
+def seed(products: int) -> str:
+    """Catálogo y un usuario en la BD temporal; devuelve su token."""
+    create_db_and_tables()
+    with Session(engine) as session:
+        session.add_all(
+            Product(title=f"Product {i}", slug=f"product-{i}", price_cents=100 + i, stock=10**9)
+            for i in range(products)
+        )
+        user = User(first_name="Bench", last_name="User", email="bench@example.com", password_hash="x")
+        session.add(user)
+        session.commit()
+        return create_access_token({"sub": str(user.id)})
+
+
+def scenarios(products: int, token: str) -> dict:
+    headers = {"Authorization": f"Bearer {token}"}
+
+    def read(client, n):
+        # 1 de cada 4 peticiones lista el catálogo; el resto son fichas de producto
+        if n % 4 == 0:
+            return client.get("/products/")
+        return client.get(f"/products/{n % products + 1}")
+
+    def order(client, n):
+        return client.post("/orders/", headers=headers, json={"items": [{"product_id": n % products + 1, "quantity": 1}]})
+
+    return {"read": read, "order": order}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument("--scenarios", nargs="+", choices=["read", "order"], default=["read", "order"])
+    parser.add_argument("--products", type=int, default=200)
+    args = parser.parse_args()
+
+    requests = scenarios(args.products, seed(args.products))
+    stacks = {
+        "sync": "benchmarks.async_vs_sync:sync_app",
+        "async": "app.main:app",
+    }
+    print(f"{'stack':<6} {'scenario':<8} {'clients':>7} {'req/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for name, app_path in stacks.items():
+        with uvicorn_server(app_path) as base_url:
+            for scenario in args.scenarios:
+                for concurrency in args.concurrency:
+                    r = asyncio.run(run_load(base_url, requests[scenario], concurrency, args.duration))
+                    print(
+                        f"{name:<6} {scenario:<8} {concurrency:>7} {r['rps']:>10.1f} "
+                        f"{r['p50_ms']:>9.1f} {r['p99_ms']:>9.1f} {r['errors']:>7}"
+                    )
+
+
+if __name__ == "__main__":
+    main()
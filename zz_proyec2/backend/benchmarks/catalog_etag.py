@@ -0,0 +1,151 @@
+"""ETag del listado (`GET /products`) con un catálogo grande y escrituras.
+
+El listado valida su ETag con la versión del catálogo. Antes era
+count(*) + max(updated_at) sobre product (recorre la tabla); ahora es la fila
+única de catalog_version que mantienen los triggers, leída de la BD en cada
+petición (sin caché de queries: la comparten todos los workers).
+
+Primero, con `--workers` workers de uvicorn sobre unos pocos productos y la
+caché de queries sin comprobación entre procesos (QUERY_CACHE_SHARED_CHECK=0,
+lo peor para el ETag): tras un PATCH atendido por un worker, ningún worker
+puede contestar 304 al ETag viejo ni dar otro ETag que el nuevo. Si no, sale
+con código 1.
+
+Después genera `--products` productos (500k por defecto) y mide:
+
+* la query de versión: count + max (antes) frente a catalog_version;
+* `GET /products` con If-None-Match (304), lo que paga cada revalidación;
+* el coste de los triggers en un UPDATE de stock como el de un pedido.
+
+Uso (desde backend/):
+
+    python -m benchmarks.catalog_etag [--products 500000] [--runs 50] [--workers 3]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+from benchmarks.common import percentile, use_temp_database, uvicorn_server
+
+DB_PATH = use_temp_database()
+
+import httpx  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import func, text  # noqa: E402
+from sqlmodel import Session, select  # noqa: E402
+
+from app.db import create_db_and_tables, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.products import Product  # noqa: E402
+from app.routes.products import _CATALOG_VERSION_STMT  # noqa: E402
+from benchmarks.product_search import build_catalog  # noqa: E402
+
+_OLD_VERSION_STMT = select(func.count(Product.id), func.max(Product.updated_at))
+_STOCK_UPDATE = text("UPDATE product SET stock = stock + 1, updated_at = :now WHERE id = :id")
+
+
+def timed(fn, runs: int) -> tuple[float, float]:
+    """(p50, p99) en ms de `runs` llamadas a fn()."""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return percentile(timings, 50) * 1000, percentile(timings, 99) * 1000
+
+
+def check_workers(workers: int, requests: int) -> list[str]:
+    """ETags del listado entre workers tras una escritura atendida por uno de ellos."""
+    create_db_and_tables()
+    with Session(engine) as session:
+        session.add_all(Product(title=f"Product {i}", slug=f"product-{i}", price_cents=100) for i in range(3))
+        session.commit()
+
+    errors = []
+    env = dict(os.environ, SQLITE_PATH=str(DB_PATH), QUERY_CACHE_SHARED_CHECK="0")
+    close = {"Connection": "close"}  # una conexión por petición: se reparten entre workers
+    with uvicorn_server("app.main:app", env=env, workers=workers) as url:
+        with httpx.Client(base_url=url) as client:
+            old_etags = {client.get("/products/", headers=close).headers["etag"] for _ in range(requests)}
+            if len(old_etags) != 1:
+                errors.append(f"workers disagree on the list ETag before any write: {sorted(old_etags)}")
+            old_etag = old_etags.pop()
+
+            client.patch("/products/1", json={"price_cents": 250}, headers=close)
+            not_modified, etags = 0, set()
+            for _ in range(requests):
+                response = client.get("/products/", headers={**close, "If-None-Match": old_etag})
+                if response.status_code == 304:
+                    not_modified += 1
+                else:
+                    etags.add(response.headers["etag"])
+            if not_modified:
+                errors.append(f"{not_modified}/{requests} revalidations got 304 for the old ETag after a write")
+            if len(etags) > 1:
+                errors.append(f"workers disagree on the list ETag after a write: {sorted(etags)}")
+    return errors
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=500_000)
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=3)
+    args = parser.parse_args()
+
+    errors = check_workers(args.workers, args.runs)
+    if errors:
+        print("FAIL:")
+        for error in errors:
+            print("   ", error)
+        return 1
+    print(f"OK: {args.workers} workers agree on the list ETag after a write")
+
+    started = time.perf_counter()
+    build_catalog(args.products)
+    print(f"catalog: {args.products} products built in {time.perf_counter() - started:.1f}s")
+
+    rows = []
+    with Session(engine) as session:
+        rows.append(("version query: count + max", *timed(lambda: session.exec(_OLD_VERSION_STMT).one(), args.runs)))
+        rows.append(("version query: catalog_version", *timed(lambda: session.exec(_CATALOG_VERSION_STMT).one(), args.runs)))
+
+        # UPDATE de una fila con y sin los triggers de versión
+        def stock_update():
+            session.execute(_STOCK_UPDATE, {"now": "2026-01-01 00:00:00.000000", "id": 1})
+            session.commit()
+
+        rows.append(("stock UPDATE (with triggers)", *timed(stock_update, args.runs)))
+        triggers = session.execute(
+            text("SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'product_version_%'")
+        ).all()
+        for name, _ in triggers:
+            session.execute(text(f"DROP TRIGGER {name}"))
+        session.commit()
+        rows.append(("stock UPDATE (no triggers)", *timed(stock_update, args.runs)))
+        for _, sql in triggers:
+            session.execute(text(sql))
+        session.commit()
+
+    with TestClient(app) as client:
+        etag = client.get("/products/", params={"limit": 50}).headers["etag"]
+
+        def revalidate():
+            response = client.get("/products/", params={"limit": 50}, headers={"If-None-Match": etag})
+            assert response.status_code == 304, response.status_code
+
+        rows.append(("GET /products 304", *timed(revalidate, args.runs)))
+
+    print(f"{'':<34} {'p50':>9} {'p99':>9}")
+    for name, p50, p99 in rows:
+        print(f"{name:<34} {p50:>7.3f}ms {p99:>7.3f}ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""Latencia de `POST /checkout/validate` con carritos grandes (B2B).
+
+Crea un catálogo temporal y valida carritos de `--lines` líneas con ids
+repetidos, en proceso (sin red), midiendo p50/p99 por petición completa
+(parseo del body, query, respuesta).
+
+Uso (desde backend/):
+
+    python -m benchmarks.checkout_validate [--lines 1000] [--products 300] [--runs 200]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+
+from benchmarks.common import percentile, use_temp_database
+
+use_temp_database()
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlmodel import Session  # noqa: E402
+
+from app.db import engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.products import Product  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=1000)
+    parser.add_argument("--products", type=int, default=300)
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    with TestClient(app) as client:
+        with Session(engine) as session:
+            session.add_all(
+                Product(title=f"SKU {i}", slug=f"sku-{i}", price_cents=rng.randint(100, 10_000), stock=10_000)
+                for i in range(args.products)
+            )
+            session.commit()
+
+        # ~10% de ids inexistentes, el resto repartidos (con repeticiones)
+        cart = {
+            "items": [
+                {"product_id": rng.randint(1, int(args.products * 1.1)), "quantity": rng.randint(1, 5)}
+                for _ in range(args.lines)
+            ]
+        }
+
+        for _ in range(10):  # calentamiento
+            client.post("/checkout/validate", json=cart).raise_for_status()
+
+        timings = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            client.post("/checkout/validate", json=cart).raise_for_status()
+            timings.append(time.perf_counter() - start)
+
+    timings.sort()
+    print(
+        f"{args.lines}-line cart over {args.products} products, {args.runs} runs: "
+        f"p50 {percentile(timings, 50) * 1000:.2f} ms, p99 {percentile(timings, 99) * 1000:.2f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Utilidades compartidas por los benchmarks (servidor, carga y percentiles)."""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Iterator
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def use_temp_database() -> Path:
+    """Apunta `SQLITE_PATH` a un fichero temporal. Llamar antes de importar `app`."""
+    path = Path(tempfile.mkdtemp(prefix="shop-bench-")) / "bench.db"
+    os.environ["SQLITE_PATH"] = str(path)
+    return path
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextlib.contextmanager
+def uvicorn_server(app_path: str, env: dict | None = None, workers: int = 1) -> Iterator[str]:
+    """Arranca `uvicorn <app_path>` en un subproceso y devuelve su URL base."""
+    port = free_port()
+    command = [
+        sys.executable, "-m", "uvicorn", app_path,
+        "--port", str(port), "--workers", str(workers), "--log-level", "warning",
+    ]
+    with _serve(command, port, env, app_path) as base_url:
+        yield base_url
+
+
+@contextlib.contextmanager
+def launcher_server(env: dict | None = None, workers: int = 1) -> Iterator[str]:
+    """Arranca el servidor de producción (`python -m app.launcher`) y devuelve su URL base."""
+    port = free_port()
+    command = [sys.executable, "-m", "app.launcher", "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers)]
+    with _serve(command, port, env, "app.launcher") as base_url:
+        yield base_url
+
+
+@contextlib.contextmanager
+def _serve(command: list[str], port: int, env: dict | None, name: str) -> Iterator[str]:
+    proc = subprocess.Popen(command, cwd=BACKEND_DIR, env=env)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                httpx.get(f"{base_url}/health", timeout=1)
+                break
+            except httpx.TransportError:
+                if proc.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError(f"{name} did not start")
+                time.sleep(0.1)
+        yield base_url
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+
+async def run_load(
+    base_url: str,
+    make_request: Callable[[httpx.AsyncClient, int], "asyncio.Future"],
+    concurrency: int,
+    duration: float,
+    timeout: float = 10.0,
+) -> dict:
+    """Lanza `concurrency` clientes en bucle durante `duration` segundos.
+
+    `make_request(client, n)` debe devolver la corrutina de la petición n-ésima.
+    Las peticiones que superan `timeout` o devuelven 5xx cuentan como errores.
+    """
+    latencies: list[float] = []
+    errors = 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+        stop_at = time.perf_counter() + duration
+
+        async def worker(worker_id: int) -> None:
+            nonlocal errors
+            n = worker_id
+            while time.perf_counter() < stop_at:
+                start = time.perf_counter()
+                try:
+                    response = await make_request(client, n)
+                    if response.status_code >= 500:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+                n += concurrency
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
@@ -0,0 +1,121 @@
+"""Serialización de respuestas: modo normal frente a FAST_JSON (app/fastjson.py).
+
+Lanza este mismo script dos veces (FAST_JSON=0 y FAST_JSON=1, el flag se lee
+al importar la app) y mide en proceso, sin red:
+
+* `GET /products?limit=200` (página de 200 productos, sale de la caché de
+  queries: casi todo el tiempo es validar + serializar),
+* el historial completo de un usuario con `--orders` pedidos de 3 items
+  (`GET /orders/` página a página con before_id).
+
+Uso (desde backend/):
+
+    python -m benchmarks.fast_json [--orders 500] [--runs 200]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.common import BACKEND_DIR, percentile
+
+
+def run_mode(args) -> dict:
+    from benchmarks.common import use_temp_database
+
+    use_temp_database()
+
+    from fastapi.testclient import TestClient
+    from sqlmodel import Session
+
+    from app.db import engine
+    from app.main import app
+    from app.models.orders import Order, OrderItem
+    from app.models.products import Product
+    from app.models.users import User
+    from app.routes.auth import create_access_token
+
+    results = {}
+    with TestClient(app) as client:
+        with Session(engine) as session:
+            products = [
+                Product(title=f"Product {i}", slug=f"product-{i}", description="Bench product " * 4,
+                        price_cents=100 + i, stock=1000)
+                for i in range(200)
+            ]
+            user = User(first_name="Bench", last_name="User", email="bench@example.com", password_hash="x")
+            session.add_all([user, *products])
+            session.flush()
+            for i in range(args.orders):
+                items = [
+                    OrderItem(product_id=products[(i + k) % 200].id, unit_price_cents=100, quantity=1)
+                    for k in range(3)
+                ]
+                session.add(Order(user_id=user.id, total_cents=300, items=items))
+            session.commit()
+            headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}"}
+
+        def products_page():
+            response = client.get("/products/", params={"limit": 200})
+            response.raise_for_status()
+
+        def order_history():
+            before_id = None
+            while True:
+                params = {"limit": 200, **({"before_id": before_id} if before_id else {})}
+                response = client.get("/orders/", params=params, headers=headers)
+                response.raise_for_status()
+                before_id = response.headers.get("X-Next-Before-Id")
+                if not before_id:
+                    break
+
+        for name, call in (("products_200", products_page), (f"orders_{args.orders}", order_history)):
+            for _ in range(10):  # calentamiento (y caché de queries)
+                call()
+            timings = []
+            for _ in range(args.runs):
+                start = time.perf_counter()
+                call()
+                timings.append(time.perf_counter() - start)
+            timings.sort()
+            results[name] = (percentile(timings, 50) * 1000, percentile(timings, 99) * 1000)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders", type=int, default=500)
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_mode(args)))
+        return
+
+    results = {}
+    for fast in ("0", "1"):
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.fast_json", "--child",
+             "--orders", str(args.orders), "--runs", str(args.runs)],
+            cwd=BACKEND_DIR,
+            env={**os.environ, "FAST_JSON": fast},
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        results[fast] = json.loads(output.splitlines()[-1])
+
+    print(f"{'request':<14} {'normal p50':>11} {'p99':>9} {'FAST_JSON p50':>14} {'p99':>9} {'speedup':>8}")
+    for name, (p50, p99) in results["0"].items():
+        fast_p50, fast_p99 = results["1"][name]
+        print(f"{name:<14} {p50:>9.2f}ms {p99:>7.2f}ms {fast_p50:>12.2f}ms {fast_p99:>7.2f}ms {p50 / fast_p50:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Pedidos por segundo: una transacción por pedido frente a la cola de escritura.
+
+Levanta `app.main:app` (`--workers` procesos de uvicorn) con
+WRITE_QUEUE_ENABLED=0 y =1 sobre la misma base de datos y lanza
+`POST /orders/` en bucle con varios niveles de concurrencia. Se repite para
+cada valor de SQLITE_SYNCHRONOUS: con NORMAL (el de por defecto, WAL) el
+COMMIT no hace fsync; con FULL sí, y cuanto más lento sea el fsync del disco,
+más se nota juntar pedidos en un mismo COMMIT. El resto de settings
+(WRITE_QUEUE_MAX_WAIT_MS, ...) se heredan del entorno.
+
+Uso (desde backend/):
+
+    python -m benchmarks.group_commit [--duration 10] [--concurrency 1 16 64]
+        [--synchronous NORMAL FULL] [--workers 1]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+
+from benchmarks.common import run_load, use_temp_database, uvicorn_server
+
+use_temp_database()
+
+from sqlmodel import Session  # noqa: E402
+
+from app.db import create_db_and_tables, engine  # noqa: E402
+from app.models.products import Product  # noqa: E402
+from app.models.users import User  # noqa: E402
+from app.routes.auth import create_access_token  # noqa: E402
+
+N_PRODUCTS = 50
+
+
+def seed() -> tuple[list[int], str]:
+    create_db_and_tables()
+    with Session(engine) as session:
+        user = User(first_name="Bench", last_name="Buyer", email="bench@example.com", password_hash="x")
+        products = [
+            Product(title=f"Product {i}", slug=f"product-{i}", price_cents=1000, stock=10**9)
+            for i in range(N_PRODUCTS)
+        ]
+        session.add_all([user, *products])
+        session.commit()
+        return [p.id for p in products], create_access_token({"sub": str(user.id)})
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64])
+    parser.add_argument("--synchronous", nargs="+", default=["NORMAL", "FULL"])
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers (procesos escribiendo a la vez)")
+    args = parser.parse_args()
+
+    product_ids, token = seed()
+    headers = {"Authorization": f"Bearer {token}"}
+
+    def _request(client, n):
+        # 2 líneas por pedido, productos repartidos (sin stock agotado)
+        items = [
+            {"product_id": product_ids[n % N_PRODUCTS], "quantity": 1},
+            {"product_id": product_ids[(n * 7 + 3) % N_PRODUCTS], "quantity": 2},
+        ]
+        return client.post("/orders/", json={"items": items}, headers=headers)
+
+    print(f"{'synchronous':<11} {'queue':<5} {'clients':>7} {'orders/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for synchronous in args.synchronous:
+        results = {}
+        for queue in ("0", "1"):
+            env = {**os.environ, "WRITE_QUEUE_ENABLED": queue, "SQLITE_SYNCHRONOUS": synchronous}
+            with uvicorn_server("app.main:app", env=env, workers=args.workers) as base_url:
+                for concurrency in args.concurrency:
+                    r = asyncio.run(run_load(base_url, _request, concurrency, args.duration))
+                    results[queue, concurrency] = r["rps"]
+                    print(
+                        f"{synchronous:<11} {'on' if queue == '1' else 'off':<5} {concurrency:>7} "
+                        f"{r['rps']:>10.1f} {r['p50_ms']:>9.1f} {r['p99_ms']:>9.1f} {r['errors']:>7}"
+                    )
+        for concurrency in args.concurrency:
+            off, on = results["0", concurrency], results["1", concurrency]
+            print(f"{synchronous:<11} speedup with {concurrency} clients: {on / off if off else 0:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Guardia de Idempotency-Key: reintentos y duplicados de POST /orders.
+
+Para cada tamaño de la LRU de respuestas (`--cache-entries`, por defecto el de
+Settings y 0 = desactivada) lanza un proceso con una BD temporal que:
+
+* repite un pedido con la misma clave: la segunda respuesta es la misma, con
+  `Idempotent-Replayed: true`, y solo se crea un pedido;
+* reutiliza la clave con otro body: 422;
+* manda `--duplicates` peticiones concurrentes con otra clave: un solo pedido
+  y todas con la misma respuesta.
+
+Cada proceso tiene `--timeout` segundos (un reintento que se queda en bucle
+cuenta como fallo). Sale con código 1 si algo falla.
+
+Uso (desde backend/):
+
+    python -m benchmarks.idempotency_replay [--cache-entries 10000 0] [--duplicates 10]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import BACKEND_DIR, use_temp_database
+
+
+def run_scenarios(duplicates: int) -> list[str]:
+    use_temp_database()
+    from fastapi.testclient import TestClient
+    from sqlmodel import Session, func, select
+
+    from app.db import engine
+    from app.main import app
+    from app.models.orders import Order
+    from app.models.products import Product
+    from app.models.users import User
+    from app.routes.auth import create_access_token
+
+    errors = []
+    with TestClient(app) as client:
+        with Session(engine) as session:
+            user = User(first_name="Bench", last_name="User", email="bench@example.com", password_hash="x")
+            product = Product(title="Bench", slug="bench", price_cents=100, stock=10**6)
+            session.add(user)
+            session.add(product)
+            session.commit()
+            token, product_id = create_access_token({"sub": str(user.id)}), product.id
+
+        def orders() -> int:
+            with Session(engine) as session:
+                return session.exec(select(func.count()).select_from(Order)).one()
+
+        def post(key: str, quantity: int = 1):
+            headers = {"Authorization": f"Bearer {token}", "Idempotency-Key": key}
+            return client.post("/orders/", headers=headers, json={"items": [{"product_id": product_id, "quantity": quantity}]})
+
+        first, retry = post("retry"), post("retry")
+        if first.status_code != 201 or retry.status_code != 201 or retry.json() != first.json():
+            errors.append(f"retry: {first.status_code} then {retry.status_code}, same body: {retry.json() == first.json()}")
+        if retry.headers.get("idempotent-replayed") != "true":
+            errors.append("retry: missing Idempotent-Replayed header")
+        if orders() != 1:
+            errors.append(f"retry: {orders()} orders created, expected 1")
+
+        other = post("retry", quantity=2)
+        if other.status_code != 422:
+            errors.append(f"same key, different body: expected 422, got {other.status_code}")
+
+        with ThreadPoolExecutor(duplicates) as pool:
+            responses = list(pool.map(lambda _: post("concurrent"), range(duplicates)))
+        statuses = sorted({r.status_code for r in responses})
+        if statuses != [201] or len({r.json()["id"] for r in responses}) != 1:
+            errors.append(f"concurrent duplicates: statuses {statuses}, {len({r.text for r in responses})} distinct bodies")
+        if orders() != 2:
+            errors.append(f"concurrent duplicates: {orders() - 1} orders created, expected 1")
+    return errors
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cache-entries", type=int, nargs="+", help="tamaños de la LRU (por defecto: Settings y 0)")
+    parser.add_argument("--duplicates", type=int, default=10)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        errors = run_scenarios(args.duplicates)
+        for error in errors:
+            print(error)
+        return 1 if errors else 0
+
+    from app.config import settings
+
+    failed = False
+    for entries in args.cache_entries or [settings.IDEMPOTENCY_CACHE_ENTRIES, 0]:
+        env = dict(os.environ, IDEMPOTENCY_CACHE_ENTRIES=str(entries))
+        try:
+            result = subprocess.run(
+                [sys.executable, "-W", "ignore", "-m", "benchmarks.idempotency_replay", "--child",
+                 "--duplicates", str(args.duplicates)],
+                cwd=BACKEND_DIR, env=env, capture_output=True, text=True, timeout=args.timeout,
+            )
+            output, ok = result.stdout.strip() or result.stderr.strip()[-500:], result.returncode == 0
+        except subprocess.TimeoutExpired:
+            output, ok = f"no answer after {args.timeout:g}s", False
+        print(f"IDEMPOTENCY_CACHE_ENTRIES={entries}: {'OK' if ok else 'FAIL'}")
+        if not ok:
+            failed = True
+            for line in output.splitlines():
+                print("   ", line)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,383 @@
+"""Prueba de carga reproducible de la API con una mezcla de escenarios.
+
+Crea una base de datos temporal (catálogo, usuarios con pedidos) y lanza
+`--concurrency` usuarios virtuales durante `--duration` segundos. Cada usuario
+elige en bucle un escenario según los pesos de `--mix`, con su propio RNG a
+partir de `--seed`, así que con los mismos parámetros cada usuario repite la
+misma secuencia de peticiones (y el catálogo es el mismo):
+
+* browse      GET /products (página 1 o siguiente con cursor, varios órdenes)
+* search      GET /products?q=...
+* checkout    POST /checkout/validate (1-5 líneas)
+* login       POST /auth/login (bcrypt)
+* order       POST /orders
+* my_orders   GET /orders
+
+La app corre en el mismo proceso (`--target inprocess`, httpx + ASGI, sin
+red) o en uvicorn (`--target uvicorn`, `--workers`). Los límites de
+login/registro se desactivan (RATE_LIMIT_ENABLED=0) salvo que vengan en el
+entorno.
+
+Saca throughput y p50/p95/p99 por escenario; con `--output` los guarda en
+JSON, y con `--baseline` compara con otra ejecución y sale con código 1 si
+algún escenario empeora más de lo permitido (`--max-latency-regression` sobre
+p95, `--max-throughput-regression` sobre req/s, en %) o hay más errores que
+`--max-error-rate`.
+
+Uso (desde backend/):
+
+    python -m benchmarks.loadtest --output before.json
+    python -m benchmarks.loadtest --baseline before.json --output after.json
+    python -m benchmarks.loadtest --target uvicorn --workers 2 --mix browse=5,order=1
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable
+
+import httpx
+
+from benchmarks.common import BACKEND_DIR, percentile, use_temp_database, uvicorn_server
+
+use_temp_database()
+os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+
+from sqlmodel import Session  # noqa: E402
+
+from app.db import create_db_and_tables, engine  # noqa: E402
+from app.models.orders import Order, OrderItem  # noqa: E402
+from app.models.products import Product  # noqa: E402
+from app.models.users import User  # noqa: E402
+from app.routes.auth import create_access_token  # noqa: E402
+from app.security import get_password_hash  # noqa: E402
+
+DEFAULT_MIX = "browse=40,search=20,checkout=15,my_orders=10,order=10,login=5"
+PASSWORD = "loadtest-password"
+
+_WORDS = (
+    "wireless mouse keyboard monitor laptop stand headset usb cable charger webcam "
+    "speaker microphone desk lamp chair backpack notebook pen tablet case"
+).split()
+_ADJECTIVES = "ergonomic compact portable premium basic gaming silent bluetooth mechanical".split()
+
+
+# ---------------------------------------------------------------------------
+# Datos
+# ---------------------------------------------------------------------------
+
+
+def seed_database(n_products: int, n_users: int, orders_per_user: int, seed: int) -> dict:
+    """Catálogo y usuarios deterministas; devuelve lo que necesitan los escenarios."""
+    rng = random.Random(seed)
+    create_db_and_tables()
+    password_hash = get_password_hash(PASSWORD)  # un solo bcrypt para todos
+    with Session(engine) as session:
+        products = []
+        for i in range(n_products):
+            noun = rng.choice(_WORDS)
+            title = f"{rng.choice(_ADJECTIVES).title()} {noun.title()} {i}"
+            products.append(Product(
+                title=title,
+                slug=f"lt-{i}",
+                description=f"{title}: {' '.join(rng.sample(_WORDS, 6))}",
+                price_cents=rng.randint(199, 99_999),
+                stock=10**9,  # los pedidos de la prueba nunca agotan stock
+            ))
+        users = [
+            User(first_name="Load", last_name=f"User {i}", email=f"loadtest{i}@example.com", password_hash=password_hash)
+            for i in range(n_users)
+        ]
+        session.add_all([*products, *users])
+        session.flush()
+        for user in users:
+            for _ in range(orders_per_user):
+                items = [
+                    OrderItem(product_id=rng.choice(products).id, unit_price_cents=1000, quantity=rng.randint(1, 3))
+                    for _ in range(rng.randint(1, 4))
+                ]
+                session.add(Order(user_id=user.id, total_cents=sum(i.unit_price_cents * i.quantity for i in items), items=items))
+        session.commit()
+        return {
+            "product_ids": [p.id for p in products],
+            "users": [(u.email, {"Authorization": f"Bearer {create_access_token({'sub': str(u.id)})}"}) for u in users],
+        }
+
+
+# ---------------------------------------------------------------------------
+# Escenarios: (client, rng, data) -> respuesta
+# ---------------------------------------------------------------------------
+
+
+async def browse(client, rng, data):
+    params = {"limit": 50}
+    sort = rng.choice((None, "price_asc", "price_desc", "newest"))
+    if sort:
+        params["sort"] = sort
+    response = await client.get("/products/", params=params)
+    cursor = response.headers.get("X-Next-Cursor")
+    if cursor and rng.random() < 0.5:  # la mitad pasa a la página siguiente
+        response = await client.get("/products/", params={**params, "cursor": cursor})
+    return response
+
+
+async def search(client, rng, data):
+    q = rng.choice(_WORDS) if rng.random() < 0.7 else f"{rng.choice(_ADJECTIVES)} {rng.choice(_WORDS)}"
+    return await client.get("/products/", params={"q": q, "limit": 20})
+
+
+async def checkout(client, rng, data):
+    items = [
+        {"product_id": rng.choice(data["product_ids"]), "quantity": rng.randint(1, 3)}
+        for _ in range(rng.randint(1, 5))
+    ]
+    return await client.post("/checkout/validate", json={"items": items})
+
+
+async def login(client, rng, data):
+    email, _ = rng.choice(data["users"])
+    return await client.post("/auth/login", data={"username": email, "password": PASSWORD})
+
+
+async def order(client, rng, data):
+    _, headers = rng.choice(data["users"])
+    items = [
+        {"product_id": rng.choice(data["product_ids"]), "quantity": rng.randint(1, 2)}
+        for _ in range(rng.randint(1, 3))
+    ]
+    return await client.post("/orders/", json={"items": items}, headers=headers)
+
+
+async def my_orders(client, rng, data):
+    _, headers = rng.choice(data["users"])
+    return await client.get("/orders/", params={"limit": 50}, headers=headers)
+
+
+SCENARIOS: dict[str, Callable[..., Awaitable[httpx.Response]]] = {
+    "browse": browse,
+    "search": search,
+    "checkout": checkout,
+    "login": login,
+    "order": order,
+    "my_orders": my_orders,
+}
+
+
+def parse_mix(spec: str) -> dict[str, float]:
+    """"browse=40,order=10" -> {"browse": 40.0, "order": 10.0}."""
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise SystemExit(f"unknown scenario {name!r} (choose from {', '.join(SCENARIOS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+# ---------------------------------------------------------------------------
+# Carga
+# ---------------------------------------------------------------------------
+
+
+@contextlib.asynccontextmanager
+async def _client(target: str, workers: int, concurrency: int, timeout: float):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    if target == "inprocess":
+        from app.main import app
+
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=timeout) as client:
+                yield client
+    else:
+        with uvicorn_server("app.main:app", env=dict(os.environ), workers=workers) as base_url:
+            async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+                yield client
+
+
+async def run(args, mix: dict[str, float], data: dict) -> dict:
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    latencies: dict[str, list[float]] = {n: [] for n in names}
+    errors: dict[str, int] = {n: 0 for n in names}
+    statuses: dict[str, dict[str, int]] = {n: {} for n in names}
+
+    async with _client(args.target, args.workers, args.concurrency, args.timeout) as client:
+        measuring = False
+
+        async def user(user_id: int, stop_at: float) -> None:
+            rng = random.Random(args.seed * 1_000_003 + user_id)
+            while time.perf_counter() < stop_at:
+                name = rng.choices(names, weights)[0]
+                start = time.perf_counter()
+                try:
+                    response = await SCENARIOS[name](client, rng, data)
+                    status = response.status_code
+                except httpx.HTTPError:
+                    status = None
+                elapsed = time.perf_counter() - start
+                if not measuring:
+                    continue
+                latencies[name].append(elapsed)
+                key = str(status) if status is not None else "transport_error"
+                statuses[name][key] = statuses[name].get(key, 0) + 1
+                # 4xx son fallos del escenario (no deberían darse con estos datos)
+                if status is None or status >= 400:
+                    errors[name] += 1
+
+        if args.warmup > 0:
+            stop_at = time.perf_counter() + args.warmup
+            await asyncio.gather(*(user(-1 - i, stop_at) for i in range(args.concurrency)))
+
+        measuring = True
+        started = time.perf_counter()
+        stop_at = started + args.duration
+        await asyncio.gather(*(user(i, stop_at) for i in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    def summary(values: list[float], n_errors: int) -> dict:
+        values = sorted(values)
+        return {
+            "requests": len(values),
+            "errors": n_errors,
+            "error_rate": n_errors / len(values) if values else 0.0,
+            "rps": len(values) / elapsed if elapsed else 0.0,
+            "p50_ms": percentile(values, 50) * 1000,
+            "p95_ms": percentile(values, 95) * 1000,
+            "p99_ms": percentile(values, 99) * 1000,
+        }
+
+    endpoints = {n: {**summary(latencies[n], errors[n]), "statuses": statuses[n]} for n in names}
+    total = summary([v for n in names for v in latencies[n]], sum(errors.values()))
+    return {"elapsed_s": elapsed, "total": total, "endpoints": endpoints}
+
+
+# ---------------------------------------------------------------------------
+# Informe y comparación
+# ---------------------------------------------------------------------------
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(result: dict, baseline: dict, args) -> list[str]:
+    """Escenarios que superan algún umbral respecto a `baseline`."""
+    failures = []
+    rows = {**result["endpoints"], "total": result["total"]}
+    base_rows = {**baseline["endpoints"], "total": baseline["total"]}
+    for name, current in rows.items():
+        if current["error_rate"] > args.max_error_rate:
+            failures.append(f"{name}: error rate {current['error_rate']:.2%} > {args.max_error_rate:.2%}")
+        base = base_rows.get(name)
+        if not base or not base["requests"] or not current["requests"]:
+            continue
+        if base["p95_ms"] and args.max_latency_regression is not None:
+            change = (current["p95_ms"] / base["p95_ms"] - 1) * 100
+            if change > args.max_latency_regression:
+                failures.append(
+                    f"{name}: p95 {base['p95_ms']:.1f} -> {current['p95_ms']:.1f} ms "
+                    f"(+{change:.0f}% > {args.max_latency_regression:g}%)"
+                )
+        if base["rps"] and args.max_throughput_regression is not None:
+            change = (1 - current["rps"] / base["rps"]) * 100
+            if change > args.max_throughput_regression:
+                failures.append(
+                    f"{name}: {base['rps']:.1f} -> {current['rps']:.1f} req/s "
+                    f"(-{change:.0f}% > {args.max_throughput_regression:g}%)"
+                )
+    return failures
+
+
+def print_table(result: dict, baseline: dict | None) -> None:
+    base_rows = {**baseline["endpoints"], "total": baseline["total"]} if baseline else {}
+    header = f"{'scenario':<10} {'requests':>8} {'errors':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+    print(header + (f" {'Δ req/s':>8} {'Δ p95':>7}" if baseline else ""))
+    for name, row in {**result["endpoints"], "total": result["total"]}.items():
+        line = (
+            f"{name:<10} {row['requests']:>8} {row['errors']:>6} {row['rps']:>8.1f} "
+            f"{row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f}"
+        )
+        base = base_rows.get(name)
+        if base and base["rps"] and base["p95_ms"]:
+            line += f" {(row['rps'] / base['rps'] - 1) * 100:>+7.0f}% {(row['p95_ms'] / base['p95_ms'] - 1) * 100:>+6.0f}%"
+        print(line)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target", choices=("inprocess", "uvicorn"), default="inprocess")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers (--target uvicorn)")
+    parser.add_argument("--concurrency", type=int, default=20, help="usuarios virtuales")
+    parser.add_argument("--duration", type=float, default=20.0, help="segundos medidos")
+    parser.add_argument("--warmup", type=float, default=3.0, help="segundos previos sin medir")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"pesos por escenario (default: {DEFAULT_MIX})")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--orders-per-user", type=int, default=20)
+    parser.add_argument("--output", help="guardar resultados en este JSON")
+    parser.add_argument("--baseline", help="JSON de otra ejecución con el que comparar")
+    parser.add_argument("--max-latency-regression", type=float, default=20.0, help="%% máximo de subida del p95")
+    parser.add_argument("--max-throughput-regression", type=float, default=10.0, help="%% máximo de bajada de req/s")
+    parser.add_argument("--max-error-rate", type=float, default=0.0, help="fracción máxima de errores (0.01 = 1%%)")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    data = seed_database(args.products, args.users, args.orders_per_user, args.seed)
+    result = asyncio.run(run(args, mix, data))
+    result = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "config": {
+            key: getattr(args, key)
+            for key in ("target", "workers", "concurrency", "duration", "warmup", "seed", "products", "users",
+                        "orders_per_user")
+        } | {"mix": mix},
+        **result,
+    }
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("config", {}) != result["config"]:
+            print("warning: baseline was run with a different config", file=sys.stderr)
+
+    print_table(result, baseline)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"results written to {args.output}")
+
+    # sin baseline solo cuenta la tasa de errores
+    failures = compare(result, baseline or {"endpoints": {}, "total": {}}, args)
+    for failure in failures:
+        print(f"REGRESSION {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+"""Coste por petición de MetricsMiddleware (app/metrics.py).
+
+Llama directamente (sin servidor ni cliente HTTP) a una app ASGI mínima que
+contesta 200 con un body pequeño, con y sin el middleware delante, y resta.
+Incluye dos sentencias SQL "de mentira" por petición a través del contador
+del ContextVar para medir también esa parte. Objetivo: < 20 µs.
+
+Uso (desde backend/):
+
+    python -m benchmarks.metrics_overhead [--requests 200000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import time
+
+from app.metrics import MetricsMiddleware, _current_request, render
+
+BUDGET_US = 20.0
+
+
+class _Route:
+    path = "/products/{product_id}"
+
+
+async def _endpoint(scope, receive, send):
+    scope["route"] = _Route  # lo que hace el router de Starlette al casar la ruta
+    request = _current_request.get()
+    if request is not None:  # como los eventos de SQLAlchemy, dos sentencias
+        for _ in range(2):
+            request[0] += 1
+            request[1] += 0.0001
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b'{"ok":true}'})
+
+
+async def _receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def _send(message):
+    pass
+
+
+async def _time(app, n: int) -> float:
+    scope = {"type": "http", "method": "GET", "path": "/products/1"}
+    start = time.perf_counter()
+    for _ in range(n):
+        await app(dict(scope), _receive, _send)
+    return (time.perf_counter() - start) / n
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200_000)
+    args = parser.parse_args()
+
+    wrapped = MetricsMiddleware(_endpoint)
+
+    async def run() -> tuple[float, float]:
+        await _time(_endpoint, 10_000)  # calentamiento
+        await _time(wrapped, 10_000)
+        base = min([await _time(_endpoint, args.requests) for _ in range(3)])
+        instrumented = min([await _time(wrapped, args.requests) for _ in range(3)])
+        return base, instrumented
+
+    base, instrumented = asyncio.run(run())
+    overhead_us = (instrumented - base) * 1e6
+    start = time.perf_counter()
+    body = render()
+    render_ms = (time.perf_counter() - start) * 1000
+
+    print(f"bare app:        {base * 1e6:7.2f} µs/request")
+    print(f"with metrics:    {instrumented * 1e6:7.2f} µs/request")
+    print(f"overhead:        {overhead_us:7.2f} µs/request (budget {BUDGET_US:g} µs)")
+    print(f"render /metrics: {render_ms:7.2f} ms ({len(body)} bytes)")
+    return 0 if overhead_us < BUDGET_US else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
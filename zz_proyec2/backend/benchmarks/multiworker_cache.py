@@ -0,0 +1,81 @@
+"""Guardia de la caché de queries con varios workers (una caché por proceso).
+
+Lanza `--workers` workers de uvicorn sobre una BD temporal VACÍA (cada uno
+calienta su caché al arrancar) y comprueba que ningún worker sirve datos
+viejos:
+
+* productos insertados por otro proceso (como seed_products.py) aparecen en
+  `GET /products/` de todos los workers;
+* tras un `PATCH /products/{id}` atendido por un worker, las `--requests`
+  lecturas siguientes (repartidas entre todos) devuelven el precio nuevo.
+
+Sale con código 1 si alguna lectura es vieja.
+
+Uso (desde backend/):
+
+    python -m benchmarks.multiworker_cache [--workers 3] [--requests 60]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+
+import httpx
+
+from benchmarks.common import uvicorn_server, use_temp_database
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--requests", type=int, default=60)
+    args = parser.parse_args()
+
+    db_path = use_temp_database()
+    from app.db import create_db_and_tables, engine  # BD temporal ya fijada
+    from app.models.products import Product
+    from sqlmodel import Session
+
+    create_db_and_tables()
+    errors = []
+    with uvicorn_server("app.main:app", env=dict(os.environ, SQLITE_PATH=str(db_path)), workers=args.workers) as url:
+        with httpx.Client(base_url=url) as client:
+            # cada worker llega a cachear la primera página (vacía)
+            for _ in range(args.requests):
+                client.get("/products/", headers={"Connection": "close"})
+
+            with Session(engine) as session:  # "otro proceso"
+                product = Product(title="Seeded", slug="seeded", price_cents=100, stock=5)
+                session.add(product)
+                session.commit()
+                product_id = product.id
+            empty = sum(
+                client.get("/products/", headers={"Connection": "close"}).json() == []
+                for _ in range(args.requests)
+            )
+            if empty:
+                errors.append(f"GET /products/: {empty}/{args.requests} responses missed the seeded product")
+
+            for _ in range(args.requests):
+                client.get(f"/products/{product_id}", headers={"Connection": "close"})
+            client.patch(f"/products/{product_id}", json={"price_cents": 250})
+            stale = sum(
+                client.get(f"/products/{product_id}", headers={"Connection": "close"}).json()["price_cents"] != 250
+                for _ in range(args.requests)
+            )
+            if stale:
+                errors.append(f"GET /products/{product_id}: {stale}/{args.requests} responses had the old price")
+
+    if errors:
+        print("FAIL:")
+        for error in errors:
+            print("   ", error)
+        return 1
+    print(f"OK: {args.workers} workers, no stale reads after external and cross-worker writes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
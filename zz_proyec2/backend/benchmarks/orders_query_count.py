@@ -0,0 +1,93 @@
+"""Guardia de N+1: número de sentencias SQL de `GET /orders/`.
+
+Crea una BD temporal con un usuario con muchos pedidos, pide una página del
+historial y cuenta las sentencias emitidas. Sale con código 1 si supera el
+máximo permitido (usuario del token + pedidos + items en un único IN).
+
+Uso (desde backend/):
+
+    python -m benchmarks.orders_query_count [--orders 500] [--max-statements 3]
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+
+from benchmarks.common import use_temp_database
+
+use_temp_database()
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+from sqlmodel import Session  # noqa: E402
+
+from app.db import engine, read_engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.orders import Order, OrderItem  # noqa: E402
+from app.models.products import Product  # noqa: E402
+from app.models.users import User  # noqa: E402
+from app.routes.auth import create_access_token  # noqa: E402
+
+
+def seed(n_orders: int) -> int:
+    with Session(engine) as session:
+        user = User(first_name="Bench", last_name="User", email="bench@example.com", password_hash="x")
+        product = Product(title="Bench", slug="bench", price_cents=100, stock=10)
+        session.add(user)
+        session.add(product)
+        session.flush()
+        for _ in range(n_orders):
+            order = Order(user_id=user.id, status="created", total_cents=300)
+            order.items = [
+                OrderItem(product_id=product.id, unit_price_cents=100, quantity=1) for _ in range(3)
+            ]
+            session.add(order)
+        session.commit()
+        return user.id
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--max-statements", type=int, default=3)
+    args = parser.parse_args()
+
+    statements: list[str] = []
+
+    @event.listens_for(read_engine.sync_engine, "before_cursor_execute")
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with TestClient(app) as client:
+        user_id = seed(args.orders)
+        headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user_id)})}"}
+
+        before_id = None
+        pages = 0
+        while True:
+            params = {"limit": args.limit}
+            if before_id is not None:
+                params["before_id"] = before_id
+            statements.clear()
+            response = client.get("/orders/", params=params, headers=headers)
+            response.raise_for_status()
+            pages += 1
+            # pragma de conexión nueva no cuentan como trabajo de la ruta
+            n = sum(1 for s in statements if not s.startswith("PRAGMA"))
+            if n > args.max_statements:
+                print(f"FAIL: page {pages} issued {n} statements (max {args.max_statements})")
+                for s in statements:
+                    print("   ", s.splitlines()[0])
+                return 1
+            before_id = response.headers.get("X-Next-Before-Id")
+            if before_id is None:
+                break
+
+    print(f"OK: {pages} pages of {args.limit} orders, <= {args.max_statements} statements each")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+"""Stress de sobreventa: muchos compradores concurrentes contra poco stock.
+
+Levanta la API con varios workers de uvicorn (procesos distintos escribiendo
+en el mismo fichero SQLite) y lanza `--buyers` pedidos simultáneos contra
+productos con `--stock` unidades. Comprueba que:
+
+* el stock nunca queda negativo,
+* unidades vendidas en pedidos 201 == stock inicial - stock final,
+* el total de OrderItem en BD coincide con lo vendido.
+
+Después, en un proceso aparte con un producto hot (stock en memoria) y la cola
+de escritura con lotes de `--batch-wait-ms`, lanza `--buyers` pedidos y cancela
+cada uno a los 0-`--cancel-ms` ms (cliente que se va, timeout): bastantes caen con
+su job ya dentro de un lote que aún hace COMMIT. Mientras, recarga los
+contadores desde la BD (`inventory.reload`) cada pocos ms. Al final, sin reservas
+pendientes, el contador en memoria tiene que ser igual al stock de la fila, que
+no puede ser negativo ni distinto del stock inicial menos lo que hay en
+OrderItem.
+
+Sale con código 1 si algo no cuadra.
+
+Uso (desde backend/):
+
+    python -m benchmarks.oversell_stress [--buyers 400] [--stock 50] [--workers 4]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+
+import httpx
+
+from benchmarks.common import BACKEND_DIR, use_temp_database, uvicorn_server
+
+use_temp_database()
+
+from sqlalchemy import func  # noqa: E402
+from sqlmodel import Session, select  # noqa: E402
+
+from app.db import create_db_and_tables, engine, read_engine, write_engine  # noqa: E402
+from app.models.orders import OrderItem  # noqa: E402
+from app.models.products import Product  # noqa: E402
+from app.models.users import User  # noqa: E402
+from app.routes.auth import create_access_token  # noqa: E402
+
+
+def seed(n_products: int, stock: int) -> tuple[list[int], str]:
+    create_db_and_tables()
+    with Session(engine) as session:
+        user = User(first_name="Stress", last_name="Buyer", email="stress@example.com", password_hash="x")
+        session.add(user)
+        products = [
+            Product(title=f"Hot {i}", slug=f"hot-{i}", price_cents=1000, stock=stock)
+            for i in range(n_products)
+        ]
+        session.add_all(products)
+        session.commit()
+        return [p.id for p in products], create_access_token({"sub": str(user.id)})
+
+
+async def buy(base_url: str, token: str, product_ids: list[int], buyers: int, seed_value: int):
+    rng = random.Random(seed_value)
+    headers = {"Authorization": f"Bearer {token}"}
+    limits = httpx.Limits(max_connections=buyers)
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits, timeout=60) as client:
+
+        async def one() -> tuple[int, dict[int, int]]:
+            # carrito de 1-3 productos, a veces con líneas repetidas
+            lines = [
+                {"product_id": rng.choice(product_ids), "quantity": rng.randint(1, 3)}
+                for _ in range(rng.randint(1, 3))
+            ]
+            response = await client.post("/orders/", json={"items": lines})
+            sold: dict[int, int] = {}
+            if response.status_code == 201:
+                for item in response.json()["items"]:
+                    sold[item["product_id"]] = sold.get(item["product_id"], 0) + item["quantity"]
+            return response.status_code, sold
+
+        return await asyncio.gather(*(one() for _ in range(buyers)))
+
+
+async def cancelled_buyers(buyers: int, stock: int, cancel_ms: float, seed_value: int) -> bool:
+    """Pedidos cancelados a mitad contra un producto hot (proceso con la cola activa)."""
+    from app.inventory import inventory
+    from app.models.orders import OrderCreate, OrderItemCreate
+    from app.routes.orders import create_order
+    from app.writer import write_queue
+
+    (product_id,), _ = seed(1, stock)
+    if product_id not in inventory.hot_ids:
+        raise SystemExit(f"product {product_id} is not hot: {sorted(inventory.hot_ids)}")
+    with Session(engine) as session:
+        user = session.exec(select(User)).one()
+    await inventory.start()
+
+    rng = random.Random(seed_value)
+    loop = asyncio.get_running_loop()
+    tasks = []
+    for _ in range(buyers):
+        payload = OrderCreate(items=[OrderItemCreate(product_id=product_id, quantity=rng.randint(1, 3))])
+        task = asyncio.create_task(create_order(payload, current_user=user))
+        loop.call_later(rng.uniform(0, cancel_ms / 1000), task.cancel)
+        tasks.append(task)
+
+    async def reload_loop():
+        while True:
+            await inventory.reload()
+            await asyncio.sleep(0.005)
+
+    reloader = asyncio.create_task(reload_loop())
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    reloader.cancel()
+    cancelled = sum(isinstance(r, asyncio.CancelledError) for r in results)
+
+    await write_queue.stop()  # lo que quedara en lotes sin COMMIT
+    await inventory.stop()  # flush: lo apuntado pasa a la fila
+    await read_engine.dispose()
+    await write_engine.dispose()
+    in_flight = inventory._in_flight.get(product_id, 0)
+    available = inventory.available(product_id)
+    with Session(engine) as session:
+        row_stock = session.get(Product, product_id).stock
+        in_db = session.exec(
+            select(func.coalesce(func.sum(OrderItem.quantity), 0)).where(OrderItem.product_id == product_id)
+        ).one()
+    ok = in_flight == 0 and available == row_stock >= 0 and stock - row_stock == in_db
+    print(
+        f"cancellation: {cancelled}/{buyers} cancelled, stock {stock} -> {row_stock}, items in db {in_db}, "
+        f"in memory {available}, in flight {in_flight} {'OK' if ok else 'MISMATCH'}"
+    )
+    return ok
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--buyers", type=int, default=400)
+    parser.add_argument("--products", type=int, default=3)
+    parser.add_argument("--stock", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--cancel-ms", type=float, default=2000)
+    parser.add_argument("--batch-wait-ms", type=float, default=10)
+    parser.add_argument("--cancel-case", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.cancel_case:
+        ok = asyncio.run(cancelled_buyers(args.buyers, args.stock, args.cancel_ms, args.seed))
+        return 0 if ok else 1
+
+    product_ids, token = seed(args.products, args.stock)
+    with uvicorn_server("app.main:app", env=dict(os.environ), workers=args.workers) as base_url:
+        results = asyncio.run(buy(base_url, token, product_ids, args.buyers, args.seed))
+
+    statuses: dict[int, int] = {}
+    sold: dict[int, int] = {pid: 0 for pid in product_ids}
+    for status, order_sold in results:
+        statuses[status] = statuses.get(status, 0) + 1
+        for pid, q in order_sold.items():
+            sold[pid] += q
+
+    ok = True
+    with Session(engine) as session:
+        for pid in product_ids:
+            stock = session.get(Product, pid).stock
+            in_db = session.exec(
+                select(func.coalesce(func.sum(OrderItem.quantity), 0)).where(OrderItem.product_id == pid)
+            ).one()
+            consistent = stock >= 0 and args.stock - stock == sold[pid] == in_db
+            ok &= consistent
+            print(
+                f"product {pid}: stock {args.stock} -> {stock}, sold {sold[pid]}, "
+                f"items in db {in_db} {'OK' if consistent else 'MISMATCH'}"
+            )
+    print("responses:", dict(sorted(statuses.items())))
+    if any(code >= 500 for code in statuses):
+        ok = False
+
+    # BD nueva: el único producto es el 1
+    env = dict(
+        os.environ, HOT_INVENTORY_PRODUCT_IDS="[1]", WRITE_QUEUE_ENABLED="1",
+        WRITE_QUEUE_MAX_WAIT_MS=str(args.batch_wait_ms),
+    )
+    cancel_case = subprocess.run(
+        [sys.executable, "-W", "ignore", "-m", "benchmarks.oversell_stress", "--cancel-case",
+         "--buyers", str(args.buyers), "--stock", str(args.stock * 4), "--cancel-ms", str(args.cancel_ms),
+         "--seed", str(args.seed)],
+        cwd=BACKEND_DIR, env=env,
+    )
+    ok &= cancel_case.returncode == 0
+    print("PASS" if ok else "FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
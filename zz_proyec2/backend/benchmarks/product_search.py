@@ -0,0 +1,105 @@
+"""Búsqueda de productos: LIKE '%q%' (antes) frente a FTS5 + bm25 (ahora).
+
+Genera un catálogo sintético de `--products` productos (1M por defecto) en una
+BD temporal y mide, para varias búsquedas típicas de la caja de búsqueda
+(palabras completas y prefijos mientras se teclea), la latencia de la query
+que ejecuta `GET /products?q=`.
+
+Uso (desde backend/):
+
+    python -m benchmarks.product_search [--products 1000000] [--runs 20]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from datetime import datetime
+
+from benchmarks.common import percentile, use_temp_database
+
+use_temp_database()
+
+from sqlmodel import Session, select  # noqa: E402
+
+from app.db import create_db_and_tables, engine  # noqa: E402
+from app.models.products import Product  # noqa: E402
+from app.routes.products import _list_stmt  # noqa: E402
+
+ADJECTIVES = [
+    "wireless", "ergonomic", "compact", "portable", "mechanical", "premium", "smart",
+    "ultra", "silent", "rugged", "gaming", "classic", "modular", "solar", "digital",
+]
+NOUNS = [
+    "mouse", "keyboard", "laptop", "monitor", "headset", "speaker", "charger", "cable",
+    "hub", "webcam", "router", "tablet", "stand", "backpack", "microphone", "lamp",
+]
+QUERIES = ["keyboard", "wireless mouse", "mech", "ergo hea", "solar lamp", "zzzz"]
+
+
+def build_catalog(n: int, seed: int = 7) -> None:
+    create_db_and_tables()
+    rng = random.Random(seed)
+    now = datetime.utcnow().isoformat(" ")
+    batch = 50_000
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        for start in range(0, n, batch):
+            rows = []
+            for i in range(start, min(n, start + batch)):
+                adj, noun = rng.choice(ADJECTIVES), rng.choice(NOUNS)
+                title = f"{adj.title()} {noun.title()} {i}"
+                description = f"{rng.choice(ADJECTIVES)} {noun} for {rng.choice(NOUNS)} lovers"
+                rows.append((title, f"sku-{i}", description, rng.randint(100, 99_999), "USD", 10, now, now))
+            # los triggers de product rellenan product_fts en la misma inserción
+            cursor.executemany(
+                "INSERT INTO product (title, slug, description, price_cents, currency, stock, "
+                "created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            raw.commit()
+    finally:
+        raw.close()
+
+
+def like_stmt(q: str, limit: int = 50):
+    return (
+        select(Product)
+        .where(Product.title.contains(q) | Product.description.contains(q))
+        .limit(limit)
+    )
+
+
+def measure(session: Session, stmt, runs: int) -> tuple[float, float, int]:
+    timings = []
+    rows = 0
+    for _ in range(runs):
+        start = time.perf_counter()
+        rows = len(session.exec(stmt).all())
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return percentile(timings, 50) * 1000, percentile(timings, 99) * 1000, rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=1_000_000)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    build_catalog(args.products)
+    print(f"catalog: {args.products} products built in {time.perf_counter() - started:.1f}s")
+
+    print(f"{'query':<16} {'LIKE p50':>10} {'LIKE p99':>10} {'FTS p50':>10} {'FTS p99':>10} {'rows':>5}")
+    with Session(engine) as session:
+        for q in QUERIES:
+            like_p50, like_p99, _ = measure(session, like_stmt(q), args.runs)
+            fts_p50, fts_p99, rows = measure(session, _list_stmt(q, 50, 0), args.runs)
+            print(f"{q:<16} {like_p50:>8.2f}ms {like_p99:>8.2f}ms {fts_p50:>8.2f}ms {fts_p99:>8.2f}ms {rows:>5}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""Guardia del profiler de SQL: presupuestos de queries y N+1 en las rutas de la tienda.
+
+Crea una BD temporal, perfila todas las peticiones, activa QUERY_BUDGET_ENFORCE
+(pasarse del presupuesto es un 500) y recorre las rutas con presupuesto: todas
+las páginas de `GET /orders/`, `POST /orders/` y `POST /checkout/validate` con
+carritos de 1 a `--max-items` líneas. Falla (código 1) si alguna petición
+no contesta lo esperado o si el logger "app.profiler" avisa de un N+1 o de un
+presupuesto superado.
+
+Antes comprueba que el propio profiler detecta lo que tiene que detectar: una
+ruta de prueba que hace una query por producto (N+1 + presupuesto) y el
+slow-query log con su EXPLAIN QUERY PLAN.
+
+Uso (desde backend/):
+
+    python -m benchmarks.query_budgets [--orders 120] [--max-items 30]
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import sys
+
+from benchmarks.common import use_temp_database
+
+use_temp_database()
+os.environ["QUERY_BUDGET_ENFORCE"] = "1"
+os.environ["QUERY_PROFILE_SAMPLE_RATE"] = "1"
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlmodel import Session, select  # noqa: E402
+
+from app.config import settings  # noqa: E402
+from app.db import engine  # noqa: E402
+from app.dependencies import ReadSessionDep  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.orders import Order, OrderItem  # noqa: E402
+from app.models.products import Product  # noqa: E402
+from app.models.users import User  # noqa: E402
+from app.profiler import query_budget  # noqa: E402
+from app.routes.auth import create_access_token  # noqa: E402
+
+
+class _Capture(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.messages: list[str] = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+def seed(n_orders: int, n_products: int) -> tuple[int, list[int]]:
+    with Session(engine) as session:
+        user = User(first_name="Bench", last_name="User", email="bench@example.com", password_hash="x")
+        products = [
+            Product(title=f"Product {i}", slug=f"product-{i}", price_cents=100, stock=10**6)
+            for i in range(n_products)
+        ]
+        session.add(user)
+        session.add_all(products)
+        session.flush()
+        for n in range(n_orders):
+            order = Order(user_id=user.id, status="created", total_cents=300)
+            order.items = [
+                OrderItem(product_id=products[(n + k) % n_products].id, unit_price_cents=100, quantity=1)
+                for k in range(3)
+            ]
+            session.add(order)
+        session.commit()
+        return user.id, [p.id for p in products]
+
+
+# ruta de prueba con un N+1 de libro: una query por producto
+@app.get("/_profiler_selfcheck", dependencies=[query_budget(3)])
+async def _selfcheck(session: ReadSessionDep, ids: str):
+    for product_id in ids.split(","):
+        (await session.exec(select(Product).where(Product.id == int(product_id)))).first()
+    return {"ok": True}
+
+
+def self_check(client: TestClient, capture: _Capture, product_ids: list[int]) -> list[str]:
+    """El profiler tiene que ver el N+1, cortar por presupuesto y registrar queries lentas."""
+    errors = []
+    ids = ",".join(str(pid) for pid in product_ids[:10])
+
+    settings.QUERY_BUDGET_ENFORCE = False  # solo aviso: la ruta acaba y se ve el N+1 entero
+    capture.messages.clear()
+    response = client.get("/_profiler_selfcheck", params={"ids": ids})
+    if response.status_code != 200:
+        errors.append(f"self-check (warn mode): expected 200, got {response.status_code}")
+    if not any(m.startswith("possible N+1 in GET /_profiler_selfcheck: 10 x") for m in capture.messages):
+        errors.append("self-check: N+1 not reported")
+    if not any(m.startswith("query budget exceeded in GET /_profiler_selfcheck") for m in capture.messages):
+        errors.append("self-check: budget overrun not reported")
+
+    settings.QUERY_BUDGET_ENFORCE = True
+    response = client.get("/_profiler_selfcheck", params={"ids": ids})
+    if response.status_code != 500:
+        errors.append(f"self-check (enforced): expected 500, got {response.status_code}")
+
+    slow_query_ms = settings.SLOW_QUERY_MS
+    settings.SLOW_QUERY_MS = 1e-6  # todo es "lento"
+    capture.messages.clear()
+    try:
+        client.get(f"/products/{product_ids[0]}")
+    finally:
+        settings.SLOW_QUERY_MS = slow_query_ms
+    if not any(m.startswith("slow query") and "query plan:\n" in m and "product" in m for m in capture.messages):
+        errors.append("self-check: slow query (with its plan) not logged")
+    capture.messages.clear()
+    return errors
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders", type=int, default=120)
+    parser.add_argument("--max-items", type=int, default=30)
+    args = parser.parse_args()
+
+    capture = _Capture()
+    logging.getLogger("app.profiler").addHandler(capture)
+
+    with TestClient(app, raise_server_exceptions=False) as client:
+        user_id, product_ids = seed(args.orders, args.max_items)
+        headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user_id)})}"}
+
+        errors = self_check(client, capture, product_ids)
+        requests = 0
+
+        def check(response, expected: int, what: str) -> None:
+            nonlocal requests
+            requests += 1
+            if response.status_code != expected:
+                errors.append(f"{what}: expected {expected}, got {response.status_code} {response.text[:200]}")
+
+        for n_items in sorted({1, 2, 10, args.max_items}):
+            items = [{"product_id": pid, "quantity": 1} for pid in product_ids[:n_items]]
+            check(client.post("/checkout/validate", json={"items": items}), 200, f"checkout with {n_items} items")
+            check(client.post("/orders/", json={"items": items}, headers=headers), 201, f"order with {n_items} items")
+
+        before_id = None
+        while True:
+            params = {"limit": 20} if before_id is None else {"limit": 20, "before_id": before_id}
+            response = client.get("/orders/", params=params, headers=headers)
+            check(response, 200, f"orders page before_id={before_id}")
+            before_id = response.headers.get("X-Next-Before-Id")
+            if before_id is None:
+                break
+
+    errors.extend(capture.messages)
+    if errors:
+        print("FAIL:")
+        for error in errors:
+            print("   ", error)
+        return 1
+    print(f"OK: {requests} requests within their query budgets, no N+1 (profiler self-check passed)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
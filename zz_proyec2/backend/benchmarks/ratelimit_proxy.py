@@ -0,0 +1,74 @@
+"""Guardia del rate limit por IP detrás (o no) de un proxy.
+
+Lanza el servidor de producción (`python -m app.launcher`) sobre una BD
+temporal con un límite de login de `--limit` intentos por IP (sin límite por
+usuario) y manda los intentos desde 127.0.0.1 con X-Forwarded-For:
+
+* SERVER_FORWARDED_ALLOW_IPS=127.0.0.1 (proxy local de confianza): el límite
+  va por la IP de X-Forwarded-For; el cliente que lo agota recibe 429 y otro
+  cliente detrás del mismo proxy no.
+* SERVER_FORWARDED_ALLOW_IPS="" (sin proxy): X-Forwarded-For no cuenta; por
+  mucho que cambie en cada intento, el límite se agota igual.
+
+Sale con código 1 si algo no cuadra.
+
+Uso (desde backend/):
+
+    python -m benchmarks.ratelimit_proxy [--limit 3]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+
+import httpx
+
+from benchmarks.common import launcher_server, use_temp_database
+
+
+def login(client: httpx.Client, attempt: int, forwarded_for: str) -> int:
+    form = {"username": f"nobody{attempt}@example.com", "password": "x"}  # un usuario por intento
+    return client.post("/auth/login", data=form, headers={"X-Forwarded-For": forwarded_for}).status_code
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--limit", type=int, default=3)
+    args = parser.parse_args()
+
+    db_path = use_temp_database()
+    env = dict(
+        os.environ,
+        SQLITE_PATH=str(db_path),
+        RATE_LIMIT_ENABLED="1",
+        RATE_LIMITS=json.dumps({"login": {"ip": f"{args.limit}/3600"}}),
+    )
+    errors = []
+
+    with launcher_server(dict(env, SERVER_FORWARDED_ALLOW_IPS="127.0.0.1")) as url, httpx.Client(base_url=url) as client:
+        statuses = [login(client, i, "203.0.113.1") for i in range(args.limit + 1)]
+        if 429 in statuses[:-1] or statuses[-1] != 429:
+            errors.append(f"trusted proxy: client over its limit got {statuses}, expected 429 only on the last one")
+        other = login(client, args.limit + 1, "203.0.113.2")
+        if other == 429:
+            errors.append("trusted proxy: another client behind the same proxy got 429")
+
+    with launcher_server(dict(env, SERVER_FORWARDED_ALLOW_IPS="")) as url, httpx.Client(base_url=url) as client:
+        statuses = [login(client, i, f"203.0.113.{i + 1}") for i in range(args.limit + 1)]
+        if statuses[-1] != 429:
+            errors.append(f"no proxy: a spoofed X-Forwarded-For per attempt got {statuses}, expected a final 429")
+
+    if errors:
+        print("FAIL:")
+        for error in errors:
+            print("   ", error)
+        return 1
+    print(f"OK: login limited to {args.limit} per real client IP, with and without a trusted proxy")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+"""Arranque en frío: tiempo de import de `app.main` y hasta la primera petición.
+
+* Imports: `python -X importtime -c "import app.main"` en un proceso nuevo,
+  `--runs` veces (mediana). Muestra el total y los paquetes que más cuestan
+  (tiempo propio de sus módulos sumado por paquete de primer nivel).
+* Primera petición: lanza uvicorn sobre una BD temporal y mide desde el
+  `Popen` hasta el primer 200 de `GET /health`, en tres casos: BD vacía
+  (primer arranque, crea el esquema), reinicio con el esquema ya creado
+  (fingerprint en PRAGMA user_version, se salta create_all) y reinicio con
+  SKIP_UNCHANGED_SCHEMA=0 (comprobando todo como antes).
+
+Con `--output` guarda los resultados en JSON y con `--baseline` compara con
+otra ejecución: sale con código 1 si el import o el reinicio empeoran más de
+`--max-regression` %.
+
+Uso (desde backend/):
+
+    python -m benchmarks.startup [--runs 5] [--top 15]
+    python -m benchmarks.startup --baseline before.json --output after.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import httpx
+
+from benchmarks.common import BACKEND_DIR, free_port
+
+
+def import_times(runs: int) -> tuple[float, dict[str, float]]:
+    """(ms hasta importar app.main, ms propios por paquete), medianas de `runs` procesos."""
+    totals = []
+    packages: dict[str, list[float]] = defaultdict(list)
+    for _ in range(runs):
+        stderr = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import app.main"],
+            cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+        ).stderr
+        per_package: dict[str, float] = defaultdict(float)
+        for line in stderr.splitlines():
+            # "import time:  self [us] | cumulative | imported package"
+            if not line.startswith("import time:") or "self [us]" in line:
+                continue
+            self_us, cumulative_us, name = line[len("import time:"):].split("|")
+            name = name.strip()
+            per_package[name.split(".")[0]] += int(self_us) / 1000
+            if name == "app.main":
+                totals.append(int(cumulative_us) / 1000)
+        for package, ms in per_package.items():
+            packages[package].append(ms)
+    return statistics.median(totals), {p: statistics.median(v) for p, v in packages.items()}
+
+
+def time_to_first_request(db_path: Path, env_overrides: dict) -> float:
+    """ms desde lanzar uvicorn hasta el primer 200 de /health."""
+    port = free_port()
+    env = {**os.environ, "SQLITE_PATH": str(db_path), **env_overrides}
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    try:
+        while True:
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                    return (time.perf_counter() - start) * 1000
+            except httpx.TransportError:
+                pass
+            if proc.poll() is not None:
+                raise RuntimeError("uvicorn exited during startup")
+            time.sleep(0.005)
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def startup_times(runs: int) -> dict[str, float]:
+    first, restart, full_check = [], [], []
+    for _ in range(runs):
+        db_path = Path(tempfile.mkdtemp(prefix="shop-startup-")) / "startup.db"
+        first.append(time_to_first_request(db_path, {}))
+        restart.append(time_to_first_request(db_path, {}))
+        full_check.append(time_to_first_request(db_path, {"SKIP_UNCHANGED_SCHEMA": "0"}))
+    return {
+        "first_boot_ms": statistics.median(first),
+        "restart_ms": statistics.median(restart),
+        "restart_full_schema_check_ms": statistics.median(full_check),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="paquetes a listar")
+    parser.add_argument("--output", help="guardar resultados en este JSON")
+    parser.add_argument("--baseline", help="JSON de otra ejecución con el que comparar")
+    parser.add_argument("--max-regression", type=float, default=20.0, help="%% máximo de empeoramiento")
+    args = parser.parse_args()
+
+    import_ms, packages = import_times(args.runs)
+    result = {"import_ms": import_ms, **startup_times(args.runs), "packages_ms": packages}
+
+    print(f"{'package':<24} {'self ms':>8}")
+    for package, ms in sorted(packages.items(), key=lambda kv: -kv[1])[: args.top]:
+        print(f"{package:<24} {ms:>8.1f}")
+    print()
+    for key in ("import_ms", "first_boot_ms", "restart_ms", "restart_full_schema_check_ms"):
+        print(f"{key:<30} {result[key]:>8.1f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"results written to {args.output}")
+
+    failures = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        for key in ("import_ms", "restart_ms"):
+            if baseline.get(key):
+                change = (result[key] / baseline[key] - 1) * 100
+                if change > args.max_regression:
+                    failures.append(
+                        f"{key}: {baseline[key]:.1f} -> {result[key]:.1f} ms (+{change:.0f}% > {args.max_regression:g}%)"
+                    )
+    for failure in failures:
+        print(f"REGRESSION {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,22 @@
+import argparse
+import time
+
+from app.analytics import rebuild_rollups
+from app.db import create_db_and_tables
+
+
+# Recalcula los rollups de /analytics desde todo el histórico de pedidos
+# (backfill la primera vez, o para reparar). Necesita numpy.
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the sales rollup tables from Order/OrderItem")
+    parser.add_argument("--orders-per-batch", type=int, default=50_000)
+    args = parser.parse_args()
+
+    create_db_and_tables()
+    started = time.perf_counter()
+    stats = rebuild_rollups(args.orders_per_batch)
+    print(
+        f"✅ Rollups rebuilt from {stats['items']} order items in {stats['batches']} batches "
+        f"({stats['product_days']} product-days, {stats['currency_days']} currency-days) "
+        f"in {time.perf_counter() - started:.1f}s"
+    )
@@ -1 +1 @@
-uv run uvicorn app.main:app --reload
+uv run python -m app.launcher "$@"
@@ -1,6 +1,10 @@
-from sqlmodel import Session, select
-from app.db import engine
-from app.models.products import Product
+import argparse
+import json
+
+from app.config import settings
+from app.db import create_db_and_tables
+from app.models.products import ProductCreate
+from app.product_import import FORMATS, import_products, upsert_products
 
 
 products_data = [
@@ -40,25 +44,31 @@ products_data = [
 
 
 def seed_products():
-    with Session(engine) as session:
-        for data in products_data:
-            product = session.exec(
-                select(Product).where(Product.slug == data["slug"])
-            ).first()
+    # INSERT o UPDATE por slug en una sola sentencia (ver app/product_import.py)
+    upsert_products(ProductCreate(**data) for data in products_data)
+
 
-            if product:
-                # UPDATE existing
-                product.title = data["title"]
-                product.description = data["description"]
-                product.price_cents = data["price_cents"]
-                product.currency = data["currency"]
-                product.stock = data["stock"]
-            else:
-                # INSERT new
-                session.add(Product(**data))
+def import_feed(path, fmt, batch_size):
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        return import_products(f, fmt, batch_size)
 
-        session.commit()
 
 if __name__ == "__main__":
-    seed_products()
-    print("✅ Products seeded (insert/update)")
\ No newline at end of file
+    parser = argparse.ArgumentParser(
+        description="Seed demo products, or bulk upsert a NDJSON/CSV feed by slug"
+    )
+    parser.add_argument("feed", nargs="?", help="NDJSON or CSV file (default: demo products)")
+    parser.add_argument("--format", choices=FORMATS, help="default: from the file extension")
+    parser.add_argument("--batch-size", type=int, default=settings.PRODUCT_IMPORT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    create_db_and_tables()
+    if args.feed is None:
+        seed_products()
+        print("✅ Products seeded (insert/update)")
+    else:
+        fmt = args.format or ("csv" if args.feed.lower().endswith(".csv") else "ndjson")
+        report = import_feed(args.feed, fmt, args.batch_size)
+        for error in report.pop("errors"):
+            print(f"batch {error['batch']} line {error['line']}: {error['error']}")
+        print(json.dumps(report))